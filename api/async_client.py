@@ -0,0 +1,379 @@
+"""
+Asynchronous API Client Module
+"""
+from __future__ import annotations
+from collections.abc import AsyncIterator, Callable, Container, Iterator
+import asyncio
+import json
+import math
+import time
+import aiohttp
+from client import Client, MULTIGET_MAX_IDS, SearchPages, batched
+from ratelimit import RateLimiter
+from retry import RetryPolicy
+from cache import ResponseCache
+from metrics import Metrics
+
+
+class AsyncClient(Client):
+    """
+    This class mirrors Client on top of asyncio, so a single thread can keep
+    hundreds of requests in flight. The authorization flow is inherited from
+    Client; every public method returns an awaitable instead of a result.
+    Requests go through the same rate limiter, retry policy, response cache and
+    metrics as Client, which may be shared with a Client.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, site="MLB",
+                 max_concurrency: int = 100, refresh_margin: int = 60,
+                 rate_limits: dict[str, dict] | None = None,
+                 retry_policy: RetryPolicy | None = None,
+                 cache: ResponseCache | None = None,
+                 metrics: Metrics | None = None,
+                 rate_limiter: RateLimiter | None = None) -> None:
+        super().__init__(client_id, client_secret, site, rate_limits, retry_policy, cache, metrics)
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency
+        self.refresh_margin = refresh_margin
+        self.session = None
+        self._semaphore = None
+        self._refresh_lock = None
+
+    async def __aenter__(self) -> AsyncClient:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Opens the underlying HTTP session. It must be called from a running event loop.
+            Returns:
+                None
+        """
+        if self._semaphore is None:
+            # Created lazily so they bind to the running loop rather than the default one.
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._refresh_lock = asyncio.Lock()
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self.session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self) -> None:
+        """Closes the underlying HTTP session.
+            Returns:
+                None
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def set_token(self, token: dict) -> None:
+        """Sets the token used to authorize requests. It is refreshed automatically
+        shortly before it expires.
+            Args:
+                token:
+            Returns:
+                None
+        """
+        self.token = token
+
+    async def refresh_token(self) -> dict:
+        """Exchanges the refresh token for a new access token.
+            Returns:
+                A dict
+        """
+        token_url = self.BASE_URL + '/oauth/token'
+        data = {
+            'grant_type': 'refresh_token',
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'refresh_token': self.token['refresh_token'],
+        }
+        await self.open()
+        async with self.session.post(token_url, data=data) as response:
+            response.raise_for_status()
+            token = await response.json()
+        token['expires_at'] = time.time() + token['expires_in']
+        self._save_token(token)
+        return token
+
+    async def _ensure_token(self) -> None:
+        if self.token['expires_at'] - self.refresh_margin > time.time():
+            return
+        async with self._refresh_lock:
+            # Another coroutine may have refreshed it while we were waiting.
+            if self.token['expires_at'] - self.refresh_margin <= time.time():
+                await self.refresh_token()
+
+    def connection_stats(self) -> dict[str, int]:
+        """Raises NotImplementedError: requests are sent by an aiohttp session, not a Transport."""
+        raise NotImplementedError('AsyncClient has no Transport; its connections are pooled by aiohttp')
+
+    async def get_category_tree(self, category: dict, accumulator: list):
+        """Returns a list of categories. Children of the same parent are fetched concurrently.
+            Args:
+                category:
+                accumulator:
+            Returns:
+                A list of dict
+        """
+        children_categories = category['children_categories']
+        categories = await asyncio.gather(
+            *(self._get(f'/categories/{child["id"]}') for child in children_categories))
+        for category in categories:
+            accumulator.append(category)
+            await self.get_category_tree(category, accumulator)
+
+    async def get_category_tree_bfs(self, category: dict,
+                                    max_workers: int | None = None) -> tuple[list[dict], dict[str, dict]]:
+        """Returns every descendant of a category, discovered level by level.
+        All the categories of a level are fetched concurrently.
+            Args:
+                category:
+                max_workers: Limits the requests in flight for this tree,
+                    on top of the client-wide max_concurrency.
+            Returns:
+                A tuple with the list of categories and a dict mapping each
+                category id to its parent_id and depth (children of `category` have depth 1).
+        """
+        semaphore = asyncio.Semaphore(max_workers or self.max_concurrency)
+
+        async def fetch(category_id):
+            async with semaphore:
+                return await self.get_category(category_id)
+
+        categories = []
+        metadata = {}
+        frontier = [(child['id'], category['id']) for child in category['children_categories']]
+        depth = 1
+        while frontier:
+            children = await asyncio.gather(*(fetch(category_id) for category_id, _ in frontier))
+            next_frontier = []
+            for (category_id, parent_id), child in zip(frontier, children):
+                categories.append(child)
+                metadata[category_id] = {'parent_id': parent_id, 'depth': depth}
+                next_frontier.extend(
+                    (grandchild['id'], category_id) for grandchild in child['children_categories'])
+            frontier = next_frontier
+            depth += 1
+        return categories, metadata
+
+    async def get_leaf_categories(self, category: dict, accumulator: list) -> list[dict]:
+        """Returns a list of leaf categories
+            Args:
+                category:
+                accumulator:
+            Returns:
+                A list of dict.
+        """
+        if not category['children_categories']:
+            accumulator.append(category)
+        else:
+            children_categories = category['children_categories']
+            categories = await asyncio.gather(
+                *(self._get(f'/categories/{child["id"]}') for child in children_categories))
+            for category in categories:
+                await self.get_leaf_categories(category, accumulator)
+
+    async def iter_search_pages(self, site_id: str, params: dict, total: int, limit: int, quota: int,
+                                window: int = 8, skip: Container[int] = (),
+                                on_error: Callable[[int], None] | None = None) -> AsyncIterator[dict]:
+        """Same as Client.iter_search_pages, as an async iterator: up to `window`
+        pages are in flight at once, and once a page comes back short or empty no
+        page with a greater offset is requested.
+            Args:
+                site_id:
+                params:
+                total:
+                limit:
+                quota: Maximum number of items to page through.
+                window:
+                skip: Offsets of pages not to fetch, e.g. already stored ones.
+                on_error: Called with the offset of each page that could not be fetched.
+            Returns:
+                An async iterator of dict
+        """
+        pages = SearchPages(total, limit, quota, skip, on_error)
+        pending = {}
+
+        def submit() -> bool:
+            offset = pages.next_offset()
+            if offset is None:
+                return False
+            page_params = {**params, 'offset': offset, 'limit': limit}
+            pending[asyncio.ensure_future(self.search_items(site_id, page_params))] = offset
+            return True
+
+        try:
+            while len(pending) < window and submit():
+                pass
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page = pages.receive(pending.pop(task), task.result())
+                    if page is not None:
+                        yield page
+                while len(pending) < window and submit():
+                    pass
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_items(self, site_id: str, params: dict, total: int, limit: int, quota: int,
+                        window: int = 8) -> list[dict]:
+        """Returns a list of items according query parameters.
+            Args:
+                params:
+                total:
+                limit:
+                window: Number of pages fetched concurrently.
+            Returns:
+                A list of dict
+        """
+        items = []
+        async for page in self.iter_search_pages(site_id, params, total, limit, quota, window):
+            items.extend(page['results'])
+        return items
+
+    async def get_items_by_ids(self, item_ids, attributes: list[str] | None = None):
+        """Yields the full document of each item, fetching MULTIGET_MAX_IDS items per
+        request. Items are yielded as soon as their batch arrives.
+            Args:
+                item_ids:
+                attributes: Restricts the fields returned for each item.
+            Returns:
+                An async iterator of dict
+        """
+        calls = []
+        for batch in batched(item_ids, MULTIGET_MAX_IDS):
+            params = {'ids': ','.join(batch)}
+            if attributes:
+                params['attributes'] = ','.join(attributes)
+            calls.append(self._get('/items', params=params))
+        for call in asyncio.as_completed(calls):
+            for item in self._multiget_bodies(await call):
+                yield item
+
+    async def _cached_get(self, endpoint, **kwargs):
+        key, entry = self._cache_lookup(endpoint, kwargs)
+        if entry is not None and self.cache.is_fresh(entry):
+            return self._parse(self.cache.response(entry))
+        r = await self._fetch('GET', endpoint, **kwargs)
+        return self._parse(self._cache_update(endpoint, key, entry, r))
+
+    async def _request(self, method, endpoint, **kwargs):
+        return self._parse(await self._fetch(method, endpoint, **kwargs))
+
+    async def _fetch(self, method, endpoint, **kwargs):
+        url = self.BASE_URL + endpoint
+        kwargs.setdefault('timeout', aiohttp.ClientTimeout(total=self.retry_policy.request_timeout))
+        deadline = self.retry_policy.deadline()
+        attempt = 0
+        while True:
+            try:
+                r = await self._send(method, url, endpoint, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                delay = self._retry_delay(method, endpoint, attempt, deadline)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(method, endpoint, attempt, deadline, r)
+                if delay is None:
+                    return r
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, method, url, endpoint, **kwargs):
+        await self.open()
+        await self._ensure_token()
+        headers = {**kwargs.pop('headers', {}), 'Authorization': f"Bearer {self.token['access_token']}"}
+        limiter = self.rate_limiter.get(endpoint)
+        epoch = await limiter.acquire_async()
+        started_at = time.monotonic()
+        r = None
+        try:
+            async with self._semaphore:
+                async with self.session.request(method, url, headers=headers, **kwargs) as response:
+                    r = AsyncResponse(response.status, response.headers, await response.read())
+        finally:
+            self._record_response(endpoint, limiter, epoch, started_at, r)
+        return r
+
+
+class AsyncResponse():
+    """
+    The subset of requests.Response used by Client._parse, the retry policy and
+    the response cache, built from an aiohttp response once its body is read.
+    """
+
+    def __init__(self, status_code: int, headers, content: bytes) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        """The body decoded as UTF-8."""
+        return self.content.decode('utf-8')
+
+    def json(self):
+        """Returns the decoded JSON body."""
+        return json.loads(self.content)
+
+class BlockingClient():
+    """
+    Blocking view of an AsyncClient, for sync code running in a worker thread
+    while the event loop of the AsyncClient runs in another one. Requests are
+    still sent by the AsyncClient; the calling thread waits for their result.
+    """
+
+    def __init__(self, async_client: AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+        self.async_client = async_client
+        self.loop = loop
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def search_items(self, site_id: str, params: dict) -> dict:
+        """Returns a dict containing the search result
+            Args:
+                site_id:
+                params:
+            Returns:
+                A dict
+        """
+        return self._run(self.async_client.search_items(site_id, params))
+
+    def iter_search_pages(self, site_id: str, params: dict, total: int, limit: int, quota: int,
+                          window: int = 8, skip: Container[int] = (),
+                          on_error: Callable[[int], None] | None = None) -> Iterator[dict]:
+        """Same as Client.iter_search_pages. The pages are fetched by
+        AsyncClient.iter_search_pages on the event loop and handed over one by one.
+            Args:
+                site_id:
+                params:
+                total:
+                limit:
+                quota: Maximum number of items to page through.
+                window:
+                skip: Offsets of pages not to fetch, e.g. already stored ones.
+                on_error: Called with the offset of each page that could not be fetched.
+            Returns:
+                An iterator of dict
+        """
+        pages = self.async_client.iter_search_pages(
+            site_id, params, total, limit, quota, window, skip, on_error)
+
+        async def next_page():
+            return await pages.__anext__()
+
+        try:
+            while True:
+                try:
+                    yield self._run(next_page())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run(pages.aclose())
@@ -0,0 +1,182 @@
+"""
+This module aims to test AsyncClient and BlockingClient, with the aiohttp
+session stubbed so no network is needed
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from async_client import AsyncClient, BlockingClient
+from cache import ResponseCache
+from retry import RetryPolicy
+
+
+class FakeResponse():
+    """
+    The subset of an aiohttp response read by AsyncClient._send
+    """
+
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self._body = b'' if body is None else json.dumps(body).encode('utf-8')
+
+    async def read(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeSession():
+    """
+    Stands in for aiohttp.ClientSession. `respond` returns the FakeResponse for
+    a request, from its method, url, headers and params.
+    """
+
+    def __init__(self, respond, delay=0.0):
+        self.respond = respond
+        self.delay = delay
+        self.closed = False
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def request(self, method, url, headers=None, params=None, **kwargs):
+        self.requests.append((method, url, dict(headers or {}), dict(params or {})))
+        return self._request(method, url, headers or {}, params or {})
+
+    def _request(self, method, url, headers, params):
+        session = self
+
+        class Context():
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.max_in_flight = max(session.max_in_flight, session.in_flight)
+                await asyncio.sleep(session.delay)
+                session.in_flight -= 1
+                return session.respond(method, url, headers, params)
+
+            async def __aexit__(self, *exc_info):
+                pass
+
+        return Context()
+
+    async def close(self):
+        self.closed = True
+
+
+def search_page(params, size=None):
+    limit = params.get('limit', 50)
+    results = [{'id': params.get('offset', 0) + i} for i in range(limit if size is None else size)]
+    return FakeResponse(200, {'paging': {'offset': params.get('offset', 0), 'limit': limit}, 'results': results})
+
+
+def make_client(respond, delay=0.0, **kwargs):
+    client = AsyncClient('client_id', 'client_secret', 'MLB', **kwargs)
+    client.set_token({'access_token': 'token', 'expires_at': time.time() + 3600})
+    client.session = FakeSession(respond, delay)
+    return client
+
+
+class TestAsyncClient(unittest.TestCase):
+    """
+    Test class for AsyncClient
+    """
+
+    def test_throttled_requests_are_retried_and_counted(self):
+        statuses = [429, 200]
+
+        def respond(method, url, headers, params):
+            if statuses.pop(0) == 429:
+                return FakeResponse(429, {'message': 'too_many_requests'}, {'Retry-After': '0'})
+            return search_page(params)
+
+        client = make_client(respond, retry_policy=RetryPolicy(base_delay=0.01))
+        page = asyncio.run(client.search_items('MLB', {'category': 'MLB1', 'limit': 2}))
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual(client.metrics.requests, 2)
+        self.assertEqual(client.retry_policy.stats(), {'/sites/{id}/search': 1})
+        self.assertEqual(client.rate_limiter.get('/sites/MLB/search').throttled, 1)
+
+    def test_stale_entries_are_revalidated(self):
+        def respond(method, url, headers, params):
+            if headers.get('If-None-Match') == '"v1"':
+                return FakeResponse(304, headers={'ETag': '"v1"'})
+            return FakeResponse(200, {'id': 'MLB1'}, {'ETag': '"v1"'})
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(os.path.join(directory, 'cache.sqlite3'), ttls={'/categories/{id}': 0})
+            client = make_client(respond, cache=cache)
+
+            async def fetch_twice():
+                return [await client.get_category('MLB1'), await client.get_category('MLB1')]
+
+            self.assertEqual(asyncio.run(fetch_twice()), [{'id': 'MLB1'}, {'id': 'MLB1'}])
+            self.assertEqual(cache.stats()['revalidations'], 1)
+            self.assertEqual(client.metrics.requests, 2)
+            cache.close()
+
+    def test_search_pages_are_bounded_by_the_window(self):
+        client = make_client(lambda method, url, headers, params: search_page(params), delay=0.01)
+
+        async def crawl():
+            return [page async for page in client.iter_search_pages('MLB', {'category': 'MLB1'}, 1000, 50, 4000, 3)]
+
+        self.assertEqual(len(asyncio.run(crawl())), 20)
+        self.assertLessEqual(client.session.max_in_flight, 3)
+
+    def test_search_pages_stop_after_a_short_page(self):
+        def respond(method, url, headers, params):
+            return search_page(params, 10 if params['offset'] == 100 else None)
+
+        client = make_client(respond)
+
+        async def crawl():
+            return [page async for page in client.iter_search_pages('MLB', {}, 1000, 50, 4000, 1, skip={50})]
+
+        self.assertEqual([page['paging']['offset'] for page in asyncio.run(crawl())], [0, 100])
+        self.assertEqual([request[3]['offset'] for request in client.session.requests], [0, 100])
+
+    def test_connection_stats_is_not_available(self):
+        with self.assertRaises(NotImplementedError):
+            make_client(lambda *args: None).connection_stats()
+
+
+class TestBlockingClient(unittest.TestCase):
+    """
+    Test class for BlockingClient, driving an event loop running in another thread
+    """
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def test_search_items_and_pages(self):
+        def respond(method, url, headers, params):
+            if params.get('offset') == 50:
+                return FakeResponse(500, {'message': 'internal_error'})
+            return search_page(params)
+
+        client = BlockingClient(
+            make_client(respond, retry_policy=RetryPolicy(max_attempts=1)), self.loop)
+        self.assertEqual(len(client.search_items('MLB', {'limit': 3})['results']), 3)
+        failed = []
+        pages = list(client.iter_search_pages('MLB', {}, 200, 50, 4000, 2, skip={0}, on_error=failed.append))
+        self.assertEqual(sorted(page['paging']['offset'] for page in pages), [100, 150])
+        self.assertEqual(failed, [50])
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,237 @@
+"""
+HTTP Response Cache Module
+"""
+from __future__ import annotations
+from urllib.parse import urlencode
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from endpoints import endpoint_template
+
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+DEFAULT_TTLS = {
+    '/sites': 7 * DAY,
+    '/sites/{id}/categories': DAY,
+    '/sites/{id}/listing_types': 7 * DAY,
+    '/sites/{id}/listing_exposures': 7 * DAY,
+    '/categories/{id}': DAY,
+    '/categories/{id}/attributes': DAY,
+    '/currencies': DAY,
+    '/currencies/{id}': DAY,
+}
+
+
+class CachedResponse():
+    """
+    The subset of requests.Response used by Client._parse, rebuilt from a cache entry.
+    """
+
+    def __init__(self, entry: dict) -> None:
+        self.status_code = 200
+        self.headers = {'Content-Type': entry['content_type']}
+        self.content = entry['body']
+
+    @property
+    def text(self) -> str:
+        """The body decoded as UTF-8."""
+        return self.content.decode('utf-8')
+
+    def json(self):
+        """Returns the decoded JSON body."""
+        return json.loads(self.content)
+
+
+class ResponseCache():
+    """
+    On-disk cache of GET responses keyed by URL and query parameters.
+
+    Entries are fresh for the TTL of their endpoint template. Stale entries are
+    revalidated with If-None-Match/If-Modified-Since, so an unchanged document
+    costs a 304 with no body. When the cache grows past `max_bytes` the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = 'http_cache.sqlite3', ttls: dict[str, float] | None = None,
+                 max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)')
+        self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def ttl(self, endpoint: str) -> float | None:
+        """Returns how long responses of an endpoint stay fresh.
+            Args:
+                endpoint:
+            Returns:
+                A float, or None if the endpoint is not cached
+        """
+        return self.ttls.get(endpoint_template(endpoint))
+
+    @staticmethod
+    def key(endpoint: str, params: dict | None = None) -> str:
+        """Returns the cache key of a request.
+            Args:
+                endpoint:
+                params:
+            Returns:
+                A string
+        """
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha256(f'{endpoint}?{query}'.encode('utf-8')).hexdigest()
+
+    def lookup(self, key: str) -> dict | None:
+        """Returns the entry stored under a key, marking it as recently used.
+            Args:
+                key:
+            Returns:
+                A dict or None
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            entry = dict(row)
+            if self.is_fresh(entry):
+                self.hits += 1
+            self._conn.execute(
+                'UPDATE responses SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        """Returns True if the entry can be used without asking the server.
+            Args:
+                entry:
+            Returns:
+                A boolean value
+        """
+        return entry['expires_at'] > time.time()
+
+    @staticmethod
+    def validators(entry: dict | None) -> dict[str, str]:
+        """Returns the headers that make a request conditional on the entry.
+            Args:
+                entry:
+            Returns:
+                A dict
+        """
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidate(self, key: str, entry: dict, ttl: float, response) -> dict:
+        """Extends an entry after the server answered 304 Not Modified.
+            Args:
+                key:
+                entry:
+                ttl:
+                response:
+            Returns:
+                A dict
+        """
+        now = time.time()
+        entry['expires_at'] = now + ttl
+        entry['etag'] = response.headers.get('ETag', entry['etag'])
+        entry['last_modified'] = response.headers.get('Last-Modified', entry['last_modified'])
+        with self._lock:
+            self.revalidations += 1
+            self._conn.execute(
+                'UPDATE responses SET expires_at = ?, accessed_at = ?, etag = ?, last_modified = ? '
+                'WHERE key = ?',
+                (entry['expires_at'], now, entry['etag'], entry['last_modified'], key))
+        return entry
+
+    def store(self, key: str, ttl: float, response) -> None:
+        """Stores a 200 response, evicting old entries if the cache is full.
+            Args:
+                key:
+                ttl:
+                response:
+            Returns:
+                None
+        """
+        body = response.content
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self._size -= row['size']
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 response.headers.get('Content-Type', 'application/json'), body, len(body),
+                 now + ttl, now))
+            self._size += len(body)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                'SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64').fetchall()
+            if not rows:
+                break
+            for row in rows:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (row['key'],))
+                self._size -= row['size']
+                if self._size <= self.max_bytes:
+                    break
+
+    @staticmethod
+    def response(entry: dict) -> CachedResponse:
+        """Rebuilds a response from an entry.
+            Args:
+                entry:
+            Returns:
+                A CachedResponse
+        """
+        return CachedResponse(entry)
+
+    def stats(self) -> dict[str, int]:
+        """Returns hit, revalidation and miss counters and the size of the cache.
+            Returns:
+                A dict
+        """
+        return {
+            'hits': self.hits,
+            'revalidations': self.revalidations,
+            'misses': self.misses,
+            'bytes': self._size,
+        }
+
+    def close(self) -> None:
+        """Closes the underlying database.
+            Returns:
+                None
+        """
+        with self._lock:
+            self._conn.close()
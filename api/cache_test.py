@@ -0,0 +1,68 @@
+"""
+This module aims to test the class ResponseCache in module cache
+"""
+import os
+import tempfile
+import unittest
+from cache import ResponseCache
+
+
+class FakeResponse():
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, content, headers=None):
+        self.status_code = 200
+        self.content = content
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Test class for ResponseCache
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(os.path.join(self.directory.name, 'cache.sqlite3'), max_bytes=100)
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_ttl_by_template(self):
+        self.assertIsNotNone(self.cache.ttl('/categories/MLB1055'))
+        self.assertIsNone(self.cache.ttl('/sites/MLB/search'))
+
+    def test_key_ignores_params_order(self):
+        self.assertEqual(
+            ResponseCache.key('/sites', {'a': 1, 'b': 2}), ResponseCache.key('/sites', {'b': 2, 'a': 1}))
+
+    def test_store_and_lookup(self):
+        key = ResponseCache.key('/categories/MLB1055')
+        self.cache.store(key, 60, FakeResponse(b'{"id": "MLB1055"}', {'ETag': '"abc"'}))
+        entry = self.cache.lookup(key)
+        self.assertTrue(self.cache.is_fresh(entry))
+        self.assertDictEqual(self.cache.response(entry).json(), {'id': 'MLB1055'})
+        self.assertDictEqual(self.cache.validators(entry), {'If-None-Match': '"abc"'})
+
+    def test_revalidate_extends_stale_entry(self):
+        key = ResponseCache.key('/categories/MLB1055')
+        self.cache.store(key, -1, FakeResponse(b'{}', {'ETag': '"abc"'}))
+        entry = self.cache.lookup(key)
+        self.assertFalse(self.cache.is_fresh(entry))
+        self.cache.revalidate(key, entry, 60, FakeResponse(b''))
+        self.assertTrue(self.cache.is_fresh(self.cache.lookup(key)))
+
+    def test_evicts_least_recently_used(self):
+        first = ResponseCache.key('/categories/MLB1')
+        second = ResponseCache.key('/categories/MLB2')
+        third = ResponseCache.key('/categories/MLB3')
+        self.cache.store(first, 60, FakeResponse(b'1' * 40))
+        self.cache.store(second, 60, FakeResponse(b'2' * 40))
+        self.cache.lookup(first)
+        self.cache.store(third, 60, FakeResponse(b'3' * 40))
+        self.assertIsNotNone(self.cache.lookup(first))
+        self.assertIsNone(self.cache.lookup(second))
+        self.assertLessEqual(self.cache.stats()['bytes'], 100)
+
+unittest.main(argv=[''], verbosity=2, exit=False)
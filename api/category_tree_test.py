@@ -0,0 +1,118 @@
+"""
+This module aims to test get_category_tree_bfs on Client and AsyncClient, with
+get_category stubbed so no credentials are needed
+"""
+import asyncio
+import threading
+import time
+import unittest
+from async_client import AsyncClient
+from client import Client
+
+TREE = {
+    'MLB1': ['MLB10', 'MLB11', 'MLB12'],
+    'MLB10': ['MLB100', 'MLB101'],
+    'MLB11': ['MLB110'],
+    'MLB12': [],
+    'MLB100': ['MLB1000'],
+    'MLB101': [],
+    'MLB110': [],
+    'MLB1000': [],
+}
+DEPTHS = {'MLB10': 1, 'MLB11': 1, 'MLB12': 1, 'MLB100': 2, 'MLB101': 2, 'MLB110': 2, 'MLB1000': 3}
+
+
+def category(category_id):
+    return {'id': category_id, 'children_categories': [{'id': child} for child in TREE[category_id]]}
+
+
+class CategoryTreeTest():
+    """
+    Checks shared by the Client and AsyncClient tests. `events` logs the start
+    and the end of every get_category call.
+    """
+
+    def setUp(self):
+        self.events = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def start(self, category_id):
+        self.events.append(('start', category_id))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end(self, category_id):
+        self.in_flight -= 1
+        self.events.append(('end', category_id))
+        return category(category_id)
+
+    def check_tree(self, categories, metadata):
+        self.assertEqual(sorted(c['id'] for c in categories), sorted(DEPTHS))
+        self.assertEqual({category_id: m['depth'] for category_id, m in metadata.items()}, DEPTHS)
+        self.assertEqual(metadata['MLB10']['parent_id'], 'MLB1')
+        self.assertEqual(metadata['MLB110']['parent_id'], 'MLB11')
+        self.assertEqual(metadata['MLB1000']['parent_id'], 'MLB100')
+
+    def check_levels(self):
+        # Every category of a level is fetched before the next level starts
+        for depth in (2, 3):
+            first_start = min(i for i, (event, category_id) in enumerate(self.events)
+                              if event == 'start' and DEPTHS[category_id] == depth)
+            last_end = max(i for i, (event, category_id) in enumerate(self.events)
+                           if event == 'end' and DEPTHS[category_id] == depth - 1)
+            self.assertGreater(first_start, last_end)
+
+
+class TestClientCategoryTree(CategoryTreeTest, unittest.TestCase):
+    """
+    Test class for Client.get_category_tree_bfs
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.api = Client('client_id', 'client_secret', 'MLB')
+        self.api.get_category = self.get_category
+        self.lock = threading.Lock()
+
+    def get_category(self, category_id):
+        with self.lock:
+            self.start(category_id)
+        time.sleep(0.01)
+        with self.lock:
+            return self.end(category_id)
+
+    def test_tree_is_fetched_level_by_level(self):
+        self.check_tree(*self.api.get_category_tree_bfs(category('MLB1'), max_workers=2))
+        self.check_levels()
+        self.assertEqual(self.max_in_flight, 2)
+
+    def test_leaf_has_no_descendants(self):
+        self.assertEqual(self.api.get_category_tree_bfs(category('MLB12')), ([], {}))
+
+
+class TestAsyncClientCategoryTree(CategoryTreeTest, unittest.TestCase):
+    """
+    Test class for AsyncClient.get_category_tree_bfs
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.api = AsyncClient('client_id', 'client_secret', 'MLB')
+        self.api.get_category = self.get_category
+
+    async def get_category(self, category_id):
+        self.start(category_id)
+        await asyncio.sleep(0.01)
+        return self.end(category_id)
+
+    def test_tree_is_fetched_level_by_level(self):
+        self.check_tree(*asyncio.run(self.api.get_category_tree_bfs(category('MLB1'), max_workers=2)))
+        self.check_levels()
+        self.assertEqual(self.max_in_flight, 2)
+
+    def test_leaf_has_no_descendants(self):
+        self.assertEqual(asyncio.run(self.api.get_category_tree_bfs(category('MLB12'))), ([], {}))
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
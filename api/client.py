@@ -3,11 +3,82 @@ API Client Module
 """
 from __future__ import annotations
 from typing import Any
+from collections.abc import Callable, Container, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import itertools
 import time
 import uuid
 import math
+import requests
 from requests_oauthlib import OAuth2Session
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from exceptions import InvalidSite
+from transport import Transport
+from ratelimit import RateLimiter
+from retry import RetryPolicy
+from cache import ResponseCache
+from metrics import Metrics
+
+
+MULTIGET_MAX_IDS = 20
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Splits an iterable into lists of at most `size` elements.
+        Args:
+            iterable:
+            size:
+        Returns:
+            An iterator of lists
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class SearchPages():
+    """
+    Offsets of the pages of a search left to request, shared by the threaded and
+    the asyncio iter_search_pages. Once a page comes back short or empty, no page
+    with a greater offset is handed out.
+    """
+
+    def __init__(self, total: int, limit: int, quota: int, skip: Container[int] = (),
+                 on_error: Callable[[int], None] | None = None) -> None:
+        iterations = min(math.ceil(total/limit), math.ceil(quota/limit))
+        self.limit = limit
+        self.on_error = on_error
+        self.last_offset = math.inf
+        self._offsets = (offset for offset in range(0, iterations * limit, limit) if offset not in skip)
+
+    def next_offset(self) -> int | None:
+        """Returns the offset of the next page to request, or None if there is none."""
+        offset = next(self._offsets, None)
+        if offset is None or offset > self.last_offset:
+            return None
+        return offset
+
+    def receive(self, offset: int, page) -> dict | None:
+        """Takes the response for a page. Returns it if it has results to yield.
+            Args:
+                offset:
+                page: The search response, or an error body.
+            Returns:
+                A dict, or None
+        """
+        if not isinstance(page, dict) or 'results' not in page:
+            if self.on_error is not None:
+                self.on_error(offset)
+            return None
+        if len(page['results']) < self.limit:
+            self.last_offset = min(self.last_offset, offset)
+        return page if page['results'] else None
 
 
 class Client():
@@ -15,7 +86,11 @@ class Client():
     This class is used for identifying and authorizing users for Meli's API.
     """
 
-    def __init__(self, client_id: str, client_secret: str, site="MLB") -> None:
+    def __init__(self, client_id: str, client_secret: str, site="MLB",
+                 rate_limits: dict[str, dict] | None = None,
+                 retry_policy: RetryPolicy | None = None,
+                 cache: ResponseCache | None = None,
+                 metrics: Metrics | None = None) -> None:
         self.BASE_URL = "https://api.mercadolibre.com"
         self.auth_urls = {
             'MLA': "https://auth.mercadolibre.com.ar",  # Argentina
@@ -37,6 +112,10 @@ class Client():
         self.oauth = None
         self.token = None
         self.client = None
+        self.rate_limiter = RateLimiter(rate_limits)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.metrics = metrics or Metrics()
         try:
             self.auth_url = self.auth_urls[site]
         except KeyError as e:
@@ -73,10 +152,12 @@ class Client():
     def _save_token(self, token: dict) -> None:
         self.token = token
 
-    def set_token(self, token: dict) -> None:
-        """Sets token for a new OAuth2Session
+    def set_token(self, token: dict, pool_size: int = 10) -> None:
+        """Sets token for a new thread-safe transport
             Args:
                 token:
+                pool_size: Maximum number of connections kept open to the API.
+                    It should match the number of worker threads.
             Returns:
                 None
         """
@@ -85,15 +166,24 @@ class Client():
             'client_id': self.client_id,
             'client_secret': self.client_secret,
         }
-        self.client = OAuth2Session(
+        self.client = Transport(
             self.client_id,
             token=token,
-            auto_refresh_url=token_url,
-            auto_refresh_kwargs=extra,
-            token_updater=self._save_token
+            token_url=token_url,
+            refresh_kwargs=extra,
+            token_updater=self._save_token,
+            pool_size=pool_size
         )
         self.token = token
 
+    def connection_stats(self) -> dict[str, int]:
+        """Returns how many requests reused a pooled connection and how many
+        needed a new connection (and therefore a TLS handshake).
+            Returns:
+                A dict
+        """
+        return self.client.stats()
+
     def is_valid_token(self, token: str) -> bool:
         """Verifies if the token will expires in a future point in time.
             Args:
@@ -251,6 +341,34 @@ class Client():
             accumulator.append(category)
             self.get_category_tree(category, accumulator)
 
+    def get_category_tree_bfs(self, category: dict,
+                              max_workers: int = 16) -> tuple[list[dict], dict[str, dict]]:
+        """Returns every descendant of a category, discovered level by level.
+        All the categories of a level are fetched concurrently.
+            Args:
+                category:
+                max_workers:
+            Returns:
+                A tuple with the list of categories and a dict mapping each
+                category id to its parent_id and depth (children of `category` have depth 1).
+        """
+        categories = []
+        metadata = {}
+        frontier = [(child['id'], category['id']) for child in category['children_categories']]
+        depth = 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while frontier:
+                children = executor.map(self.get_category, [category_id for category_id, _ in frontier])
+                next_frontier = []
+                for (category_id, parent_id), child in zip(frontier, children):
+                    categories.append(child)
+                    metadata[category_id] = {'parent_id': parent_id, 'depth': depth}
+                    next_frontier.extend(
+                        (grandchild['id'], category_id) for grandchild in child['children_categories'])
+                frontier = next_frontier
+                depth += 1
+        return categories, metadata
+
     def get_leaf_categories(self, category: dict, accumulator: list) -> list[dict]:
         """Returns a list of leaf categories
             Args:
@@ -277,41 +395,188 @@ class Client():
         """
         return self._get(f'/sites/{site_id}/search', params=params)
 
-    def get_items(self, site_id: str, params: dict, total: int, limit: int, quota: int) -> list[dict]:
+    def get_items(self, site_id: str, params: dict, total: int, limit: int, quota: int,
+                  window: int = 8) -> list[dict]:
         """Returns a list of items according query parameters.
             Args:
                 params:
                 total:
                 limit:
+                window: Number of pages fetched concurrently.
             Returns:
                 A list of dict
         """
         items = []
-        iterations = min(math.ceil(total/limit), math.ceil(quota/limit))
+        for page in self.iter_search_pages(site_id, params, total, limit, quota, window):
+            items.extend(page['results'])
+        return items
 
-        for i in range(0, iterations):
-            params.update({'offset':i*limit, 'limit':limit})
-            r = self._get(f'/sites/{site_id}/search', params=params)
-            try:
-                items.extend(r['results'])
-            except KeyError:
+    def iter_search_pages(self, site_id: str, params: dict, total: int, limit: int, quota: int,
+                          window: int = 8, skip: Container[int] = (),
+                          on_error: Callable[[int], None] | None = None) -> Iterator[dict]:
+        """Yields the pages of a search, fetching up to `window` pages concurrently.
+        Pages are yielded in the order they complete. Once a page comes back short
+        or empty, no page with a greater offset is requested.
+            Args:
+                site_id:
+                params:
+                total:
+                limit:
+                quota: Maximum number of items to page through.
+                window:
+                skip: Offsets of pages not to fetch, e.g. already stored ones.
+                on_error: Called with the offset of each page that could not be fetched.
+            Returns:
+                An iterator of dict
+        """
+        pages = SearchPages(total, limit, quota, skip, on_error)
+        pending = {}
+
+        with ThreadPoolExecutor(max_workers=window) as executor:
+            def submit() -> bool:
+                offset = pages.next_offset()
+                if offset is None:
+                    return False
+                page_params = {**params, 'offset': offset, 'limit': limit}
+                pending[executor.submit(self.search_items, site_id, page_params)] = offset
+                return True
+
+            while len(pending) < window and submit():
                 pass
-        return items
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = pages.receive(pending.pop(future), future.result())
+                    if page is not None:
+                        yield page
+                while len(pending) < window and submit():
+                    pass
+
+    def get_items_by_ids(self, item_ids: Iterable[str], attributes: list[str] | None = None,
+                         max_workers: int = 8) -> Iterator[dict]:
+        """Yields the full document of each item, fetching MULTIGET_MAX_IDS items per
+        request. Batches are fetched concurrently and items are yielded as soon as
+        their batch arrives, so the order is not preserved. Missing items are skipped.
+            Args:
+                item_ids:
+                attributes: Restricts the fields returned for each item.
+                max_workers:
+            Returns:
+                An iterator of dict
+        """
+        def fetch(batch):
+            params = {'ids': ','.join(batch)}
+            if attributes:
+                params['attributes'] = ','.join(attributes)
+            return self._get('/items', params=params)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            for batch in batched(item_ids, MULTIGET_MAX_IDS):
+                pending.add(executor.submit(fetch, batch))
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from self._multiget_bodies(future.result())
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from self._multiget_bodies(future.result())
+
+    @staticmethod
+    def _multiget_bodies(response) -> Iterator[dict]:
+        if isinstance(response, list):
+            for entry in response:
+                if entry.get('code') == 200:
+                    yield entry['body']
 
     def _post(self, endpoint, **kwargs):
         return self._request('POST', endpoint, **kwargs)
 
     def _get(self, endpoint, **kwargs):
+        if self.cache is not None and self.cache.ttl(endpoint) is not None:
+            return self._cached_get(endpoint, **kwargs)
         return self._request('GET', endpoint, **kwargs)
 
+    def _cached_get(self, endpoint, **kwargs):
+        key, entry = self._cache_lookup(endpoint, kwargs)
+        if entry is not None and self.cache.is_fresh(entry):
+            return self._parse(self.cache.response(entry))
+        r = self._fetch('GET', endpoint, **kwargs)
+        return self._parse(self._cache_update(endpoint, key, entry, r))
+
+    def _cache_lookup(self, endpoint, kwargs):
+        """Returns the cache key and entry of a GET, and adds the validators of a
+        stale entry to its headers."""
+        key = self.cache.key(endpoint, kwargs.get('params'))
+        entry = self.cache.lookup(key)
+        if entry is None or not self.cache.is_fresh(entry):
+            kwargs['headers'] = {**kwargs.get('headers', {}), **self.cache.validators(entry)}
+        return key, entry
+
+    def _cache_update(self, endpoint, key, entry, r):
+        """Stores or revalidates the cache entry of a GET and returns the response to parse."""
+        ttl = self.cache.ttl(endpoint)
+        if r.status_code == 304 and entry is not None:
+            entry = self.cache.revalidate(key, entry, ttl, r)
+            return self.cache.response(entry)
+        if r.status_code == 200:
+            self.cache.store(key, ttl, r)
+        return r
+
     def _request(self, method, endpoint, **kwargs):
+        return self._parse(self._fetch(method, endpoint, **kwargs))
+
+    def _fetch(self, method, endpoint, **kwargs):
         url = self.BASE_URL + endpoint
-        r = self.client.request(method, url, **kwargs)
-        return self._parse(r)
+        kwargs.setdefault('timeout', self.retry_policy.request_timeout)
+        deadline = self.retry_policy.deadline()
+        attempt = 0
+        while True:
+            try:
+                r = self._send(method, url, endpoint, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = self._retry_delay(method, endpoint, attempt, deadline)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(method, endpoint, attempt, deadline, r)
+                if delay is None:
+                    return r
+            time.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, method, endpoint, attempt, deadline, response=None):
+        """Returns how long to wait before retrying a request, counting the retry,
+        or None if it should not be retried."""
+        delay = self.retry_policy.next_delay(method, attempt, deadline, response)
+        if delay is not None:
+            self.retry_policy.record(endpoint)
+            self.metrics.record_retry(endpoint)
+        return delay
+
+    def _send(self, method, url, endpoint, **kwargs):
+        limiter = self.rate_limiter.get(endpoint)
+        epoch = limiter.acquire()
+        started_at = time.monotonic()
+        r = None
+        try:
+            r = self.client.request(method, url, **kwargs)
+        finally:
+            self._record_response(endpoint, limiter, epoch, started_at, r)
+        return r
+
+    def _record_response(self, endpoint, limiter, epoch, started_at, r):
+        """Hands the slot taken for a request back to its limiter and records its
+        metrics. r is None when the request failed before a response arrived."""
+        status_code = None if r is None else r.status_code
+        size = 0 if r is None else len(r.content)
+        limiter.release(epoch, status_code)
+        self.metrics.record(endpoint, status_code, time.monotonic() - started_at, size)
 
     def _parse(self, response):
         if 'application/json' in response.headers['Content-Type']:
-            r = response.json()
+            r = orjson.loads(response.content) if orjson is not None else response.json()
         else:
             r = response.text
         return r
@@ -0,0 +1,33 @@
+"""
+Endpoint helpers shared by the API client components
+"""
+from __future__ import annotations
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Replaces the identifiers of an endpoint with a placeholder,
+    e.g. '/sites/MLB/search' becomes '/sites/{id}/search'.
+        Args:
+            endpoint:
+        Returns:
+            A string
+    """
+    parts = endpoint.split('?')[0].strip('/').split('/')
+    return '/' + '/'.join('{id}' if i % 2 else part for i, part in enumerate(parts))
+
+
+def endpoint_family(endpoint: str) -> str:
+    """Returns the family an endpoint belongs to: search, categories, users or default.
+        Args:
+            endpoint:
+        Returns:
+            A string
+    """
+    template = endpoint_template(endpoint)
+    if template.endswith('/search'):
+        return 'search'
+    if template.startswith('/categories') or template.endswith('/categories'):
+        return 'categories'
+    if template.startswith('/users'):
+        return 'users'
+    return 'default'
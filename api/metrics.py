@@ -0,0 +1,204 @@
+"""
+Request Metrics Module
+"""
+from __future__ import annotations
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import json
+import threading
+from endpoints import endpoint_template
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class EndpointMetrics():
+    """
+    Counters and latency histogram of a single endpoint template.
+    """
+
+    def __init__(self) -> None:
+        self.statuses = Counter()
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.bytes = 0
+        self.retries = 0
+
+    @property
+    def requests(self) -> int:
+        """Number of requests sent, including retries."""
+        return sum(self.statuses.values())
+
+    def to_dict(self) -> dict:
+        """Returns the metrics as a JSON serializable dict.
+            Returns:
+                A dict
+        """
+        return {
+            'requests': self.requests,
+            'statuses': dict(self.statuses),
+            'latency': {
+                'buckets': dict(zip([*map(str, LATENCY_BUCKETS), '+Inf'], self.buckets)),
+                'sum': self.latency_sum,
+            },
+            'bytes': self.bytes,
+            'retries': self.retries,
+        }
+
+
+class Metrics():
+    """
+    Collects per endpoint template latency histograms, bytes received, status
+    codes and retries, plus the number of requests consumed against a quota.
+    The metrics can be rendered in the Prometheus text format or saved as JSON.
+    """
+
+    def __init__(self, quota: int | None = None) -> None:
+        self.quota = quota
+        self.endpoints = defaultdict(EndpointMetrics)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, status_code: int | None, latency: float, size: int = 0) -> None:
+        """Records one request.
+            Args:
+                endpoint:
+                status_code: None if the request failed before a response arrived.
+                latency: Seconds until the response was received.
+                size: Bytes received.
+            Returns:
+                None
+        """
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            metrics = self.endpoints[endpoint_template(endpoint)]
+            metrics.statuses['error' if status_code is None else str(status_code)] += 1
+            metrics.buckets[bucket] += 1
+            metrics.latency_sum += latency
+            metrics.bytes += size
+
+    def record_retry(self, endpoint: str) -> None:
+        """Records a retry.
+            Args:
+                endpoint:
+            Returns:
+                None
+        """
+        with self._lock:
+            self.endpoints[endpoint_template(endpoint)].retries += 1
+
+    @property
+    def requests(self) -> int:
+        """Number of requests sent to every endpoint."""
+        return sum(metrics.requests for metrics in self.endpoints.values())
+
+    def snapshot(self) -> dict:
+        """Returns every metric as a JSON serializable dict.
+            Returns:
+                A dict
+        """
+        with self._lock:
+            requests = self.requests
+            return {
+                'requests': requests,
+                'quota': self.quota,
+                'quota_used': requests / self.quota if self.quota else None,
+                'endpoints': {
+                    endpoint: metrics.to_dict() for endpoint, metrics in sorted(self.endpoints.items())
+                },
+            }
+
+    def write_json(self, path: str) -> None:
+        """Saves a snapshot of the metrics as a JSON file.
+            Args:
+                path:
+            Returns:
+                None
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+    def render_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format.
+            Returns:
+                A string
+        """
+        lines = [
+            '# HELP meli_api_requests_total Requests sent to the API, including retries.',
+            '# TYPE meli_api_requests_total counter',
+        ]
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            for endpoint, metrics in endpoints:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(
+                        f'meli_api_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP meli_api_request_duration_seconds Latency of API requests.',
+                '# TYPE meli_api_request_duration_seconds histogram',
+            ]
+            for endpoint, metrics in endpoints:
+                cumulative = 0
+                for bound, count in zip([*map(str, LATENCY_BUCKETS), '+Inf'], metrics.buckets):
+                    cumulative += count
+                    lines.append(
+                        f'meli_api_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} '
+                        f'{cumulative}')
+                lines.append(
+                    f'meli_api_request_duration_seconds_sum{{endpoint="{endpoint}"}} {metrics.latency_sum}')
+                lines.append(
+                    f'meli_api_request_duration_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+            lines += [
+                '# HELP meli_api_response_bytes_total Bytes received from the API.',
+                '# TYPE meli_api_response_bytes_total counter',
+            ]
+            lines += [f'meli_api_response_bytes_total{{endpoint="{endpoint}"}} {metrics.bytes}'
+                      for endpoint, metrics in endpoints]
+
+            lines += [
+                '# HELP meli_api_retries_total Requests retried after a failure.',
+                '# TYPE meli_api_retries_total counter',
+            ]
+            lines += [f'meli_api_retries_total{{endpoint="{endpoint}"}} {metrics.retries}'
+                      for endpoint, metrics in endpoints]
+
+            if self.quota:
+                lines += [
+                    '# HELP meli_api_quota_requests Request quota of the run.',
+                    '# TYPE meli_api_quota_requests gauge',
+                    f'meli_api_quota_requests {self.quota}',
+                    '# HELP meli_api_quota_used_ratio Share of the quota consumed so far.',
+                    '# TYPE meli_api_quota_used_ratio gauge',
+                    f'meli_api_quota_used_ratio {self.requests / self.quota}',
+                ]
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int, host: str = '') -> ThreadingHTTPServer:
+        """Serves the metrics over HTTP in the Prometheus text format from a daemon thread.
+            Args:
+                port:
+                host:
+            Returns:
+                The running server; call shutdown() to stop it.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Answers every GET with the current metrics"""
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,39 @@
+"""
+This module aims to test the class Metrics in module metrics
+"""
+import unittest
+from metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test class for Metrics
+    """
+
+    def setUp(self):
+        self.metrics = Metrics(quota=10)
+        self.metrics.record('/sites/MLB/search', 200, 0.07, 1000)
+        self.metrics.record('/sites/MLB/search', 429, 0.02, 50)
+        self.metrics.record('/categories/MLB1055', None, 3.0)
+        self.metrics.record_retry('/sites/MLB/search')
+
+    def test_snapshot_groups_by_template(self):
+        snapshot = self.metrics.snapshot()
+        search = snapshot['endpoints']['/sites/{id}/search']
+        self.assertEqual(snapshot['requests'], 3)
+        self.assertEqual(snapshot['quota_used'], 0.3)
+        self.assertDictEqual(search['statuses'], {'200': 1, '429': 1})
+        self.assertEqual(search['bytes'], 1050)
+        self.assertEqual(search['retries'], 1)
+        self.assertEqual(search['latency']['buckets']['0.05'], 1)
+        self.assertEqual(search['latency']['buckets']['0.1'], 1)
+        self.assertDictEqual(snapshot['endpoints']['/categories/{id}']['statuses'], {'error': 1})
+
+    def test_prometheus_histogram_is_cumulative(self):
+        text = self.metrics.render_prometheus()
+        self.assertIn('meli_api_requests_total{endpoint="/sites/{id}/search",status="429"} 1', text)
+        self.assertIn('meli_api_request_duration_seconds_bucket{endpoint="/sites/{id}/search",le="0.1"} 2', text)
+        self.assertIn('meli_api_request_duration_seconds_count{endpoint="/categories/{id}"} 1', text)
+        self.assertIn('meli_api_quota_used_ratio 0.3', text)
+
+unittest.main(argv=[''], verbosity=2, exit=False)
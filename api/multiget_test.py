@@ -0,0 +1,65 @@
+"""
+This module aims to test Client.get_items_by_ids, with _get stubbed so no
+credentials are needed
+"""
+import threading
+import time
+import unittest
+from client import Client, MULTIGET_MAX_IDS
+
+
+class TestGetItemsByIds(unittest.TestCase):
+    """
+    Test class for Client.get_items_by_ids, with _get stubbed
+    """
+
+    def setUp(self):
+        self.api = Client('client_id', 'client_secret', 'MLB')
+        self.api._get = self._get
+        self.batches = []
+        self.pulled = 0
+        self.missing = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def _get(self, endpoint, params=None):
+        ids = params['ids'].split(',')
+        with self.lock:
+            self.batches.append(params)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        return [{'code': 404, 'body': {'message': 'not_found'}} if item_id in self.missing
+                else {'code': 200, 'body': {'id': item_id}} for item_id in ids]
+
+    def item_ids(self, count):
+        for i in range(count):
+            self.pulled += 1
+            yield 'MLB%d' % i
+
+    def test_ids_are_batched(self):
+        items = list(self.api.get_items_by_ids(self.item_ids(45), attributes=['id', 'price']))
+        self.assertEqual(sorted(item['id'] for item in items), sorted('MLB%d' % i for i in range(45)))
+        self.assertEqual(sorted(len(batch['ids'].split(',')) for batch in self.batches),
+                         [5, MULTIGET_MAX_IDS, MULTIGET_MAX_IDS])
+        self.assertTrue(all(batch['attributes'] == 'id,price' for batch in self.batches))
+
+    def test_missing_items_are_skipped(self):
+        self.missing = {'MLB3', 'MLB7'}
+        items = list(self.api.get_items_by_ids(self.item_ids(10)))
+        self.assertEqual(len(items), 8)
+        self.assertNotIn('MLB3', [item['id'] for item in items])
+        self.assertNotIn('attributes', self.batches[0])
+
+    def test_batches_in_flight_are_bounded(self):
+        items = self.api.get_items_by_ids(self.item_ids(1000), max_workers=2)
+        next(items)
+        self.assertLessEqual(self.pulled, 2 * 2 * MULTIGET_MAX_IDS)
+        self.assertEqual(len(list(items)), 999)
+        self.assertLessEqual(self.max_in_flight, 2)
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,70 @@
+"""
+This module aims to test Client.iter_search_pages, with search_items stubbed
+so no credentials are needed
+"""
+import threading
+import time
+import unittest
+from client import Client
+
+
+class TestIterSearchPages(unittest.TestCase):
+    """
+    Test class for Client.iter_search_pages, with search_items stubbed
+    """
+
+    def setUp(self):
+        self.api = Client('client_id', 'client_secret', 'MLB')
+        self.api.search_items = self.search_items
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.short_from = None
+        self.errors = set()
+        self.lock = threading.Lock()
+
+    def search_items(self, site_id, params):
+        offset, limit = params['offset'], params['limit']
+        with self.lock:
+            self.requested.append(offset)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        if offset in self.errors:
+            return {'message': 'too_many_requests', 'status': 429}
+        size = limit if self.short_from is None or offset < self.short_from else limit // 2
+        return {'paging': {'offset': offset, 'limit': limit}, 'results': [{'id': offset + i} for i in range(size)]}
+
+    def test_window_bounds_concurrent_requests(self):
+        pages = list(self.api.iter_search_pages('MLB', {'category': 'MLB1'}, 1000, 50, 4000, window=3))
+        self.assertEqual(len(pages), 20)
+        self.assertEqual(sorted(self.requested), list(range(0, 1000, 50)))
+        self.assertLessEqual(self.max_in_flight, 3)
+
+    def test_quota_bounds_pages(self):
+        list(self.api.iter_search_pages('MLB', {'category': 'MLB1'}, 1000, 50, 200))
+        self.assertEqual(sorted(self.requested), [0, 50, 100, 150])
+
+    def test_stops_after_a_short_page(self):
+        self.short_from = 100
+        pages = list(self.api.iter_search_pages('MLB', {'category': 'MLB1'}, 1000, 50, 4000, window=1))
+        self.assertEqual(self.requested, [0, 50, 100])
+        self.assertEqual([len(page['results']) for page in pages], [50, 50, 25])
+
+    def test_skipped_offsets_are_not_requested(self):
+        pages = list(self.api.iter_search_pages('MLB', {'category': 'MLB1'}, 300, 50, 4000, skip={0, 100}))
+        self.assertEqual(sorted(self.requested), [50, 150, 200, 250])
+        self.assertEqual(sorted(page['paging']['offset'] for page in pages), [50, 150, 200, 250])
+
+    def test_failed_pages_are_reported(self):
+        self.errors = {50}
+        failed = []
+        pages = list(self.api.iter_search_pages(
+            'MLB', {'category': 'MLB1'}, 200, 50, 4000, on_error=failed.append))
+        self.assertEqual(failed, [50])
+        self.assertEqual(sorted(page['paging']['offset'] for page in pages), [0, 100, 150])
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
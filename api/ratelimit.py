@@ -0,0 +1,206 @@
+"""
+Rate Limiting Module
+"""
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from endpoints import endpoint_family
+
+
+DEFAULT_RATE_LIMITS = {
+    'search': {'rate': 50.0, 'initial_concurrency': 16, 'max_concurrency': 64},
+    'categories': {'rate': 50.0, 'initial_concurrency': 16, 'max_concurrency': 64},
+    'users': {'rate': 10.0, 'initial_concurrency': 4, 'max_concurrency': 16},
+    'default': {'rate': 20.0, 'initial_concurrency': 8, 'max_concurrency': 32},
+}
+# How often a coroutine waiting in AIMDLimiter.acquire_async checks for a free slot.
+POLL_INTERVAL = 0.01
+
+
+def is_throttled(status_code: int | None) -> bool:
+    """Returns True when a response tells us to slow down. A missing status code
+    means the request failed before a response arrived.
+        Args:
+            status_code:
+        Returns:
+            A boolean value
+    """
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+class TokenBucket():
+    """
+    Classic token bucket. Tokens are added at `rate` per second up to `capacity`
+    and every request takes one, sleeping until one is available.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def _take(self) -> float:
+        """Takes one token if available. Returns 0, or how long to wait for one."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Takes one token, blocking until it is available.
+            Returns:
+                None
+        """
+        wait = self._take()
+        while wait:
+            time.sleep(wait)
+            wait = self._take()
+
+    async def acquire_async(self) -> None:
+        """Same as acquire, but sleeps without blocking the event loop.
+            Returns:
+                None
+        """
+        wait = self._take()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+    def set_rate(self, rate: float) -> None:
+        """Changes the refill rate, keeping the tokens accumulated so far.
+            Args:
+                rate:
+            Returns:
+                None
+        """
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+
+class AIMDLimiter():
+    """
+    Limits the number of requests in flight and their rate. Both limits grow
+    additively while the API answers normally and shrink multiplicatively when
+    it answers 429/5xx (additive-increase/multiplicative-decrease).
+    """
+
+    def __init__(self, rate: float, initial_concurrency: int, max_concurrency: int,
+                 min_concurrency: int = 1, min_rate: float = 1.0,
+                 increase: float = 1.0, decrease: float = 0.5) -> None:
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(initial_concurrency)
+        self.in_flight = 0
+        self.throttled = 0
+        self.bucket = TokenBucket(rate)
+        self._epoch = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> int:
+        """Waits for a free concurrency slot and a rate token.
+            Returns:
+                The epoch the request started in, to be handed back to release.
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            epoch = self._epoch
+        self.bucket.acquire()
+        return epoch
+
+    async def acquire_async(self) -> int:
+        """Same as acquire, for coroutines. The limiter may be shared with threads,
+        so a free slot is polled for every POLL_INTERVAL seconds instead of waited on.
+            Returns:
+                The epoch the request started in, to be handed back to release.
+        """
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    epoch = self._epoch
+                    break
+            await asyncio.sleep(POLL_INTERVAL)
+        await self.bucket.acquire_async()
+        return epoch
+
+    def release(self, epoch: int, status_code: int | None) -> None:
+        """Frees the slot taken by acquire and adapts the limits to the response.
+            Args:
+                epoch: The value returned by acquire.
+                status_code: The response status, or None if the request failed.
+            Returns:
+                None
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if is_throttled(status_code):
+                self.throttled += 1
+                # Requests sent before the last decrease already saw the old limit;
+                # backing off again for each of them would collapse the window.
+                if epoch == self._epoch:
+                    self._epoch += 1
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                    self.bucket.set_rate(max(self.min_rate, self.bucket.rate * self.decrease))
+            else:
+                self.limit = min(self.max_concurrency, self.limit + self.increase / self.limit)
+                rate = self.bucket.rate
+                if rate < self.max_rate:
+                    self.bucket.set_rate(min(self.max_rate, rate + self.increase / rate))
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, float]:
+        """Returns the current limits.
+            Returns:
+                A dict
+        """
+        return {
+            'concurrency': self.limit,
+            'rate': self.bucket.rate,
+            'in_flight': self.in_flight,
+            'throttled': self.throttled,
+        }
+
+
+class RateLimiter():
+    """
+    Keeps one AIMDLimiter per endpoint family, so that throttling on searches
+    does not slow down category or user requests.
+    """
+
+    def __init__(self, rate_limits: dict[str, dict] | None = None) -> None:
+        rate_limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+        self.limiters = {family: AIMDLimiter(**kwargs) for family, kwargs in rate_limits.items()}
+
+    def get(self, endpoint: str) -> AIMDLimiter:
+        """Returns the limiter responsible for an endpoint.
+            Args:
+                endpoint:
+            Returns:
+                An AIMDLimiter
+        """
+        family = endpoint_family(endpoint)
+        return self.limiters.get(family, self.limiters['default'])
+
+    def stats(self) -> dict[str, dict]:
+        """Returns the current limits of each endpoint family.
+            Returns:
+                A dict
+        """
+        return {family: limiter.stats() for family, limiter in self.limiters.items()}
@@ -0,0 +1,85 @@
+"""
+This module aims to test the rate limiting classes in module ratelimit
+"""
+import asyncio
+import unittest
+from endpoints import endpoint_template, endpoint_family
+from ratelimit import AIMDLimiter, RateLimiter
+
+
+class TestEndpoints(unittest.TestCase):
+    """
+    Test class for the endpoint helpers
+    """
+
+    def test_endpoint_template(self):
+        self.assertEqual(endpoint_template('/sites/MLB/search'), '/sites/{id}/search')
+        self.assertEqual(endpoint_template('/categories/MLB1055/attributes'), '/categories/{id}/attributes')
+        self.assertEqual(endpoint_template('/sites'), '/sites')
+
+    def test_endpoint_family(self):
+        self.assertEqual(endpoint_family('/sites/MLB/search'), 'search')
+        self.assertEqual(endpoint_family('/categories/MLB1055'), 'categories')
+        self.assertEqual(endpoint_family('/sites/MLB/categories'), 'categories')
+        self.assertEqual(endpoint_family('/users/me'), 'users')
+        self.assertEqual(endpoint_family('/currencies'), 'default')
+
+
+class TestAIMDLimiter(unittest.TestCase):
+    """
+    Test class for AIMDLimiter
+    """
+
+    def test_throttling_halves_concurrency(self):
+        limiter = AIMDLimiter(rate=1000, initial_concurrency=8, max_concurrency=16)
+        epoch = limiter.acquire()
+        limiter.release(epoch, 429)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.bucket.rate, 500)
+
+    def test_throttling_from_same_window_decreases_once(self):
+        limiter = AIMDLimiter(rate=1000, initial_concurrency=8, max_concurrency=16)
+        epochs = [limiter.acquire() for _ in range(4)]
+        for epoch in epochs:
+            limiter.release(epoch, 503)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.throttled, 4)
+
+    def test_success_grows_additively(self):
+        limiter = AIMDLimiter(rate=1000, initial_concurrency=4, max_concurrency=16)
+        for _ in range(4):
+            limiter.release(limiter.acquire(), 200)
+        self.assertGreater(limiter.limit, 4.9)
+        self.assertLess(limiter.limit, 5)
+
+    def test_concurrency_never_below_minimum(self):
+        limiter = AIMDLimiter(rate=1000, initial_concurrency=1, max_concurrency=16)
+        limiter.release(limiter.acquire(), None)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_async_acquire_waits_for_a_slot(self):
+        limiter = AIMDLimiter(rate=1000, initial_concurrency=2, max_concurrency=2)
+        in_flight = []
+
+        async def request():
+            epoch = await limiter.acquire_async()
+            in_flight.append(limiter.in_flight)
+            await asyncio.sleep(0.02)
+            limiter.release(epoch, 200)
+
+        async def crawl():
+            await asyncio.gather(*(request() for _ in range(6)))
+
+        asyncio.run(crawl())
+        self.assertEqual(len(in_flight), 6)
+        self.assertLessEqual(max(in_flight), 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_families_are_independent(self):
+        rate_limiter = RateLimiter()
+        search = rate_limiter.get('/sites/MLB/search')
+        search.release(search.acquire(), 429)
+        categories = rate_limiter.get('/categories/MLB1055')
+        self.assertNotEqual(search.limit, categories.limit)
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,113 @@
+"""
+Retry Policy Module
+"""
+from __future__ import annotations
+from collections import Counter
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+from endpoints import endpoint_template
+
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Returns the number of seconds a Retry-After header asks us to wait.
+    The header holds either a number of seconds or an HTTP date.
+        Args:
+            value:
+        Returns:
+            A float, or None when the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy():
+    """
+    Decides whether a failed request is retried and how long to wait first.
+
+    Only idempotent methods are retried. The wait follows exponential backoff
+    with full jitter unless the server sends Retry-After, and no retry is
+    scheduled past `total_timeout` seconds after the first attempt.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 30.0,
+                 total_timeout: float = 120.0, request_timeout: float = 30.0,
+                 status_codes: frozenset[int] = RETRYABLE_STATUS_CODES) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.total_timeout = total_timeout
+        self.request_timeout = request_timeout
+        self.status_codes = status_codes
+        self.retries = Counter()
+        self._lock = threading.Lock()
+
+    def deadline(self) -> float:
+        """Returns the monotonic time after which no more retries are scheduled.
+            Returns:
+                A float
+        """
+        return time.monotonic() + self.total_timeout
+
+    def backoff(self, attempt: int) -> float:
+        """Returns a random delay between zero and the exponential backoff of the attempt.
+            Args:
+                attempt: Zero for the first attempt.
+            Returns:
+                A float
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def next_delay(self, method: str, attempt: int, deadline: float, response=None) -> float | None:
+        """Returns how long to wait before retrying, or None if the request should not be retried.
+            Args:
+                method:
+                attempt: Zero for the first attempt.
+                deadline: The value returned by deadline.
+                response: The response received, or None if the request raised.
+            Returns:
+                A float or None
+        """
+        if method.upper() not in IDEMPOTENT_METHODS or attempt + 1 >= self.max_attempts:
+            return None
+        delay = None
+        if response is not None:
+            if response.status_code not in self.status_codes:
+                return None
+            delay = parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            delay = self.backoff(attempt)
+        if time.monotonic() + delay > deadline:
+            return None
+        return delay
+
+    def record(self, endpoint: str) -> None:
+        """Counts a retry against the endpoint's template.
+            Args:
+                endpoint:
+            Returns:
+                None
+        """
+        with self._lock:
+            self.retries[endpoint_template(endpoint)] += 1
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of retries per endpoint template.
+            Returns:
+                A dict
+        """
+        with self._lock:
+            return dict(self.retries)
@@ -0,0 +1,72 @@
+"""
+This module aims to test the class RetryPolicy in module retry
+"""
+import time
+import unittest
+from email.utils import formatdate
+from retry import RetryPolicy, parse_retry_after
+
+
+class FakeResponse():
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """
+    Test class for RetryPolicy
+    """
+
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=8, total_timeout=60)
+        self.deadline = self.policy.deadline()
+
+    def test_parse_retry_after_seconds(self):
+        self.assertEqual(parse_retry_after('3'), 3)
+
+    def test_parse_retry_after_http_date(self):
+        delay = parse_retry_after(formatdate(time.time() + 30, usegmt=True))
+        self.assertAlmostEqual(delay, 30, delta=2)
+
+    def test_parse_retry_after_invalid(self):
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_retries_server_errors(self):
+        delay = self.policy.next_delay('GET', 0, self.deadline, FakeResponse(503))
+        self.assertGreaterEqual(delay, 0)
+        self.assertLessEqual(delay, 1)
+
+    def test_does_not_retry_client_errors(self):
+        self.assertIsNone(self.policy.next_delay('GET', 0, self.deadline, FakeResponse(404)))
+
+    def test_does_not_retry_non_idempotent_methods(self):
+        self.assertIsNone(self.policy.next_delay('POST', 0, self.deadline, FakeResponse(503)))
+
+    def test_stops_after_max_attempts(self):
+        self.assertIsNone(self.policy.next_delay('GET', 2, self.deadline, FakeResponse(503)))
+
+    def test_honors_retry_after(self):
+        response = FakeResponse(429, {'Retry-After': '5'})
+        self.assertEqual(self.policy.next_delay('GET', 0, self.deadline, response), 5)
+
+    def test_respects_total_timeout(self):
+        response = FakeResponse(429, {'Retry-After': '120'})
+        self.assertIsNone(self.policy.next_delay('GET', 0, self.deadline, response))
+
+    def test_connection_errors_are_retried(self):
+        self.assertIsNotNone(self.policy.next_delay('GET', 1, self.deadline))
+
+    def test_backoff_is_capped(self):
+        for _ in range(100):
+            self.assertLessEqual(self.policy.backoff(10), 8)
+
+    def test_record_counts_per_template(self):
+        self.policy.record('/sites/MLB/search')
+        self.policy.record('/sites/MLA/search')
+        self.assertDictEqual(self.policy.stats(), {'/sites/{id}/search': 2})
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,134 @@
+"""
+HTTP Transport Module
+"""
+from __future__ import annotations
+import socket
+import threading
+from oauthlib.oauth2 import TokenExpiredError
+from requests.adapters import HTTPAdapter
+from requests_oauthlib import OAuth2Session
+from urllib3.connection import HTTPConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pool blocks instead of discarding connections
+    when every slot is taken, and whose sockets enable TCP keep-alive.
+    """
+
+    def __init__(self, pool_size: int) -> None:
+        super().__init__(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        return super().init_poolmanager(*args, **kwargs)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of connections opened and requests sent by every host pool.
+            Returns:
+                A dict
+        """
+        handshakes = 0
+        requests = 0
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                handshakes += pool.num_connections
+                requests += pool.num_requests
+        return {'requests': requests, 'handshakes': handshakes, 'reused': requests - handshakes}
+
+
+class Transport():
+    """
+    Thread-safe replacement for a shared OAuth2Session.
+
+    Every thread gets its own OAuth2Session, while all of them share a single
+    connection pool sized to the number of workers. The token is refreshed by
+    one thread at a time, since a refresh token can only be used once, and the
+    new token is propagated to the sessions of the other threads.
+    """
+
+    def __init__(self, client_id: str, token: dict, token_url: str, refresh_kwargs: dict,
+                 token_updater=None, pool_size: int = 10) -> None:
+        self.client_id = client_id
+        self.token_url = token_url
+        self.refresh_kwargs = refresh_kwargs
+        self.token_updater = token_updater
+        self.pool_size = pool_size
+        self.adapter = PooledAdapter(pool_size)
+        self._token = token
+        self._token_version = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def token(self) -> dict:
+        """The most recent token known by any thread."""
+        return self._token
+
+    def refresh(self, token_version: int) -> None:
+        """Refreshes the token with the calling thread's session, unless another
+        thread refreshed it since the caller got version `token_version`.
+            Args:
+                token_version: Version of the token that expired.
+            Returns:
+                None
+        """
+        with self._lock:
+            if self._token_version != token_version:
+                return
+            session = self._local.session
+            token = session.refresh_token(self.token_url, **self.refresh_kwargs)
+            session.token = token
+            self._token = token
+            self._token_version += 1
+            self._local.token_version = self._token_version
+        if self.token_updater is not None:
+            self.token_updater(token)
+
+    def session(self) -> OAuth2Session:
+        """Returns the session owned by the calling thread.
+            Returns:
+                An OAuth2Session
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            # No auto_refresh_url: an expired token raises and request()
+            # refreshes it under the lock.
+            session = OAuth2Session(self.client_id, token=self._token)
+            session.mount('https://', self.adapter)
+            session.mount('http://', self.adapter)
+            self._local.session = session
+            self._local.token_version = self._token_version
+        elif self._local.token_version != self._token_version:
+            with self._lock:
+                session.token = self._token
+                self._local.token_version = self._token_version
+        return session
+
+    def request(self, method: str, url: str, **kwargs):
+        """Sends a request through the calling thread's session. An expired token
+        is refreshed once for all threads and the request is sent again.
+            Args:
+                method:
+                url:
+            Returns:
+                A requests.Response
+        """
+        session = self.session()
+        token_version = self._local.token_version
+        try:
+            return session.request(method, url, **kwargs)
+        except TokenExpiredError:
+            self.refresh(token_version)
+            return self.session().request(method, url, **kwargs)
+
+    def stats(self) -> dict[str, int]:
+        """Returns connection reuse and TLS handshake counters.
+            Returns:
+                A dict
+        """
+        return self.adapter.stats()
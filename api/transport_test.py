@@ -0,0 +1,106 @@
+"""
+This module aims to test Transport and PooledAdapter against a local HTTP server
+"""
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from transport import Transport
+
+# The local server speaks plain HTTP
+os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Answers every GET with the Authorization header it received
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = (self.headers.get('Authorization') or '').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransport(unittest.TestCase):
+    """
+    Test class for Transport
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/items' % self.server.server_address[1]
+        self.refreshes = 0
+        self.updates = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_transport(self, expires_in):
+        token = {'access_token': 'old', 'token_type': 'Bearer', 'expires_at': time.time() + expires_in}
+        return Transport('client_id', token, self.url, {}, token_updater=self.updates.append, pool_size=4)
+
+    def stub_refresh(self, session):
+        def refresh_token(token_url, **kwargs):
+            self.refreshes += 1
+            # Gives the other thread time to hit the lock
+            time.sleep(0.05)
+            return {'access_token': 'new', 'token_type': 'Bearer', 'expires_at': time.time() + 3600}
+
+        session.refresh_token = refresh_token
+
+    def test_every_thread_has_its_own_session(self):
+        transport = self.make_transport(3600)
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(transport.session()))
+        thread.start()
+        thread.join()
+        self.assertIs(transport.session(), transport.session())
+        self.assertIsNot(transport.session(), sessions[0])
+        self.assertIs(transport.session().get_adapter(self.url), sessions[0].get_adapter(self.url))
+
+    def test_expired_token_is_refreshed_once_and_resent(self):
+        transport = self.make_transport(-10)
+        barrier = threading.Barrier(2)
+        responses = []
+
+        def work():
+            self.stub_refresh(transport.session())
+            barrier.wait()
+            responses.append(transport.request('GET', self.url).text)
+
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.refreshes, 1)
+        self.assertEqual(responses, ['Bearer new', 'Bearer new'])
+        self.assertEqual(transport.token['access_token'], 'new')
+        self.assertEqual(len(self.updates), 1)
+
+    def test_stale_refresh_is_skipped(self):
+        transport = self.make_transport(-10)
+        self.stub_refresh(transport.session())
+        transport.refresh(0)
+        transport.refresh(0)
+        self.assertEqual(self.refreshes, 1)
+        self.assertEqual(transport.request('GET', self.url).text, 'Bearer new')
+
+    def test_stats_count_reused_connections(self):
+        transport = self.make_transport(3600)
+        for _ in range(3):
+            self.assertEqual(transport.request('GET', self.url).status_code, 200)
+        self.assertEqual(transport.stats(), {'requests': 3, 'handshakes': 1, 'reused': 2})
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
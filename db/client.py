@@ -1,46 +1,594 @@
 """PostgreSQL Database Module"""
 from __future__ import annotations
+from collections.abc import Iterable
+from contextlib import contextmanager
+from datetime import date, timedelta
+import re
+import threading
+import time
+from psycopg2.extensions import connection
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 import psycopg2
+from copy_loader import copy_stream
+
+
+# Columns loaded by COPY and their types, which the binary format needs.
+COPY_COLUMNS = {
+    'base_categories': (
+        ('site_id', 'text'), ('category_id', 'int8'), ('last_run', 'date'), ('category_json', 'jsonb')),
+    'categories': (
+        ('site_id', 'text'), ('category_id', 'int8'), ('last_run', 'date'), ('category_json', 'jsonb')),
+    'items': (
+        ('site_id', 'text'), ('item_id', 'int8'), ('last_run', 'date'), ('category_id', 'int8'),
+        ('item_json', 'jsonb')),
+    'sellers_daily': (
+        ('site_id', 'text'), ('seller_id', 'int8'), ('last_run', 'date'), ('permalink', 'text'),
+        ('registration_date', 'date'), ('level_id', 'text'), ('power_seller_status', 'text'),
+        ('transactions_total', 'int8'), ('transactions_completed', 'int8'),
+        ('transactions_canceled', 'int8'), ('ratings_positive', 'float8'), ('ratings_neutral', 'float8'),
+        ('ratings_negative', 'float8'), ('sales_completed', 'int8'), ('claims_rate', 'float8'),
+        ('claims_value', 'int8'), ('delayed_handling_time_rate', 'float8'),
+        ('delayed_handling_time_value', 'int8'), ('cancellations_rate', 'float8'),
+        ('cancellations_value', 'int8')),
+    'crawl_checkpoints': (
+        ('site_id', 'text'), ('last_run', 'date'), ('category_id', 'int8'), ('slice', 'text'),
+        ('page_offset', 'int4')),
+}
+
+TABLES = {
+    'oauth_token': """
+        CREATE SEQUENCE IF NOT EXISTS oauth_token_id_seq;
+        CREATE TABLE IF NOT EXISTS public.oauth_token (
+            id bigint NOT NULL DEFAULT nextval('oauth_token_id_seq'::regclass),
+            access_token text NOT NULL,
+            token_type text NOT NULL,
+            expires_in integer NOT NULL,
+            scope text[] NOT NULL,
+            user_id bigint NOT NULL,
+            refresh_token text NOT NULL,
+            expires_at double precision NOT NULL,
+            CONSTRAINT oauth_token_pkey PRIMARY KEY (id)
+        );
+    """,
+    'base_categories': """
+        CREATE TABLE IF NOT EXISTS public.base_categories (
+            site_id character(3) NOT NULL,
+            category_id bigint NOT NULL,
+            last_run date NOT NULL,
+            category_json jsonb
+        );
+    """,
+    'categories': """
+        CREATE TABLE IF NOT EXISTS public.categories (
+            site_id character(3),
+            category_id bigint,
+            last_run date NOT NULL,
+            category_json jsonb
+        ) PARTITION BY RANGE (last_run);
+    """,
+    'items': """
+        CREATE TABLE IF NOT EXISTS public.items (
+            site_id character(3) NOT NULL,
+            item_id bigint NOT NULL,
+            last_run date NOT NULL,
+            category_id bigint,
+            item_json jsonb,
+            seller_id bigint GENERATED ALWAYS AS ((item_json -> 'seller' ->> 'id')::bigint) STORED,
+            CONSTRAINT items_pkey PRIMARY KEY (site_id, item_id, last_run)
+        ) PARTITION BY RANGE (last_run);
+    """,
+    'sellers_daily': """
+        CREATE TABLE IF NOT EXISTS public.sellers_daily (
+            site_id character(3) NOT NULL,
+            seller_id bigint NOT NULL,
+            last_run date NOT NULL,
+            permalink text,
+            registration_date date,
+            level_id text,
+            power_seller_status text,
+            transactions_total bigint,
+            transactions_completed bigint,
+            transactions_canceled bigint,
+            ratings_positive double precision,
+            ratings_neutral double precision,
+            ratings_negative double precision,
+            sales_completed bigint,
+            claims_rate double precision,
+            claims_value bigint,
+            delayed_handling_time_rate double precision,
+            delayed_handling_time_value bigint,
+            cancellations_rate double precision,
+            cancellations_value bigint,
+            CONSTRAINT sellers_daily_pkey PRIMARY KEY (site_id, seller_id, last_run)
+        ) PARTITION BY RANGE (last_run);
+    """,
+    'price_cuts': """
+        CREATE TABLE IF NOT EXISTS public.price_cuts (
+            site_id character(3) NOT NULL,
+            category_id bigint NOT NULL,
+            last_run date NOT NULL,
+            cuts double precision[] NOT NULL,
+            CONSTRAINT price_cuts_pkey PRIMARY KEY (site_id, category_id)
+        );
+    """,
+    'crawl_checkpoints': """
+        CREATE TABLE IF NOT EXISTS public.crawl_checkpoints (
+            site_id character(3) NOT NULL,
+            last_run date NOT NULL,
+            category_id bigint NOT NULL,
+            slice text NOT NULL,
+            page_offset integer NOT NULL,
+            CONSTRAINT crawl_checkpoints_pkey PRIMARY KEY (site_id, last_run, category_id, slice, page_offset)
+        );
+    """,
+    'category_fingerprints': """
+        CREATE TABLE IF NOT EXISTS public.category_fingerprints (
+            site_id character(3) NOT NULL,
+            category_id bigint NOT NULL,
+            last_run date NOT NULL,
+            total bigint NOT NULL,
+            total_items_in_this_category bigint,
+            sample_hash text NOT NULL,
+            CONSTRAINT category_fingerprints_pkey PRIMARY KEY (site_id, category_id, last_run)
+        );
+    """,
+}
+
+# Pre-aggregated seller and category statistics, refreshed one last_run at a time
+# by refresh_summaries in the order they are listed.
+SUMMARY_TABLES = {
+    'seller_category_daily': """
+        CREATE TABLE IF NOT EXISTS public.seller_category_daily (
+            site_id character(3) NOT NULL,
+            last_run date NOT NULL,
+            category_id bigint NOT NULL,
+            seller_id bigint NOT NULL,
+            items bigint NOT NULL,
+            sold_quantity bigint,
+            available_quantity bigint,
+            avg_price numeric,
+            min_price numeric,
+            max_price numeric,
+            CONSTRAINT seller_category_daily_pkey PRIMARY KEY (site_id, last_run, category_id, seller_id)
+        );
+    """,
+    'seller_summary_daily': """
+        CREATE TABLE IF NOT EXISTS public.seller_summary_daily (
+            site_id character(3) NOT NULL,
+            last_run date NOT NULL,
+            seller_id bigint NOT NULL,
+            level_id text,
+            power_seller_status text,
+            items bigint NOT NULL,
+            categories bigint NOT NULL,
+            sold_quantity bigint,
+            avg_price numeric,
+            sales_completed bigint,
+            transactions_completed bigint,
+            transactions_canceled bigint,
+            ratings_positive double precision,
+            ratings_negative double precision,
+            claims_rate double precision,
+            delayed_handling_time_rate double precision,
+            cancellations_rate double precision,
+            CONSTRAINT seller_summary_daily_pkey PRIMARY KEY (site_id, last_run, seller_id)
+        );
+    """,
+    'category_summary_daily': """
+        CREATE TABLE IF NOT EXISTS public.category_summary_daily (
+            site_id character(3) NOT NULL,
+            last_run date NOT NULL,
+            category_id bigint NOT NULL,
+            items bigint NOT NULL,
+            sellers bigint NOT NULL,
+            power_sellers bigint NOT NULL,
+            sold_quantity bigint,
+            avg_price numeric,
+            sales_completed bigint,
+            avg_ratings_positive double precision,
+            avg_claims_rate double precision,
+            avg_cancellations_rate double precision,
+            CONSTRAINT category_summary_daily_pkey PRIMARY KEY (site_id, last_run, category_id)
+        );
+    """,
+}
+
+SUMMARY_REFRESH = {
+    'seller_category_daily': """
+        INSERT INTO public.seller_category_daily
+            SELECT
+                site_id, last_run, category_id, seller_id,
+                COUNT(*),
+                SUM((item_json ->> 'sold_quantity')::bigint),
+                SUM((item_json ->> 'available_quantity')::bigint),
+                AVG((item_json ->> 'price')::numeric),
+                MIN((item_json ->> 'price')::numeric),
+                MAX((item_json ->> 'price')::numeric)
+            FROM public.items
+            WHERE last_run = %(last_run)s AND seller_id IS NOT NULL AND category_id IS NOT NULL
+            GROUP BY site_id, last_run, category_id, seller_id;
+    """,
+    'seller_summary_daily': """
+        INSERT INTO public.seller_summary_daily
+            SELECT
+                s.site_id, s.last_run, s.seller_id, s.level_id, s.power_seller_status,
+                COALESCE(c.items, 0), COALESCE(c.categories, 0), c.sold_quantity, c.avg_price,
+                s.sales_completed, s.transactions_completed, s.transactions_canceled,
+                s.ratings_positive, s.ratings_negative,
+                s.claims_rate, s.delayed_handling_time_rate, s.cancellations_rate
+            FROM public.sellers_daily AS s
+            LEFT JOIN (
+                SELECT
+                    site_id, seller_id,
+                    SUM(items) AS items,
+                    COUNT(*) AS categories,
+                    SUM(sold_quantity) AS sold_quantity,
+                    SUM(avg_price * items) / SUM(items) AS avg_price
+                FROM public.seller_category_daily
+                WHERE last_run = %(last_run)s
+                GROUP BY site_id, seller_id
+            ) AS c USING (site_id, seller_id)
+            WHERE s.last_run = %(last_run)s;
+    """,
+    'category_summary_daily': """
+        INSERT INTO public.category_summary_daily
+            SELECT
+                c.site_id, c.last_run, c.category_id,
+                SUM(c.items),
+                COUNT(*),
+                COUNT(*) FILTER (WHERE s.power_seller_status IS NOT NULL),
+                SUM(c.sold_quantity),
+                SUM(c.avg_price * c.items) / SUM(c.items),
+                SUM(s.sales_completed),
+                AVG(s.ratings_positive),
+                AVG(s.claims_rate),
+                AVG(s.cancellations_rate)
+            FROM public.seller_category_daily AS c
+            LEFT JOIN public.sellers_daily AS s USING (site_id, seller_id, last_run)
+            WHERE c.last_run = %(last_run)s
+            GROUP BY c.site_id, c.last_run, c.category_id;
+    """,
+}
+
+# Items reference their seller in sellers_daily by this column. A new items table
+# declares it as a stored generated column. Adding one to an existing table would
+# rewrite it under an exclusive lock, so older tables get a plain column kept in
+# sync by ITEM_COLUMNS_TRIGGER instead.
+ITEM_GENERATED_COLUMNS = (
+    ('seller_id', 'bigint', "(item_json -> 'seller' ->> 'id')::bigint"),
+)
+
+ITEM_COLUMNS_TRIGGER = f"""
+    CREATE OR REPLACE FUNCTION public.items_generated_columns() RETURNS trigger AS $$
+    BEGIN
+        {' '.join(f"NEW.{name} := {expression.replace('item_json', 'NEW.item_json')};"
+                  for name, _, expression in ITEM_GENERATED_COLUMNS)}
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    DROP TRIGGER IF EXISTS items_generated_columns ON public.{{table}};
+    CREATE TRIGGER items_generated_columns BEFORE INSERT OR UPDATE ON public.{{table}}
+        FOR EACH ROW EXECUTE FUNCTION public.items_generated_columns();
+"""
+
+# Seller columns of the items table replaced by sellers_daily.
+OBSOLETE_ITEM_COLUMNS = (
+    ('seller_level_id', 'text', "item_json -> 'seller' -> 'seller_reputation' ->> 'level_id'"),
+    ('seller_power_seller_status', 'text',
+     "item_json -> 'seller' -> 'seller_reputation' ->> 'power_seller_status'"),
+    ('seller_transactions_completed', 'bigint',
+     "(item_json -> 'seller' -> 'seller_reputation' -> 'transactions' ->> 'completed')::bigint"),
+    ('seller_transactions_canceled', 'bigint',
+     "(item_json -> 'seller' -> 'seller_reputation' -> 'transactions' ->> 'canceled')::bigint"),
+    ('seller_transactions_total', 'bigint',
+     "(item_json -> 'seller' -> 'seller_reputation' -> 'transactions' ->> 'total')::bigint"),
+    ('seller_ratings_positive', 'numeric',
+     "(item_json -> 'seller' -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'positive')::numeric"),
+    ('seller_ratings_neutral', 'numeric',
+     "(item_json -> 'seller' -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'neutral')::numeric"),
+    ('seller_ratings_negative', 'numeric',
+     "(item_json -> 'seller' -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'negative')::numeric"),
+)
+
+# Fills sellers_daily from items stored before sellers were extracted during ingest.
+SELLERS_BACKFILL = """
+    INSERT INTO public.sellers_daily
+        SELECT DISTINCT ON (site_id, seller_id, last_run)
+            site_id,
+            (seller ->> 'id')::bigint AS seller_id,
+            last_run,
+            seller ->> 'permalink',
+            left(seller ->> 'registration_date', 10)::date,
+            seller -> 'seller_reputation' ->> 'level_id',
+            seller -> 'seller_reputation' ->> 'power_seller_status',
+            (seller -> 'seller_reputation' -> 'transactions' ->> 'total')::bigint,
+            (seller -> 'seller_reputation' -> 'transactions' ->> 'completed')::bigint,
+            (seller -> 'seller_reputation' -> 'transactions' ->> 'canceled')::bigint,
+            (seller -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'positive')::double precision,
+            (seller -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'neutral')::double precision,
+            (seller -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'negative')::double precision,
+            (seller -> 'seller_reputation' -> 'metrics' -> 'sales' ->> 'completed')::bigint,
+            (seller -> 'seller_reputation' -> 'metrics' -> 'claims' ->> 'rate')::double precision,
+            (seller -> 'seller_reputation' -> 'metrics' -> 'claims' ->> 'value')::bigint,
+            (seller -> 'seller_reputation' -> 'metrics' -> 'delayed_handling_time' ->> 'rate')::double precision,
+            (seller -> 'seller_reputation' -> 'metrics' -> 'delayed_handling_time' ->> 'value')::bigint,
+            (seller -> 'seller_reputation' -> 'metrics' -> 'cancellations' ->> 'rate')::double precision,
+            (seller -> 'seller_reputation' -> 'metrics' -> 'cancellations' ->> 'value')::bigint
+        FROM (
+            SELECT site_id, last_run, item_json -> 'seller' AS seller FROM public.{table}
+                WHERE item_json -> 'seller' ? 'seller_reputation'
+        ) AS items
+    ON CONFLICT (site_id, seller_id, last_run) DO NOTHING
+"""
+
+# Copy the items of a category and their sellers from a previous run into the
+# current one, for categories that did not change. Rows already stored for the
+# current run are kept.
+CARRY_FORWARD = {
+    'items': """
+        INSERT INTO public.items (site_id, item_id, last_run, category_id, item_json)
+            SELECT site_id, item_id, %(last_run)s, category_id, item_json
+            FROM public.items
+            WHERE site_id = %(site_id)s AND category_id = %(category_id)s AND last_run = %(previous_run)s
+        ON CONFLICT (site_id, item_id, last_run) DO NOTHING;
+    """,
+    'sellers_daily': f"""
+        INSERT INTO public.sellers_daily
+            SELECT DISTINCT ON (s.seller_id)
+                {', '.join('%(last_run)s' if name == 'last_run' else f's.{name}'
+                           for name, _ in COPY_COLUMNS['sellers_daily'])}
+            FROM public.items AS i
+            JOIN public.sellers_daily AS s USING (site_id, seller_id, last_run)
+            WHERE i.site_id = %(site_id)s AND i.category_id = %(category_id)s AND i.last_run = %(previous_run)s
+        ON CONFLICT (site_id, seller_id, last_run) DO NOTHING;
+    """,
+}
+
+# Built with CREATE INDEX CONCURRENTLY, so writers are not blocked while they build.
+INDEXES = {
+    'idx_items_category_last_run': ('items', 'USING btree (site_id, last_run, category_id)'),
+    'idx_items_seller_id': ('items', 'USING btree (seller_id, last_run)'),
+    'idx_items_order_backend': ('items', "USING btree ((item_json ->> 'order_backend'))"),
+}
+
+# Tables partitioned by RANGE (last_run), with one partition per day.
+PARTITIONED_TABLES = ('categories', 'items', 'sellers_daily')
+
+# Primary keys of the partitioned tables, which a table attached as a partition needs too.
+PRIMARY_KEYS = {
+    'items': ('site_id', 'item_id', 'last_run'),
+    'sellers_daily': ('site_id', 'seller_id', 'last_run'),
+}
+
+_PARTITION_BOUND = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+_CHECK_BOUND = re.compile(r"last_run >= '([\d-]+)'::date\) AND \(last_run < '([\d-]+)'::date")
+
+JSONB_COLUMNS = {
+    'base_categories': 'category_json',
+    'categories': 'category_json',
+    'items': 'item_json',
+}
+
+# Statements prepared once per pooled connection and then run with EXECUTE.
+# The merges keep the last copy of a row: within a batch the one copied last
+# (greatest ctid in the staging table), across batches the one merged last.
+PREPARED_STATEMENTS = {
+    'count_distinct_items': """
+        SELECT
+            COUNT(*)
+        FROM public.items
+            WHERE site_id = $1 AND category_id = $2 AND last_run = $3;
+    """,
+    'merge_items': """
+        INSERT INTO
+            items (site_id, item_id, last_run, category_id, item_json)
+            SELECT DISTINCT ON (site_id, item_id, last_run)
+                site_id, item_id, last_run, category_id, item_json
+            FROM items_staging
+            ORDER BY site_id, item_id, last_run, ctid DESC
+        ON CONFLICT (site_id, item_id, last_run) DO UPDATE SET
+            category_id = EXCLUDED.category_id,
+            item_json = EXCLUDED.item_json
+    """,
+    'merge_sellers': f"""
+        INSERT INTO
+            sellers_daily
+            SELECT DISTINCT ON (site_id, seller_id, last_run) *
+            FROM sellers_daily_staging
+            ORDER BY site_id, seller_id, last_run, ctid DESC
+        ON CONFLICT (site_id, seller_id, last_run) DO UPDATE SET
+            {', '.join(f'{name} = EXCLUDED.{name}' for name, _ in COPY_COLUMNS['sellers_daily']
+                       if name not in ('site_id', 'seller_id', 'last_run'))}
+    """,
+    # Every column of a checkpoint is in its key, so there is nothing to update.
+    'merge_checkpoints': """
+        INSERT INTO
+            crawl_checkpoints
+            SELECT * FROM crawl_checkpoints_staging
+        ON CONFLICT DO NOTHING
+    """,
+}
+
+
+class PooledConnection(connection):
+    """Connection that remembers its prepared statements and when it was last used"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.staging = set()
+        self.last_used = time.monotonic()
 
 
 class Client():
     """Database client"""
 
-    def __init__(self, host:str, database:str, user:str, password:str) -> None:
+    def __init__(self, host:str, database:str, user:str, password:str,
+                 minconn:int=1, maxconn:int=10, health_check_interval:float=30.0,
+                 copy_format:str='text', copy_buffer_size:int=1 << 20) -> None:
         self.host = host
         self.database = database
         self.user = user
         self.password = password
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check_interval = health_check_interval
+        self.copy_format = copy_format
+        self.copy_buffer_size = copy_buffer_size
+        self.pool = None
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.health_check_failures = 0
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self.pool is None:
+                self.pool = ThreadedConnectionPool(
+                    self.minconn,
+                    self.maxconn,
+                    host=self.host,
+                    database=self.database,
+                    user=self.user,
+                    password=self.password,
+                    connection_factory=PooledConnection)
+            return self.pool
+
+    def _is_healthy(self, conn:PooledConnection) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self) -> PooledConnection:
+        pool = self._get_pool()
+        conn = pool.getconn()
+        while not self._is_healthy(conn):
+            with self._lock:
+                self.health_check_failures += 1
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection from the pool, blocking while all of them are in use.
+        The transaction is committed when the block exits normally and rolled back otherwise.
+            Returns:
+                A connection
+        """
+        started_at = time.monotonic()
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            waited = time.monotonic() - started_at
+            with self._lock:
+                self.checkouts += 1
+                self.wait_time += waited
+                self.max_wait_time = max(self.max_wait_time, waited)
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                if not conn.closed:
+                    conn.rollback()
+                # Temp tables created in the failed transaction are gone with it.
+                conn.staging.clear()
+                raise
+            finally:
+                conn.last_used = time.monotonic()
+                self.pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _prepare(conn:PooledConnection, name:str) -> None:
+        if name not in conn.prepared:
+            with conn.cursor() as cur:
+                cur.execute(f'PREPARE {name} AS {PREPARED_STATEMENTS[name]}')
+            conn.prepared.add(name)
+
+    @staticmethod
+    def _create_staging(conn:PooledConnection, table:str) -> str:
+        staging = f'{table}_staging'
+        if staging not in conn.staging:
+            with conn.cursor() as cur:
+                cur.execute(f'CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table}) ON COMMIT DELETE ROWS')
+            conn.staging.add(staging)
+        return staging
+
+    def _copy(self, cur, table:str, records:Iterable[tuple], target:str|None=None) -> int:
+        columns, types = zip(*COPY_COLUMNS[table])
+        stream = copy_stream(records, types, self.copy_format, self.copy_buffer_size)
+        cur.copy_expert(
+            f"COPY {target or table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT {self.copy_format})",
+            stream, size=self.copy_buffer_size)
+        return stream.rows
+
+    def copy_records(self, table:str, records:Iterable[tuple]) -> int:
+        """Streams records into a table with COPY ... FROM STDIN in a single round-trip.
+        Records are encoded lazily, so generators of any size use a bounded buffer.
+            Args:
+                table: One of COPY_COLUMNS.
+                records: Tuples in the column order of COPY_COLUMNS[table].
+            Returns:
+                The number of rows loaded
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            return self._copy(cur, table, records)
+
+    def pool_stats(self) -> dict:
+        """Returns how many connections were borrowed and how long callers waited for them
+            Returns:
+                A dict
+        """
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_seconds': self.wait_time,
+                'max_wait_seconds': self.max_wait_time,
+                'health_check_failures': self.health_check_failures,
+            }
+
+    def close(self) -> None:
+        """Closes every pooled connection
+            Returns:
+                None
+        """
+        with self._lock:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
 
     def load_token(self) -> dict:
         """Loads the latest token from the database
-            Returns: 
+            Returns:
                 A dict
         """
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password)
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            postgres_read_query = """
-                SELECT 
-                    access_token, token_type, expires_in, scope, user_id, refresh_token, expires_at 
-                FROM oauth_token 
-                ORDER BY expires_at DESC 
-                LIMIT 1;
-            """
-            cur.execute(postgres_read_query)
-            return dict(cur.fetchone())
+            with self.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+                postgres_read_query = """
+                    SELECT
+                        access_token, token_type, expires_in, scope, user_id, refresh_token, expires_at
+                    FROM oauth_token
+                    ORDER BY expires_at DESC
+                    LIMIT 1;
+                """
+                cur.execute(postgres_read_query)
+                return dict(cur.fetchone())
 
         except (psycopg2.Error) as error:
             print(f"Failed to read from 'oauth_token' table: {error}")
-        finally:
-            if conn:
-                cur.close()
-                conn.close()
 
 
     def save_token(self, token: dict) -> dict:
@@ -51,38 +599,68 @@ class Client():
                 A dict
         """
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password)
-            cur = conn.cursor()
-            sql_insert_query = """
-            INSERT INTO oauth_token 
-                (access_token, token_type, expires_in, scope, user_id, refresh_token, expires_at) 
-            VALUES 
-                (%s,%s,%s,%s,%s,%s,%s)
-            """
-            record_to_insert = (
-                token['access_token'],
-                token['token_type'],
-                token['expires_in'],
-                token['scope'],
-                token['user_id'],
-                token['refresh_token'],
-                token['expires_at'])
-
-            cur.execute(sql_insert_query, record_to_insert)
-            conn.commit()
+            with self.connection() as conn, conn.cursor() as cur:
+                sql_insert_query = """
+                INSERT INTO oauth_token
+                    (access_token, token_type, expires_in, scope, user_id, refresh_token, expires_at)
+                VALUES
+                    (%s,%s,%s,%s,%s,%s,%s)
+                """
+                record_to_insert = (
+                    token['access_token'],
+                    token['token_type'],
+                    token['expires_in'],
+                    token['scope'],
+                    token['user_id'],
+                    token['refresh_token'],
+                    token['expires_at'])
+
+                cur.execute(sql_insert_query, record_to_insert)
             return token
         except (psycopg2.Error) as error:
             print(f"Failed to insert records into 'oauth_token' table: {error}")
-        finally:
-            if conn:
-                cur.close()
-                conn.close()
 
-    def insert_bulk_base_categories(self, records:list[tuple]) -> None:
+    def load_price_cuts(self, site_id:str, category_id:str) -> list[float]:
+        """Loads the price cut points last used to split a category
+            Args:
+                site_id:
+                category_id:
+            Returns:
+                A list of float, empty if the category was never split by price
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    'SELECT cuts FROM price_cuts WHERE site_id = %s AND category_id = %s',
+                    (site_id, category_id))
+                row = cur.fetchone()
+                return row[0] if row is not None else []
+        except (psycopg2.Error) as error:
+            print(f"Failed to read from 'price_cuts' table: {error}")
+            return []
+
+    def save_price_cuts(self, site_id:str, category_id:str, cuts:list[float], last_run:str|date) -> None:
+        """Persists the price cut points of a category, replacing the previous ones
+            Args:
+                site_id:
+                category_id:
+                cuts:
+                last_run:
+            Returns:
+                None
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO price_cuts (site_id, category_id, last_run, cuts)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (site_id, category_id)
+                    DO UPDATE SET last_run = EXCLUDED.last_run, cuts = EXCLUDED.cuts;
+                """, (site_id, category_id, last_run, list(cuts)))
+        except (psycopg2.Error) as error:
+            print(f"Failed to insert records into 'price_cuts' table: {error}")
+
+    def insert_bulk_base_categories(self, records:Iterable[tuple]) -> None:
         """Inserts multiple records into base_categories table
             Args:
                 records:
@@ -90,28 +668,13 @@ class Client():
                 None
         """
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password)
-            cur = conn.cursor()
-            sql_insert_query = """
-                INSERT INTO 
-                    base_categories (site_id, category_id, last_run, category_json)
-                    VALUES (%s,%s,%s,%s)
-            """
-            cur.executemany(sql_insert_query, records)
-            conn.commit()
+            with self.connection() as conn, conn.cursor() as cur:
+                self._copy(cur, 'base_categories', records)
         except (psycopg2.Error) as error:
             print(f"Failed to insert records into 'base_categories' table: {error}")
-        finally:
-            if conn:
-                cur.close()
-                conn.close()
 
 
-    def insert_bulk_categories(self, records:list[tuple]) -> None:
+    def insert_bulk_categories(self, records:Iterable[tuple]) -> None:
         """Inserts multiple records into categories table
             Args:
                 records:
@@ -119,54 +682,176 @@ class Client():
                 None
         """
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password)
-            cur = conn.cursor()
-            sql_insert_query = """
-                INSERT INTO 
-                    categories (site_id, category_id, last_run, category_json)
-                    VALUES (%s,%s,%s,%s)
-            """
-            cur.executemany(sql_insert_query, records)
-            conn.commit()
+            with self.connection() as conn, conn.cursor() as cur:
+                self._copy(cur, 'categories', records)
         except (psycopg2.Error) as error:
             print(f"Failed to insert records into 'base_categories' table: {error}")
-        finally:
-            if conn:
-                cur.close()
-                conn.close()
 
 
-    def insert_bulk_items(self, records:list[tuple]) -> None:
-        """Inserts multiple records into items table
+    def insert_bulk_items(self, records:Iterable[tuple]) -> None:
+        """Upserts multiple records into items table. Records are copied into a
+        staging table and merged on (site_id, item_id, last_run), so an item seen
+        again on the same day replaces the stored copy instead of adding a row.
+        Errors are raised, not printed, so the write-behind sink that calls it
+        knows the records were not stored.
             Args:
                 records:
             Returns:
                 None
         """
+        with self.connection() as conn, conn.cursor() as cur:
+            staging = self._create_staging(conn, 'items')
+            self._copy(cur, 'items', records, staging)
+            self._prepare(conn, 'merge_items')
+            cur.execute('EXECUTE merge_items')
+
+
+    def insert_bulk_sellers(self, records:Iterable[tuple]) -> None:
+        """Upserts multiple records into sellers_daily table. A seller is stored
+        once per site and run, with the last reputation seen.
+        Errors are raised, as in insert_bulk_items.
+            Args:
+                records:
+            Returns:
+                None
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            staging = self._create_staging(conn, 'sellers_daily')
+            self._copy(cur, 'sellers_daily', records, staging)
+            self._prepare(conn, 'merge_sellers')
+            cur.execute('EXECUTE merge_sellers')
+
+
+    def insert_bulk_checkpoints(self, records:Iterable[tuple]) -> None:
+        """Inserts multiple records into crawl_checkpoints table, ignoring the ones
+        already there.
+        Errors are raised, as in insert_bulk_items.
+            Args:
+                records:
+            Returns:
+                None
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            staging = self._create_staging(conn, 'crawl_checkpoints')
+            self._copy(cur, 'crawl_checkpoints', records, staging)
+            self._prepare(conn, 'merge_checkpoints')
+            cur.execute('EXECUTE merge_checkpoints')
+
+    def load_checkpoints(self, site_id:str, last_run:str|date) -> list[tuple]:
+        """Loads the progress of a run. Checkpoints of earlier runs are deleted
+        first, since a run only resumes work of its own day.
+            Args:
+                site_id:
+                last_run:
+            Returns:
+                A list of tuples with category_id, slice and page_offset
+        """
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password)
-            cur = conn.cursor()
-            sql_insert_query = """
-                INSERT INTO 
-                    items (site_id, item_id, last_run, category_id, item_json)
-                    VALUES (%s,%s,%s,%s,%s)
-            """
-            cur.executemany(sql_insert_query, records)
-            conn.commit()
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    'DELETE FROM crawl_checkpoints WHERE site_id = %s AND last_run < %s',
+                    (site_id, last_run))
+                cur.execute("""
+                    SELECT category_id, slice, page_offset
+                    FROM crawl_checkpoints
+                    WHERE site_id = %s AND last_run = %s;
+                """, (site_id, last_run))
+                return cur.fetchall()
         except (psycopg2.Error) as error:
-            print(f"Failed to insert records into 'items' table: {error}")
-        finally:
-            if conn:
-                cur.close()
-                conn.close()
+            print(f"Failed to read from 'crawl_checkpoints' table: {error}")
+            return []
+
+    def load_fingerprints(self, site_id:str, before:str|date) -> dict[int, tuple]:
+        """Loads the latest fingerprint of each category saved before a run
+            Args:
+                site_id:
+                before: The current run.
+            Returns:
+                A dict from category_id to a tuple with last_run, total,
+                total_items_in_this_category and sample_hash
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute("""
+                    SELECT DISTINCT ON (category_id)
+                        category_id, last_run, total, total_items_in_this_category, sample_hash
+                    FROM category_fingerprints
+                    WHERE site_id = %s AND last_run < %s
+                    ORDER BY category_id, last_run DESC;
+                """, (site_id, before))
+                return {row[0]: row[1:] for row in cur.fetchall()}
+        except (psycopg2.Error) as error:
+            print(f"Failed to read from 'category_fingerprints' table: {error}")
+            return {}
+
+    def save_fingerprint(self, site_id:str, category_id:str, last_run:str|date, fingerprint:tuple) -> None:
+        """Persists the fingerprint of a category for a run
+            Args:
+                site_id:
+                category_id:
+                last_run:
+                fingerprint: Tuple with total, total_items_in_this_category and sample_hash.
+            Returns:
+                None
+        """
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO category_fingerprints
+                        (site_id, category_id, last_run, total, total_items_in_this_category, sample_hash)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (site_id, category_id, last_run) DO UPDATE SET
+                        total = EXCLUDED.total,
+                        total_items_in_this_category = EXCLUDED.total_items_in_this_category,
+                        sample_hash = EXCLUDED.sample_hash;
+                """, (site_id, category_id, last_run, *fingerprint))
+        except (psycopg2.Error) as error:
+            print(f"Failed to insert records into 'category_fingerprints' table: {error}")
+
+    def carry_forward(self, site_id:str, category_id:str, previous_run:str|date,
+                      last_run:str|date) -> int|None:
+        """Copies the items of a category and their sellers from a previous run into
+        another one, in a single transaction.
+            Args:
+                site_id:
+                category_id:
+                previous_run:
+                last_run:
+            Returns:
+                The number of items copied, or None if the copy failed
+        """
+        params = {
+            'site_id': site_id, 'category_id': category_id, 'previous_run': previous_run,
+            'last_run': last_run}
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute(CARRY_FORWARD['items'], params)
+                copied = cur.rowcount
+                cur.execute(CARRY_FORWARD['sellers_daily'], params)
+                return copied
+        except (psycopg2.Error) as error:
+            print(f"Failed to carry forward the items of category {category_id}: {error}")
+            return None
+
+    def refresh_summaries(self, last_run:str|date) -> dict[str, int]:
+        """Rebuilds the rows of the summary tables for a single run. The slice is
+        deleted and aggregated again in one transaction, so readers see either the
+        old or the new figures and the other runs are not touched.
+            Args:
+                last_run:
+            Returns:
+                A dict with the number of rows written to each summary table
+        """
+        rows = {}
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                for table, statement in SUMMARY_REFRESH.items():
+                    cur.execute(f'DELETE FROM public.{table} WHERE last_run = %s', (last_run,))
+                    cur.execute(statement, {'last_run': last_run})
+                    rows[table] = cur.rowcount
+        except (psycopg2.Error) as error:
+            print(f"Failed to refresh the summary tables: {error}")
+        return rows
 
 
     def count_disctinct_items(self, site_id:str, category_id:str, last_run:str) -> dict:
@@ -179,32 +864,458 @@ class Client():
                 A dict
         """
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password)
-            cur = conn.cursor()
-            postgres_read_query = """
-                SELECT 
-                    COUNT(*) 
-                FROM (
-                    SELECT 
-                        DISTINCT site_id, item_id, category_id, last_run, item_json->>'order_backend' as order_backend 
-                    FROM public.items 
-                        WHERE site_id = %s AND category_id = %s AND last_run = %s
-                ) AS temp;
-            """
-            cur.execute(postgres_read_query, (site_id, category_id, last_run))
-            rows = cur.fetchone()
-            return rows[0]
+            with self.connection() as conn, conn.cursor() as cur:
+                self._prepare(conn, 'count_distinct_items')
+                cur.execute('EXECUTE count_distinct_items (%s,%s,%s)', (site_id, category_id, last_run))
+                rows = cur.fetchone()
+                return rows[0]
         except (psycopg2.Error) as error:
             print(f"Failed to read data from table 'items': {error}")
-        finally:
-            if conn:
-                cur.close()
-                conn.close()
 
-    def _create_tables(self):
-        """Create the necessary tables and indexes"""
-        raise NotImplementedError('This function has not been implemented yet.')
+    def migrate(self, batch_size:int=10000) -> bool:
+        """Creates the missing tables and migrates older schemas online, see _create_tables.
+            Args:
+                batch_size:
+            Returns:
+                Whether the migration finished
+        """
+        try:
+            self._create_tables(batch_size)
+            return True
+        except (psycopg2.Error) as error:
+            print(f"Failed to migrate the database: {error}")
+            return False
+
+    def _create_tables(self, batch_size:int=10000) -> None:
+        """Create the necessary tables and indexes. Existing json columns are
+        migrated to jsonb first, then the seller columns are added, existing
+        unpartitioned tables are turned into partitioned ones and everything
+        is indexed. Running it again is a no-op.
+            Args:
+                batch_size: Pages backfilled per transaction when migrating to jsonb,
+                    and duplicated rows deleted per transaction before partitioning.
+            Returns:
+                None
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            for statement in TABLES.values():
+                cur.execute(statement)
+            for statement in SUMMARY_TABLES.values():
+                cur.execute(statement)
+
+        for table, column in JSONB_COLUMNS.items():
+            self._migrate_to_jsonb(table, column, batch_size)
+
+        self._add_item_columns(batch_size)
+
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT column_name FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = 'items';
+            """)
+            existing = {row[0] for row in cur.fetchall()}
+            obsolete = [name for name, _, _ in OBSOLETE_ITEM_COLUMNS if name in existing]
+
+        if obsolete:
+            self._backfill_sellers()
+            with self.connection() as conn, conn.cursor() as cur:
+                # Dropping columns only updates the catalog, the table is not rewritten.
+                cur.execute('ALTER TABLE public.items ' + ', '.join(
+                    f'DROP COLUMN IF EXISTS {name}' for name in obsolete))
+
+        for table in PARTITIONED_TABLES:
+            self._partition_table(table, batch_size)
+
+        with self._autocommit() as cur:
+            # A failed concurrent build leaves an invalid index that IF NOT EXISTS would skip.
+            cur.execute("""
+                SELECT x.indexrelid::regclass::text FROM pg_index AS x
+                    JOIN pg_class AS c ON c.oid = x.indexrelid
+                    WHERE NOT x.indisvalid AND c.relkind = 'i' AND x.indrelid IN (
+                        SELECT inhrelid FROM pg_inherits WHERE inhparent = 'public.items'::regclass
+                        UNION ALL SELECT 'public.items'::regclass);
+            """)
+            for (index,) in cur.fetchall():
+                cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index}')
+            for index, (table, definition) in INDEXES.items():
+                self._create_index(cur, index, table, definition)
+
+    @staticmethod
+    def _create_index(cur, index:str, table:str, definition:str) -> None:
+        if Client._relkind(cur, table) != 'p':
+            cur.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON public.{table} {definition}')
+            return
+        # Partitioned tables cannot be indexed concurrently. The parent index is created
+        # empty and each partition's index is built concurrently and attached to it.
+        cur.execute(f'CREATE INDEX IF NOT EXISTS {index} ON ONLY public.{table} {definition}')
+        cur.execute("""
+            SELECT p.relname FROM pg_inherits AS i
+                JOIN pg_class AS p ON p.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass AND NOT EXISTS (
+                    SELECT 1 FROM pg_inherits AS ii
+                        JOIN pg_index AS x ON x.indexrelid = ii.inhrelid
+                        WHERE ii.inhparent = %s::regclass AND x.indrelid = p.oid);
+        """, (f'public.{table}', index))
+        for (partition,) in cur.fetchall():
+            partition_index = f'{partition}_{index}'[:63]
+            cur.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} ON public.{partition} {definition}')
+            cur.execute(f'ALTER INDEX {index} ATTACH PARTITION {partition_index}')
+
+    @staticmethod
+    def _relkind(cur, table:str) -> str|None:
+        cur.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', (f'public.{table}',))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _partitions(cur, table:str) -> list[tuple[str, date, date]]:
+        cur.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits AS i
+                JOIN pg_class AS c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+                ORDER BY c.relname;
+        """, (f'public.{table}',))
+        partitions = []
+        for name, bound in cur.fetchall():
+            match = _PARTITION_BOUND.search(bound)
+            if match:
+                partitions.append(
+                    (name, date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))))
+        return partitions
+
+    def _partition_table(self, table:str, batch_size:int=10000) -> None:
+        """Turns an unpartitioned table into a table partitioned by last_run. The old
+        table is kept as a single partition covering every day it holds, attached
+        without a scan thanks to a CHECK constraint validated beforehand. A table
+        without the primary key of the partitioned one is deduplicated one day at a
+        time and given a unique index built concurrently, so attaching does not
+        build it under the lock. The old table is removed by the retention policy
+        once all its days have expired. Running it again resumes where it stopped.
+            Args:
+                table:
+                batch_size: Rows deleted per transaction when deduplicating.
+            Returns:
+                None
+        """
+        legacy = f'{table}_legacy'
+        key = PRIMARY_KEYS.get(table, ())
+        with self.connection() as conn, conn.cursor() as cur:
+            if self._relkind(cur, table) != 'r':
+                return
+            cur.execute("""
+                SELECT pg_get_constraintdef(oid) FROM pg_constraint
+                    WHERE conrelid = %s::regclass AND conname = %s;
+            """, (f'public.{table}', f'{legacy}_last_run'))
+            row = cur.fetchone()
+            if row is not None:
+                # Left by an earlier run, which may have stopped before attaching.
+                first_day, upper = (date.fromisoformat(day) for day in _CHECK_BOUND.search(row[0]).groups())
+            else:
+                cur.execute(f'SELECT MIN(last_run), MAX(last_run) FROM public.{table}')
+                first_day, last_day = cur.fetchone()
+                first_day = first_day or date.today()
+                upper = (last_day or first_day) + timedelta(days=1)
+                # The key columns are checked too, so setting them NOT NULL needs no scan.
+                not_null = ''.join(f'{column} IS NOT NULL AND ' for column in key if column != 'last_run')
+                cur.execute(f"""
+                    ALTER TABLE public.{table} ADD CONSTRAINT {legacy}_last_run CHECK (
+                        {not_null}last_run IS NOT NULL AND last_run >= %s AND last_run < %s) NOT VALID;
+                """, (first_day, upper))
+            cur.execute("""
+                SELECT 1 FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p';
+            """, (f'public.{table}',))
+            has_key = cur.fetchone() is not None
+
+        with self.connection() as conn, conn.cursor() as cur:
+            # Validating takes a lock that still allows reads and writes.
+            cur.execute(f'ALTER TABLE public.{table} VALIDATE CONSTRAINT {legacy}_last_run')
+
+        key_index = f'{table}_key'
+        if key and not has_key:
+            self._deduplicate(table, key, batch_size)
+
+        with self._autocommit() as cur:
+            # Built before attaching, which would otherwise build them under an exclusive lock.
+            for index, (indexed_table, definition) in INDEXES.items():
+                if indexed_table == table:
+                    self._create_index(cur, index, table, definition)
+            if key and not has_key:
+                # A failed concurrent build leaves an invalid index that IF NOT EXISTS would skip.
+                cur.execute("""
+                    SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%s) AND NOT indisvalid;
+                """, (f'public.{key_index}',))
+                if cur.fetchone() is not None:
+                    cur.execute(f'DROP INDEX CONCURRENTLY public.{key_index}')
+                cur.execute(f"""
+                    CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {key_index}
+                        ON public.{table} ({', '.join(key)});
+                """)
+
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                LOCK TABLE public.{table} IN ACCESS EXCLUSIVE MODE;
+                ALTER TABLE public.{table} {', '.join(
+                    f'ALTER COLUMN {column} SET NOT NULL' for column in key or ('last_run',))};
+            """)
+            if key and not has_key:
+                # Turns the unique index into the key without building anything.
+                cur.execute(
+                    f'ALTER TABLE public.{table} ADD CONSTRAINT {table}_pkey PRIMARY KEY USING INDEX {key_index}')
+            cur.execute("""
+                SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass;
+            """, (f'public.{table}',))
+            indexes = [row[0] for row in cur.fetchall()]
+            cur.execute(f'ALTER TABLE public.{table} RENAME TO {legacy}')
+            for index in indexes:
+                cur.execute(f'ALTER INDEX {index} RENAME TO {f"{legacy}_{index}"[:63]}')
+            cur.execute(TABLES[table])
+            if table == 'items' and self._item_columns(cur, legacy, generated=False):
+                # The columns of a partition must be generated exactly when the parent's are.
+                cur.execute('ALTER TABLE public.items ' + ', '.join(
+                    f'ALTER COLUMN {name} DROP EXPRESSION' for name, _, _ in ITEM_GENERATED_COLUMNS))
+                cur.execute(f'DROP TRIGGER IF EXISTS items_generated_columns ON public.{legacy}')
+                # Cloned to every partition, the old table included once attached.
+                cur.execute(ITEM_COLUMNS_TRIGGER.format(table='items'))
+            # Attaching reuses the equivalent indexes the old table already has.
+            for index, (indexed_table, definition) in INDEXES.items():
+                if indexed_table == table:
+                    cur.execute(f'CREATE INDEX IF NOT EXISTS {index} ON ONLY public.{table} {definition}')
+            cur.execute(f"""
+                ALTER TABLE public.{table} ATTACH PARTITION public.{legacy}
+                    FOR VALUES FROM (%s) TO (%s);
+            """, (first_day, upper))
+
+    @staticmethod
+    def _item_columns(cur, table:str, generated:bool) -> list[str]:
+        """Returns which ITEM_GENERATED_COLUMNS of a table are generated, or plain."""
+        cur.execute("""
+            SELECT attname FROM pg_attribute
+                WHERE attrelid = %s::regclass AND attname = ANY(%s) AND (attgenerated = 's') = %s
+                    AND NOT attisdropped;
+        """, (f'public.{table}', [name for name, _, _ in ITEM_GENERATED_COLUMNS], generated))
+        return [row[0] for row in cur.fetchall()]
+
+    def _add_item_columns(self, batch_size:int=10000) -> None:
+        """Adds the ITEM_GENERATED_COLUMNS missing from an existing items table as plain
+        columns, which only updates the catalog. A trigger fills them for new writes
+        while existing rows are backfilled in short transactions, one range of pages
+        at a time. Running it again finishes an interrupted backfill.
+            Args:
+                batch_size: Pages backfilled per transaction.
+            Returns:
+                None
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT column_name FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = 'items';
+            """)
+            existing = {row[0] for row in cur.fetchall()}
+            missing = [column for column in ITEM_GENERATED_COLUMNS if column[0] not in existing]
+            if missing:
+                cur.execute('ALTER TABLE public.items ' + ', '.join(
+                    f'ADD COLUMN {name} {column_type}' for name, column_type, _ in missing))
+            if not self._item_columns(cur, 'items', generated=False):
+                return
+            cur.execute(ITEM_COLUMNS_TRIGGER.format(table='items'))
+            if self._relkind(cur, 'items') == 'p':
+                tables = [partition for partition, _, _ in self._partitions(cur, 'items')]
+            else:
+                tables = ['items']
+
+        assignments = ', '.join(f'{name} = {expression}' for name, _, expression in ITEM_GENERATED_COLUMNS)
+        stale = ' OR '.join(
+            f'({name} IS NULL AND {expression} IS NOT NULL)' for name, _, expression in ITEM_GENERATED_COLUMNS)
+        for table in tables:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute('SELECT pg_relation_size(%s) / current_setting(%s)::int',
+                            (f'public.{table}', 'block_size'))
+                pages = cur.fetchone()[0]
+            for start in range(0, pages, batch_size):
+                with self.connection() as conn, conn.cursor() as cur:
+                    cur.execute(f"""
+                        UPDATE public.{table} SET {assignments}
+                            WHERE ctid >= '({start},0)'::tid AND ctid < '({start + batch_size},0)'::tid
+                                AND ({stale});
+                    """)
+
+    def _deduplicate(self, table:str, key:tuple[str, ...], batch_size:int=10000) -> None:
+        """Deletes the rows of a table that repeat its key, keeping the one stored
+        last. Each day is deduplicated in its own transactions, deleting at most
+        `batch_size` rows in each.
+            Args:
+                table:
+                key: Columns that must be unique, last_run among them.
+                batch_size:
+            Returns:
+                None
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(f'SELECT DISTINCT last_run FROM public.{table}')
+            days = [row[0] for row in cur.fetchall()]
+        match = ' AND '.join(f'a.{column} = b.{column}' for column in key if column != 'last_run')
+        for day in days:
+            deleted = batch_size
+            while deleted == batch_size:
+                with self.connection() as conn, conn.cursor() as cur:
+                    cur.execute(f"""
+                        DELETE FROM public.{table} WHERE ctid IN (
+                            SELECT a.ctid FROM public.{table} AS a
+                                WHERE a.last_run = %s AND EXISTS (
+                                    SELECT 1 FROM public.{table} AS b
+                                        WHERE b.last_run = %s AND {match} AND b.ctid > a.ctid)
+                                LIMIT %s);
+                    """, (day, day, batch_size))
+                    deleted = cur.rowcount
+
+    def ensure_partitions(self, day:str|date) -> None:
+        """Creates the partitions of the partitioned tables that hold a given day,
+        unless one already covers it. Call it before loading data for a new day.
+            Args:
+                day: A date or an ISO formatted string.
+            Returns:
+                None
+        """
+        day = date.fromisoformat(day) if isinstance(day, str) else day
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                for table in PARTITIONED_TABLES:
+                    if self._relkind(cur, table) != 'p':
+                        continue
+                    if any(lower <= day < upper for _, lower, upper in self._partitions(cur, table)):
+                        continue
+                    cur.execute(f"""
+                        CREATE TABLE IF NOT EXISTS public.{table}_{day:%Y%m%d} PARTITION OF public.{table}
+                            FOR VALUES FROM (%s) TO (%s);
+                    """, (day, day + timedelta(days=1)))
+        except (psycopg2.Error) as error:
+            print(f"Failed to create partitions for {day}: {error}")
+
+    def apply_retention(self, today:str|date, retention_days:int, drop:bool=False) -> list[str]:
+        """Detaches the partitions whose days are all older than the retention period.
+        Detached partitions become ordinary tables that can be archived; with drop
+        they are deleted instead.
+            Args:
+                today: A date or an ISO formatted string.
+                retention_days: Number of days kept, today included.
+                drop: Whether to drop the detached partitions.
+            Returns:
+                The names of the expired partitions
+        """
+        today = date.fromisoformat(today) if isinstance(today, str) else today
+        cutoff = today - timedelta(days=retention_days - 1)
+        expired = []
+        try:
+            with self._autocommit() as cur:
+                for table in PARTITIONED_TABLES:
+                    if self._relkind(cur, table) != 'p':
+                        continue
+                    for partition, _, upper in self._partitions(cur, table):
+                        if upper > cutoff:
+                            continue
+                        # Detaching concurrently does not block queries on the other partitions.
+                        cur.execute(
+                            f'ALTER TABLE public.{table} DETACH PARTITION public.{partition} CONCURRENTLY')
+                        if drop:
+                            cur.execute(f'DROP TABLE public.{partition}')
+                        expired.append(partition)
+        except (psycopg2.Error) as error:
+            print(f"Failed to apply the retention policy: {error}")
+        return expired
+
+    def _backfill_sellers(self) -> None:
+        """Fills sellers_daily from the items stored with their full seller object,
+        one items partition per transaction.
+            Returns:
+                None
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            if self._relkind(cur, 'items') == 'p':
+                tables = [partition for partition, _, _ in self._partitions(cur, 'items')]
+            else:
+                tables = ['items']
+        for table in tables:
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute(f'SELECT DISTINCT last_run FROM public.{table}')
+                days = [row[0] for row in cur.fetchall()]
+            for day in days:
+                self.ensure_partitions(day)
+            with self.connection() as conn, conn.cursor() as cur:
+                cur.execute(SELLERS_BACKFILL.format(table=table))
+
+    @contextmanager
+    def _autocommit(self):
+        with self.connection() as conn:
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cur:
+                    yield cur
+            finally:
+                conn.autocommit = False
+
+    def _migrate_to_jsonb(self, table:str, column:str, batch_size:int=10000) -> None:
+        """Converts a json column to jsonb without holding a long lock. A trigger
+        keeps a shadow jsonb column in sync with new writes while existing rows are
+        backfilled in short transactions, one range of pages at a time; the columns
+        are then swapped in a brief transaction.
+            Args:
+                table:
+                column:
+                batch_size: Pages backfilled per transaction.
+            Returns:
+                None
+        """
+        shadow = f'{column}_jsonb'
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT data_type FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = %s AND column_name = %s;
+            """, (table, column))
+            row = cur.fetchone()
+            if row is None or row[0] != 'json':
+                return
+            cur.execute(f"""
+                ALTER TABLE public.{table} ADD COLUMN IF NOT EXISTS {shadow} jsonb;
+                CREATE OR REPLACE FUNCTION public.{table}_{shadow}_sync() RETURNS trigger AS $$
+                BEGIN
+                    NEW.{shadow} := NEW.{column}::jsonb;
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql;
+                DROP TRIGGER IF EXISTS {table}_{shadow}_sync ON public.{table};
+                CREATE TRIGGER {table}_{shadow}_sync BEFORE INSERT OR UPDATE ON public.{table}
+                    FOR EACH ROW EXECUTE FUNCTION public.{table}_{shadow}_sync();
+            """)
+            cur.execute('SELECT pg_relation_size(%s) / current_setting(%s)::int',
+                        (f'public.{table}', 'block_size'))
+            pages = cur.fetchone()[0]
+
+        for start in range(0, pages, batch_size):
+            with self.connection() as conn, conn.cursor() as cur:
+                # The trigger fills the shadow column of the updated rows.
+                cur.execute(f"""
+                    UPDATE public.{table} SET {column} = {column}
+                        WHERE ctid >= '({start},0)'::tid AND ctid < '({start + batch_size},0)'::tid
+                            AND {shadow} IS NULL AND {column} IS NOT NULL;
+                """)
+
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                LOCK TABLE public.{table} IN ACCESS EXCLUSIVE MODE;
+                DROP TRIGGER {table}_{shadow}_sync ON public.{table};
+                DROP FUNCTION public.{table}_{shadow}_sync();
+            """)
+            generated = self._item_columns(cur, table, generated=True) if table == 'items' else []
+            if generated:
+                # Generated columns computed from the old column would be dropped with it.
+                # Dropping their expression keeps the stored values without a rewrite, and
+                # the trigger fills them from then on.
+                cur.execute(f'ALTER TABLE public.{table} ' + ', '.join(
+                    f'ALTER COLUMN {name} DROP EXPRESSION' for name in generated))
+            cur.execute(f"""
+                ALTER TABLE public.{table} DROP COLUMN {column};
+                ALTER TABLE public.{table} RENAME COLUMN {shadow} TO {column};
+            """)
+            if generated:
+                cur.execute(ITEM_COLUMNS_TRIGGER.format(table=table))
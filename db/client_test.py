@@ -0,0 +1,360 @@
+"""
+This module aims to test the Client in module client. Connection pooling is
+tested with a fake pool; the merges run against the scratch database named by
+the test_host, test_database, test_user and test_password environment
+variables, and are skipped when test_database is not set. Never point them at
+the production database.
+"""
+import json
+import os
+import threading
+import time
+import unittest
+import psycopg2
+from client import Client
+
+TEST_DATABASE = os.environ.get('test_database')
+TEST_DAY = '2000-01-01'
+
+
+class FakeCursor():
+    """
+    Cursor whose execute fails when its connection is broken
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query):
+        if self.conn.broken:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FakeConnection():
+    """
+    The subset of a PooledConnection used by Client.connection
+    """
+
+    def __init__(self, closed=False, broken=False):
+        self.closed = closed
+        self.broken = broken
+        self.prepared = set()
+        self.staging = set()
+        self.last_used = time.monotonic()
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakePool():
+    """
+    Hands out `connections` first, then new healthy ones, and records what is given back
+    """
+
+    def __init__(self, connections=()):
+        self.connections = list(connections)
+        self.returned = []
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        with self.lock:
+            return self.connections.pop(0) if self.connections else FakeConnection()
+
+    def putconn(self, conn, close=False):
+        with self.lock:
+            self.returned.append((conn, close))
+
+
+def make_client(pool, **kwargs):
+    client = Client('localhost', 'meli', 'postgres', '', **kwargs)
+    client.pool = pool
+    return client
+
+
+class TestConnection(unittest.TestCase):
+    """
+    Test class for Client.connection
+    """
+
+    def test_connections_are_bounded_and_waits_counted(self):
+        client = make_client(FakePool(), maxconn=2)
+        in_use = []
+        max_in_use = []
+        lock = threading.Lock()
+
+        def work():
+            with client.connection():
+                with lock:
+                    in_use.append(1)
+                    max_in_use.append(len(in_use))
+                time.sleep(0.05)
+                with lock:
+                    in_use.pop()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = client.pool_stats()
+        self.assertEqual(max(max_in_use), 2)
+        self.assertEqual(stats['checkouts'], 4)
+        self.assertGreaterEqual(stats['max_wait_seconds'], 0.04)
+        self.assertGreater(stats['wait_seconds'], stats['max_wait_seconds'])
+        self.assertEqual(len(client.pool.returned), 4)
+
+    def test_closed_connection_is_discarded(self):
+        closed = FakeConnection(closed=True)
+        client = make_client(FakePool([closed]))
+        with client.connection() as conn:
+            self.assertIsNot(conn, closed)
+        self.assertEqual(client.pool.returned, [(closed, True), (conn, False)])
+        self.assertEqual(client.pool_stats()['health_check_failures'], 1)
+
+    def test_idle_broken_connection_is_discarded(self):
+        broken = FakeConnection(broken=True)
+        client = make_client(FakePool([broken]), health_check_interval=0)
+        with client.connection() as conn:
+            self.assertIsNot(conn, broken)
+        self.assertEqual(client.pool.returned[0], (broken, True))
+        self.assertEqual(client.pool_stats()['health_check_failures'], 1)
+
+    def test_failed_block_rolls_back(self):
+        client = make_client(FakePool())
+        with self.assertRaises(ValueError):
+            with client.connection() as conn:
+                conn.staging.add('items_staging')
+                raise ValueError('failed')
+        self.assertEqual((conn.commits, conn.rollbacks), (0, 1))
+        self.assertEqual(conn.staging, set())
+        self.assertEqual(client.pool.returned, [(conn, False)])
+        with client.connection() as conn:
+            pass
+        self.assertEqual(conn.commits, 1)
+
+
+@unittest.skipIf(TEST_DATABASE is None, 'test_database is not set')
+class TestMerges(unittest.TestCase):
+    """
+    Test class for the bulk merges, against a scratch database
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = Client(os.environ.get('test_host'), TEST_DATABASE, os.environ.get('test_user'),
+                        os.environ.get('test_password', ''), maxconn=1)
+        cls.db._create_tables()
+        cls.db.ensure_partitions(TEST_DAY)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+
+    def tearDown(self):
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute('DELETE FROM items WHERE last_run = %s', (TEST_DAY,))
+            cur.execute('DELETE FROM sellers_daily WHERE last_run = %s', (TEST_DAY,))
+
+    def item(self, item_id, title, category_id=1):
+        return ('MLB', item_id, TEST_DAY, category_id, json.dumps({'id': f'MLB{item_id}', 'title': title}))
+
+    def titles(self):
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT item_id, category_id, item_json ->> 'title' FROM items "
+                        "WHERE last_run = %s ORDER BY item_id", (TEST_DAY,))
+            return cur.fetchall()
+
+    def test_last_copy_of_an_item_wins(self):
+        self.db.insert_bulk_items([self.item(1, 'first'), self.item(2, 'first')])
+        self.db.insert_bulk_items([self.item(1, 'second', 2), self.item(1, 'third', 3)])
+        self.assertEqual(self.titles(), [(1, 3, 'third'), (2, 1, 'first')])
+
+    def test_last_copy_of_a_seller_wins(self):
+        def seller(level_id):
+            return ('MLB', 7, TEST_DAY, 'https://perfil.mercadolivre.com.br/7', '2020-01-01', level_id,
+                    None, 1, 1, 0, 1.0, 0.0, 0.0, 1, 0.0, 0, 0.0, 0, 0.0, 0)
+
+        self.db.insert_bulk_sellers([seller('1_red')])
+        self.db.insert_bulk_sellers([seller('5_green')])
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute('SELECT level_id FROM sellers_daily WHERE last_run = %s', (TEST_DAY,))
+            self.assertEqual(cur.fetchall(), [('5_green',)])
+
+    def test_staging_is_recreated_after_a_rollback(self):
+        # A fresh pool with maxconn=1, so every block below runs on one new connection
+        self.db.close()
+        with self.assertRaises(ValueError):
+            with self.db.connection() as conn:
+                self.db._create_staging(conn, 'items')
+                self.assertIn('items_staging', conn.staging)
+                raise ValueError('rolled back')
+        with self.db.connection() as conn, conn.cursor() as cur:
+            self.assertEqual(conn.staging, set())
+            cur.execute("SELECT to_regclass('pg_temp.items_staging')")
+            self.assertIsNone(cur.fetchone()[0])
+        self.db.insert_bulk_items([self.item(1, 'after rollback')])
+        self.assertEqual(self.titles(), [(1, 1, 'after rollback')])
+
+
+
+@unittest.skipIf(TEST_DATABASE is None, 'test_database is not set')
+class TestPartitionTable(unittest.TestCase):
+    """
+    Test class for Client._partition_table, against a scratch database
+    """
+
+    def setUp(self):
+        self.db = Client(os.environ.get('test_host'), TEST_DATABASE, os.environ.get('test_user'),
+                         os.environ.get('test_password', ''))
+        self.drop_items()
+        rows = [(1, '2024-01-01', 1), (1, '2024-01-01', 2), (1, '2024-01-01', 3), (2, '2024-01-01', 1),
+                (1, '2024-01-02', 1), (1, '2024-01-02', 2)]
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE public.items (
+                    site_id character(3), item_id bigint, last_run date, category_id bigint, item_json jsonb,
+                    seller_id bigint GENERATED ALWAYS AS ((item_json -> 'seller' ->> 'id')::bigint) STORED);
+            """)
+            for item_id, last_run, version in rows:
+                cur.execute('INSERT INTO public.items VALUES (%s, %s, %s, 1, %s)',
+                            ('MLB', item_id, last_run, json.dumps({'version': version})))
+
+    def tearDown(self):
+        self.drop_items()
+        self.db.close()
+
+    def drop_items(self):
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute('DROP TABLE IF EXISTS public.items, public.items_legacy CASCADE')
+
+    def constraints(self, table):
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute('SELECT conname, contype, convalidated FROM pg_constraint WHERE conrelid = %s::regclass '
+                        'ORDER BY conname', (f'public.{table}',))
+            return cur.fetchall()
+
+    def test_duplicates_are_removed_and_the_key_attached(self):
+        self.db._partition_table('items', batch_size=1)
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT last_run::text, item_id, item_json ->> 'version' FROM items ORDER BY 1, 2")
+            self.assertEqual(cur.fetchall(), [('2024-01-01', 1, '3'), ('2024-01-01', 2, '1'), ('2024-01-02', 1, '2')])
+            cur.execute("SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE relname = 'items_legacy'")
+            self.assertEqual(cur.fetchone()[0], "FOR VALUES FROM ('2024-01-01') TO ('2024-01-03')")
+        self.assertEqual(self.constraints('items_legacy'), [
+            ('items_legacy_items_pkey', 'p', True), ('items_legacy_last_run', 'c', True)])
+        self.db._partition_table('items')
+        self.assertEqual(self.constraints('items_legacy'), [
+            ('items_legacy_items_pkey', 'p', True), ('items_legacy_last_run', 'c', True)])
+
+    def test_resumes_with_an_existing_check_constraint(self):
+        # Left by a run that stopped before attaching, with bounds wider than the data
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                ALTER TABLE public.items ADD CONSTRAINT items_legacy_last_run CHECK (
+                    site_id IS NOT NULL AND item_id IS NOT NULL AND last_run IS NOT NULL
+                    AND last_run >= '2023-12-01' AND last_run < '2024-02-01') NOT VALID;
+            """)
+        self.db._partition_table('items')
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE relname = 'items_legacy'")
+            self.assertEqual(cur.fetchone()[0], "FOR VALUES FROM ('2023-12-01') TO ('2024-02-01')")
+            cur.execute('SELECT COUNT(*) FROM items')
+            self.assertEqual(cur.fetchone()[0], 3)
+
+
+
+@unittest.skipIf(TEST_DATABASE is None, 'test_database is not set')
+class TestCreateTables(unittest.TestCase):
+    """
+    Test class for the schema migrations run by Client.migrate, against a scratch
+    database whose public schema is dropped before each test
+    """
+
+    def setUp(self):
+        self.db = Client(os.environ.get('test_host'), TEST_DATABASE, os.environ.get('test_user'),
+                         os.environ.get('test_password', ''))
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute('DROP SCHEMA public CASCADE; CREATE SCHEMA public;')
+
+    def tearDown(self):
+        self.db.close()
+
+    def query(self, statement, params=None):
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute(statement, params)
+            return cur.fetchall()
+
+    def seller_id_columns(self):
+        return self.query("""
+            SELECT attrelid::regclass::text, attgenerated FROM pg_attribute
+                WHERE attname = 'seller_id' AND attrelid IN (
+                    SELECT oid FROM pg_class WHERE relname LIKE 'items%%' AND relkind IN ('r', 'p'))
+                ORDER BY 1;
+        """)
+
+    def triggers(self):
+        return self.query('SELECT tgrelid::regclass::text FROM pg_trigger WHERE NOT tgisinternal ORDER BY 1')
+
+    def test_new_tables_get_generated_columns(self):
+        self.assertTrue(self.db.migrate())
+        self.db.ensure_partitions(TEST_DAY)
+        self.assertEqual(self.seller_id_columns(), [('items', 's'), ('items_20000101', 's')])
+        self.assertEqual(self.triggers(), [])
+        self.assertTrue(self.db.migrate())
+
+    def test_legacy_table_is_migrated_without_a_rewrite(self):
+        rows = [(1, '{"seller": {"id": 5}}'), (1, '{"seller": {"id": 6}}'), (2, '{}')]
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE public.items (
+                    site_id character(3), item_id bigint, last_run date, category_id bigint, item_json json);
+            """)
+            for item_id, item_json in rows:
+                cur.execute("INSERT INTO public.items VALUES ('MLB', %s, '2024-01-01', 1, %s)", (item_id, item_json))
+        (filenode,), = self.query("SELECT pg_relation_filenode('public.items')")
+
+        self.assertTrue(self.db.migrate(batch_size=1))
+        self.db.ensure_partitions(TEST_DAY)
+        self.assertEqual(self.query("SELECT pg_relation_filenode('public.items_legacy')"), [(filenode,)])
+        self.assertEqual(self.query("""
+            SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'items' AND column_name = 'item_json';
+        """), [('jsonb',)])
+        self.assertEqual(self.seller_id_columns(),
+                         [('items', ''), ('items_20000101', ''), ('items_legacy', '')])
+        self.assertEqual(self.triggers(), [('items',), ('items_20000101',), ('items_legacy',)])
+        self.assertEqual(self.query('SELECT item_id, seller_id FROM items ORDER BY 1'), [(1, 6), (2, None)])
+
+        # New rows are filled by the trigger cloned from the parent
+        self.db.insert_bulk_items([('MLB', 3, TEST_DAY, 1, json.dumps({'seller': {'id': 7}}))])
+        self.assertEqual(self.query('SELECT seller_id FROM items_20000101'), [(7,)])
+        self.assertTrue(self.db.migrate())
+
+    def test_generated_columns_survive_the_jsonb_migration(self):
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE public.items (
+                    site_id character(3), item_id bigint, last_run date, category_id bigint, item_json json,
+                    seller_id bigint GENERATED ALWAYS AS ((item_json -> 'seller' ->> 'id')::bigint) STORED);
+                INSERT INTO public.items VALUES ('MLB', 1, '2024-01-01', 1, '{"seller": {"id": 5}}');
+            """)
+        self.assertTrue(self.db.migrate())
+        self.assertEqual(self.seller_id_columns(), [('items', ''), ('items_legacy', '')])
+        self.assertEqual(self.query('SELECT item_id, seller_id FROM items'), [(1, 5)])
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,153 @@
+"""COPY Streaming Module"""
+from __future__ import annotations
+from collections.abc import Callable, Iterable
+from datetime import date, datetime
+import io
+import struct
+
+
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+PG_EPOCH = date(2000, 1, 1)
+
+_TEXT_ESCAPES = (
+    (b'\\', b'\\\\'),
+    (b'\t', b'\\t'),
+    (b'\n', b'\\n'),
+    (b'\r', b'\\r'),
+)
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat().encode('ascii')
+    return str(value).encode('utf-8')
+
+
+def encode_text_row(record: tuple) -> bytes:
+    """Encodes a record as one line of the COPY text format.
+        Args:
+            record:
+        Returns:
+            A bytes object
+    """
+    fields = []
+    for value in record:
+        if value is None:
+            fields.append(b'\\N')
+            continue
+        field = _to_bytes(value)
+        for char, escaped in _TEXT_ESCAPES:
+            if char in field:
+                field = field.replace(char, escaped)
+        fields.append(field)
+    return b'\t'.join(fields) + b'\n'
+
+
+def _encode_date(value) -> bytes:
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    elif isinstance(value, datetime):
+        value = value.date()
+    return struct.pack('>i', (value - PG_EPOCH).days)
+
+
+BINARY_ENCODERS = {
+    'text': _to_bytes,
+    'json': _to_bytes,
+    'jsonb': lambda value: b'\x01' + _to_bytes(value),
+    'int4': lambda value: struct.pack('>i', int(value)),
+    'int8': lambda value: struct.pack('>q', int(value)),
+    'float8': lambda value: struct.pack('>d', float(value)),
+    'bool': lambda value: b'\x01' if value else b'\x00',
+    'date': _encode_date,
+}
+
+
+def binary_row_encoder(types: Iterable[str]) -> Callable[[tuple], bytes]:
+    """Returns a function that encodes a record as one tuple of the COPY binary format.
+        Args:
+            types: The PostgreSQL type of each column, one of BINARY_ENCODERS.
+        Returns:
+            A function
+    """
+    encoders = [BINARY_ENCODERS[column_type] for column_type in types]
+    field_count = struct.pack('>h', len(encoders))
+
+    def encode(record: tuple) -> bytes:
+        parts = [field_count]
+        for encoder, value in zip(encoders, record):
+            if value is None:
+                parts.append(b'\xff\xff\xff\xff')
+            else:
+                field = encoder(value)
+                parts.append(struct.pack('>i', len(field)))
+                parts.append(field)
+        return b''.join(parts)
+
+    return encode
+
+
+class CopyStream(io.RawIOBase):
+    """
+    Read-only file object that encodes records only as COPY asks for them,
+    so an iterator of any length is streamed through a buffer of about
+    `buffer_size` bytes.
+    """
+
+    def __init__(self, records: Iterable[tuple], encode: Callable[[tuple], bytes],
+                 header: bytes = b'', trailer: bytes = b'', buffer_size: int = 1 << 20) -> None:
+        super().__init__()
+        self.records = iter(records)
+        self.encode = encode
+        self.trailer = trailer
+        self.buffer_size = buffer_size
+        self.rows = 0
+        self._buffer = bytearray(header)
+        self._exhausted = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self, size: int) -> None:
+        while len(self._buffer) < size and not self._exhausted:
+            record = next(self.records, None)
+            if record is None:
+                self._buffer += self.trailer
+                self._exhausted = True
+            else:
+                self._buffer += self.encode(record)
+                self.rows += 1
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.buffer_size
+        self._fill(size)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
+
+    def readinto(self, buffer) -> int:
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def copy_stream(records: Iterable[tuple], types: Iterable[str], copy_format: str = 'text',
+                buffer_size: int = 1 << 20) -> CopyStream:
+    """Returns a CopyStream that encodes records in the given COPY format.
+        Args:
+            records:
+            types: The PostgreSQL type of each column, used by the binary format.
+            copy_format: 'text' or 'binary'.
+            buffer_size:
+        Returns:
+            A CopyStream
+    """
+    if copy_format == 'binary':
+        return CopyStream(records, binary_row_encoder(types), PGCOPY_HEADER, PGCOPY_TRAILER, buffer_size)
+    if copy_format == 'text':
+        return CopyStream(records, encode_text_row, buffer_size=buffer_size)
+    raise ValueError(f'Unsupported COPY format: {copy_format}')
@@ -0,0 +1,54 @@
+"""
+This module aims to test the encoders in module copy_loader
+"""
+import struct
+import unittest
+from datetime import date
+from copy_loader import PGCOPY_HEADER, PGCOPY_TRAILER, binary_row_encoder, copy_stream, encode_text_row
+
+
+class TestCopyLoader(unittest.TestCase):
+    """
+    Test class for module copy_loader
+    """
+
+    def test_text_row_escapes_special_characters(self):
+        row = encode_text_row(('MLB', 123, None, b'{"t": "a\\\\b\tc\nd"}'))
+        self.assertEqual(row, b'MLB\t123\t\\N\t{"t": "a\\\\\\\\b\\tc\\nd"}\n')
+
+    def test_text_row_dates(self):
+        self.assertEqual(encode_text_row((date(2022, 7, 1),)), b'2022-07-01\n')
+
+    def test_binary_row(self):
+        encode = binary_row_encoder(('text', 'int8', 'date', 'jsonb', 'json'))
+        row = encode(('MLB', '123', '2000-01-02', b'{}', None))
+        expected = b''.join([
+            struct.pack('>h', 5),
+            struct.pack('>i', 3), b'MLB',
+            struct.pack('>i', 8), struct.pack('>q', 123),
+            struct.pack('>i', 4), struct.pack('>i', 1),
+            struct.pack('>i', 3), b'\x01{}',
+            struct.pack('>i', -1),
+        ])
+        self.assertEqual(row, expected)
+
+    def test_stream_reads_generator_in_chunks(self):
+        records = ((str(i), i) for i in range(1000))
+        stream = copy_stream(records, ('text', 'int8'), 'binary', buffer_size=64)
+        chunks = []
+        while True:
+            chunk = stream.read(64)
+            if not chunk:
+                break
+            self.assertLessEqual(len(chunk), 64)
+            chunks.append(chunk)
+        data = b''.join(chunks)
+        self.assertEqual(stream.rows, 1000)
+        self.assertTrue(data.startswith(PGCOPY_HEADER))
+        self.assertTrue(data.endswith(PGCOPY_TRAILER))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            copy_stream([], (), 'csv')
+
+unittest.main(argv=[''], verbosity=2, exit=False)
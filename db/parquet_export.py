@@ -0,0 +1,212 @@
+"""Parquet Export Module"""
+from __future__ import annotations
+from datetime import date
+import os
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+ITEMS_QUERY = """
+    SELECT
+        i.site_id,
+        i.category_id,
+        i.item_id,
+        i.last_run,
+        i.item_json ->> 'title',
+        (i.item_json ->> 'price')::double precision,
+        (i.item_json ->> 'original_price')::double precision,
+        i.item_json ->> 'currency_id',
+        (i.item_json ->> 'sold_quantity')::bigint,
+        (i.item_json ->> 'available_quantity')::bigint,
+        i.item_json ->> 'condition',
+        i.item_json ->> 'listing_type_id',
+        i.seller_id,
+        s.level_id,
+        s.power_seller_status,
+        s.transactions_completed,
+        s.ratings_positive,
+        s.sales_completed,
+        s.claims_rate,
+        s.cancellations_rate,
+        i.item_json::text
+    FROM public.items AS i
+    LEFT JOIN public.sellers_daily AS s USING (site_id, seller_id, last_run)
+    WHERE i.last_run = %s
+    ORDER BY i.site_id, i.category_id;
+"""
+
+CATEGORIES_QUERY = """
+    SELECT
+        site_id,
+        category_id,
+        last_run,
+        category_json ->> 'name',
+        (category_json ->> 'total_items_in_this_category')::bigint,
+        jsonb_array_length(COALESCE(category_json -> 'children_categories', '[]'::jsonb)),
+        category_json::text
+    FROM public.categories
+    WHERE last_run = %s
+    ORDER BY site_id;
+"""
+
+# Column names and pyarrow type names, in the order of the queries.
+ITEM_COLUMNS = (
+    ('site_id', 'string'), ('category_id', 'int64'), ('item_id', 'int64'), ('last_run', 'date32'),
+    ('title', 'string'), ('price', 'float64'), ('original_price', 'float64'), ('currency_id', 'string'),
+    ('sold_quantity', 'int64'), ('available_quantity', 'int64'), ('condition', 'string'),
+    ('listing_type_id', 'string'), ('seller_id', 'int64'), ('seller_level_id', 'string'),
+    ('seller_power_seller_status', 'string'), ('seller_transactions_completed', 'int64'),
+    ('seller_ratings_positive', 'float64'), ('seller_sales_completed', 'int64'),
+    ('seller_claims_rate', 'float64'), ('seller_cancellations_rate', 'float64'), ('item_json', 'string'),
+)
+
+CATEGORY_COLUMNS = (
+    ('site_id', 'string'), ('category_id', 'int64'), ('last_run', 'date32'), ('name', 'string'),
+    ('total_items_in_this_category', 'int64'), ('children_categories', 'int64'),
+    ('category_json', 'string'),
+)
+
+
+def schema(columns: tuple[tuple[str, str], ...]):
+    """Returns the pyarrow schema of a column list.
+        Args:
+            columns: Pairs of column name and pyarrow type name.
+        Returns:
+            A pyarrow.Schema
+    """
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in columns])
+
+
+def to_table(rows: list[tuple], table_schema, indexes: list[int] | None = None):
+    """Converts rows fetched from the database into a pyarrow Table.
+        Args:
+            rows:
+            table_schema:
+            indexes: Position in the rows of each column of the schema, if not all of them.
+        Returns:
+            A pyarrow.Table
+    """
+    indexes = range(len(table_schema)) if indexes is None else indexes
+    return pa.Table.from_arrays(
+        [pa.array([row[i] for row in rows], type=field.type) for i, field in zip(indexes, table_schema)],
+        schema=table_schema)
+
+
+def partition_path(root: str, dataset: str, last_run: str | date, **keys) -> str:
+    """Returns the Hive style directory of a partition, e.g.
+    root/items/last_run=2022-07-01/site_id=MLB/category_id=1384.
+        Args:
+            root:
+            dataset:
+            last_run:
+            keys: Partition columns and their values, outermost first.
+        Returns:
+            A string
+    """
+    parts = [root, dataset, f'last_run={last_run}']
+    parts += [f'{key}={value}' for key, value in keys.items()]
+    return os.path.join(*parts)
+
+
+class ParquetExporter():
+    """
+    Exports the items and categories of one run to Parquet files partitioned by
+    site and category, for analysis outside the production database.
+
+    Rows are read through a server-side cursor `batch_size` at a time and only
+    one file is open at any moment, so memory use does not grow with the size
+    of the run. Seller and price fields are flattened into typed columns; the
+    raw JSON document is kept in its own column compressed with
+    `json_compression`.
+    """
+
+    def __init__(self, client, path: str, batch_size: int = 10000, compression: str = 'snappy',
+                 json_compression: str = 'zstd') -> None:
+        if pa is None:
+            raise ImportError('pyarrow is required to export Parquet files')
+        self.client = client
+        self.path = path
+        self.batch_size = batch_size
+        self.compression = compression
+        self.json_compression = json_compression
+
+    def export(self, last_run: str | date) -> dict[str, int]:
+        """Exports the items and categories of a run.
+            Args:
+                last_run:
+            Returns:
+                A dict with the number of rows exported per dataset
+        """
+        return {
+            'items': self.export_items(last_run),
+            'categories': self.export_categories(last_run),
+        }
+
+    def export_items(self, last_run: str | date) -> int:
+        """Exports the items of a run, one file per site and category.
+            Args:
+                last_run:
+            Returns:
+                The number of rows exported
+        """
+        return self._export(
+            'items', ITEMS_QUERY, last_run, schema(ITEM_COLUMNS), ('site_id', 'category_id'), 'item_json')
+
+    def export_categories(self, last_run: str | date) -> int:
+        """Exports the categories of a run, one file per site.
+            Args:
+                last_run:
+            Returns:
+                The number of rows exported
+        """
+        return self._export(
+            'categories', CATEGORIES_QUERY, last_run, schema(CATEGORY_COLUMNS), ('site_id',),
+            'category_json')
+
+    def _export(self, dataset: str, query: str, last_run: str | date, table_schema,
+                partition_by: tuple[str, ...], json_column: str) -> int:
+        key_indexes = [table_schema.names.index(name) for name in partition_by]
+        # Partition columns are encoded in the directory names and left out of the files.
+        indexes = [i for i, name in enumerate(table_schema.names)
+                   if name != 'last_run' and name not in partition_by]
+        file_schema = pa.schema([table_schema.field(i) for i in indexes])
+        compression = {name: self.compression for name in file_schema.names}
+        compression[json_column] = self.json_compression
+        exported = 0
+        writer, current_key = None, None
+        try:
+            with self.client.connection() as conn, conn.cursor(name=f'export_{dataset}') as cur:
+                cur.itersize = self.batch_size
+                cur.execute(query, (last_run,))
+                while True:
+                    rows = cur.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    # Rows arrive sorted by the partition columns, so each partition
+                    # is a run of consecutive rows and only its writer is kept open.
+                    start = 0
+                    for index, row in enumerate(rows):
+                        key = tuple(row[i] for i in key_indexes)
+                        if key == current_key:
+                            continue
+                        if index > start:
+                            writer.write_table(to_table(rows[start:index], file_schema, indexes))
+                        if writer is not None:
+                            writer.close()
+                        directory = partition_path(
+                            self.path, dataset, last_run, **dict(zip(partition_by, key)))
+                        os.makedirs(directory, exist_ok=True)
+                        writer = pq.ParquetWriter(
+                            os.path.join(directory, 'part-0.parquet'), file_schema,
+                            compression=compression)
+                        current_key, start = key, index
+                    writer.write_table(to_table(rows[start:], file_schema, indexes))
+                    exported += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+        return exported
@@ -0,0 +1,124 @@
+"""
+This module aims to test module parquet_export, with a fake database client
+"""
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import date
+from parquet_export import CATEGORY_COLUMNS, ParquetExporter, pa, partition_path, pq, schema, to_table
+
+
+class TestParquetExport(unittest.TestCase):
+    """
+    Test class for module parquet_export
+    """
+
+    def test_partition_path(self):
+        path = partition_path('exports', 'items', '2022-07-01', site_id='MLB', category_id=1384)
+        self.assertEqual(path, 'exports/items/last_run=2022-07-01/site_id=MLB/category_id=1384')
+
+    @unittest.skipIf(pa is None, 'pyarrow is not installed')
+    def test_to_table_keeps_the_selected_columns(self):
+        rows = [
+            ('MLB', 1384, date(2022, 7, 1), 'Bebês', 10, 2, '{"id": "MLB1384"}'),
+            ('MLB', 1385, date(2022, 7, 1), None, None, 0, '{}'),
+        ]
+        table_schema = schema(CATEGORY_COLUMNS)
+        file_schema = pa.schema([table_schema.field(i) for i in (1, 3, 4)])
+        table = to_table(rows, file_schema, [1, 3, 4])
+        self.assertEqual(table.schema, file_schema)
+        self.assertEqual(table.to_pylist(), [
+            {'category_id': 1384, 'name': 'Bebês', 'total_items_in_this_category': 10},
+            {'category_id': 1385, 'name': None, 'total_items_in_this_category': None},
+        ])
+
+
+class FakeCursor():
+    """
+    Named cursor returning `rows` in fetchmany batches
+    """
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.batches = []
+
+    def execute(self, query, params):
+        self.params = params
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        self.batches.append(len(batch))
+        return batch
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FakeClient():
+    """
+    The subset of db.client.Client used by ParquetExporter
+    """
+
+    def __init__(self, rows):
+        self.named_cursor = FakeCursor(rows)
+        self.cursor_names = []
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def cursor(self, name=None):
+        self.cursor_names.append(name)
+        return self.named_cursor
+
+
+@unittest.skipIf(pa is None, 'pyarrow is not installed')
+class TestParquetExporter(unittest.TestCase):
+    """
+    Test class for ParquetExporter
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'exports')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def category(self, site_id, category_id):
+        return (site_id, category_id, date(2022, 7, 1), f'Category {category_id}', 10, 0, '{}')
+
+    def read(self, site_id):
+        directory = partition_path(self.path, 'categories', '2022-07-01', site_id=site_id)
+        self.assertEqual(os.listdir(directory), ['part-0.parquet'])
+        return pq.read_table(os.path.join(directory, 'part-0.parquet'))
+
+    def test_partition_split_across_batches(self):
+        rows = [self.category('MLA', 1), self.category('MLB', 2), self.category('MLB', 3),
+                self.category('MLB', 4), self.category('MLM', 5)]
+        client = FakeClient(rows)
+        exporter = ParquetExporter(client, self.path, batch_size=2)
+        self.assertEqual(exporter.export_categories('2022-07-01'), 5)
+        self.assertEqual(client.cursor_names, ['export_categories'])
+        self.assertEqual(client.named_cursor.batches, [2, 2, 1, 0])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.path, 'categories', 'last_run=2022-07-01'))),
+                         ['site_id=MLA', 'site_id=MLB', 'site_id=MLM'])
+        mlb = self.read('MLB')
+        self.assertEqual(mlb.num_rows, 3)
+        self.assertEqual(mlb.column('category_id').to_pylist(), [2, 3, 4])
+        self.assertNotIn('site_id', mlb.schema.names)
+        self.assertNotIn('last_run', mlb.schema.names)
+        self.assertEqual(self.read('MLA').num_rows, 1)
+        self.assertEqual(self.read('MLM').num_rows, 1)
+
+    def test_empty_run_writes_nothing(self):
+        exporter = ParquetExporter(FakeClient([]), self.path)
+        self.assertEqual(exporter.export_categories('2022-07-01'), 0)
+        self.assertFalse(os.path.exists(self.path))
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,151 @@
+"""Write-Behind Sink Module"""
+from __future__ import annotations
+from collections.abc import Callable, Iterable
+import queue
+import threading
+import time
+
+
+_STOP = object()
+_FLUSH = object()
+
+
+class WriteBehindSink():
+    """
+    Buffers records pushed by the crawl threads and writes them from background
+    writer threads, so fetching and writing overlap.
+
+    Records pushed with put() are coalesced into batches of up to `batch_size`
+    records; a batch is written as soon as it is full or its oldest records are
+    `max_age` seconds old. At most `max_pending` put() calls can wait to be
+    written; further calls block until the writers catch up. close() writes
+    everything that was pushed before returning.
+    """
+
+    def __init__(self, write: Callable[[list[tuple]], None], batch_size: int = 5000,
+                 max_age: float = 1.0, max_pending: int = 64, writers: int = 1) -> None:
+        self.write = write
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.records = 0
+        self.batches = 0
+        self.failures = 0
+        self.blocked_time = 0.0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        # Makes every writer take exactly one of the markers queued by flush().
+        self._flush_barrier = threading.Barrier(writers)
+        self._threads = [
+            threading.Thread(target=self._run, name=f'sink-writer-{i}', daemon=True)
+            for i in range(writers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> WriteBehindSink:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def put(self, records: Iterable[tuple], on_written: Callable[[], None] | None = None) -> None:
+        """Queues records to be written, blocking while the queue is full.
+            Args:
+                records:
+                on_written: Called from a writer thread once the records are written.
+            Returns:
+                None
+        """
+        if self._closed:
+            raise RuntimeError('The sink is closed')
+        started_at = time.monotonic()
+        self._queue.put((list(records), on_written))
+        blocked = time.monotonic() - started_at
+        with self._lock:
+            self.blocked_time += blocked
+
+    def flush(self) -> None:
+        """Blocks until every record queued so far is written.
+            Returns:
+                None
+        """
+        for _ in self._threads:
+            self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self) -> None:
+        """Writes the pending records and stops the writer threads.
+            Returns:
+                None
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self) -> dict:
+        """Returns how much was written and how long producers were blocked
+            Returns:
+                A dict
+        """
+        with self._lock:
+            return {
+                'records': self.records,
+                'batches': self.batches,
+                'failures': self.failures,
+                'pending': self._queue.qsize(),
+                'blocked_seconds': self.blocked_time,
+            }
+
+    def _run(self) -> None:
+        batch, callbacks, taken = [], [], 0
+        started_at = None
+        while True:
+            timeout = None if started_at is None else max(0.0, started_at + self.max_age - time.monotonic())
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+            stop = entry is _STOP
+            flush = entry is _FLUSH
+            if entry is not None and not stop and not flush:
+                records, on_written = entry
+                batch.extend(records)
+                if on_written is not None:
+                    callbacks.append(on_written)
+                taken += 1
+                if started_at is None:
+                    started_at = time.monotonic()
+            if batch and (stop or flush or entry is None or len(batch) >= self.batch_size):
+                self._write(batch, callbacks)
+                batch, callbacks = [], []
+            if not batch:
+                # Entries are only marked done once written, which is what flush() waits for.
+                for on_written in callbacks:
+                    on_written()
+                for _ in range(taken):
+                    self._queue.task_done()
+                callbacks, taken, started_at = [], 0, None
+            if flush:
+                self._queue.task_done()
+                self._flush_barrier.wait()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _write(self, batch: list[tuple], callbacks: list[Callable[[], None]]) -> None:
+        try:
+            self.write(batch)
+        except Exception as error:  # pylint: disable=broad-except
+            with self._lock:
+                self.failures += 1
+            print(f'Failed to write {len(batch)} record(s): {error}')
+            return
+        with self._lock:
+            self.records += len(batch)
+            self.batches += 1
+        for on_written in callbacks:
+            on_written()
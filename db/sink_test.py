@@ -0,0 +1,75 @@
+"""
+This module aims to test the WriteBehindSink in module sink
+"""
+import threading
+import time
+import unittest
+from sink import WriteBehindSink
+
+
+class TestWriteBehindSink(unittest.TestCase):
+    """
+    Test class for module sink
+    """
+
+    def test_coalesces_by_size(self):
+        batches = []
+        sink = WriteBehindSink(batches.append, batch_size=10, max_age=60)
+        for i in range(5):
+            sink.put([(i, j) for j in range(4)])
+        sink.close()
+        self.assertEqual([len(batch) for batch in batches], [12, 8])
+        self.assertEqual(sink.stats()['records'], 20)
+
+    def test_writes_old_batches(self):
+        batches = []
+        sink = WriteBehindSink(batches.append, batch_size=1000, max_age=0.05)
+        sink.put([(1,)])
+        time.sleep(0.3)
+        self.assertEqual(batches, [[(1,)]])
+        sink.close()
+
+    def test_flush_and_callbacks(self):
+        batches, written = [], []
+        sink = WriteBehindSink(batches.append, batch_size=1000, max_age=60, writers=2)
+        sink.put([(1,)], lambda: written.append(1))
+        sink.put([], lambda: written.append(2))
+        sink.flush()
+        self.assertEqual(sorted(written), [1, 2])
+        self.assertEqual(batches, [[(1,)]])
+        sink.close()
+
+    def test_backpressure(self):
+        release = threading.Event()
+        sink = WriteBehindSink(lambda batch: release.wait(), batch_size=1, max_pending=1)
+        sink.put([(1,)])
+        sink.put([(2,)])
+        producer = threading.Thread(target=sink.put, args=([(3,)],))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+        release.set()
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        sink.close()
+        self.assertEqual(sink.stats()['records'], 3)
+
+    def test_failed_writes_skip_callbacks(self):
+        batches = []
+
+        def write(batch):
+            if batch[0][0] == 'bad':
+                raise ValueError('bad record')
+            batches.append(batch)
+
+        written = []
+        sink = WriteBehindSink(write, batch_size=1)
+        sink.put([('bad',)], lambda: written.append('bad'))
+        sink.put([('good',)], lambda: written.append('good'))
+        sink.close()
+        self.assertEqual(batches, [[('good',)]])
+        self.assertEqual(written, ['good'])
+        self.assertEqual(sink.stats()['failures'], 1)
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
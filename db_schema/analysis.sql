@@ -1,41 +1,35 @@
--- CREATE INDEX idx_btree_seller_id ON public.items USING BTREE ((item_json -> 'seller' ->> 'id'));
--- CREATE INDEX idx_btree_seller_transactions_completed ON public.items USING BTREE ((item_json -> 'seller' -> 'seller_reputation' -> 'transactions' ->> 'completed'));
--- CREATE INDEX idx_btree_order_backend on public.items USING BTREE ((item_json->>'order_backend'));
--- CREATE INDEX idx_items ON public.items USING BTREE (site_id, item_id, last_run, category_id, (item_json->>'order_backend'));
+-- Seller data is stored once per seller and run in sellers_daily, see sellers_daily.sql.
+-- Items reference it by (site_id, seller_id, last_run).
 
 -- SELECT * FROM public.items LIMIT 1;
 -- SELECT DISTINCT ON(site_id, item_id, last_run, category_id, item_json ->> 'id') * FROM public.items LIMIT 10;
 
 -- Informacoes uteis sobre os sellers
 SELECT
-item_json -> 'seller' ->> 'id' as seller_id,
-item_json -> 'seller' ->> 'registration_date' as registration_date,
-item_json -> 'seller' -> 'seller_reputation' ->> 'power_seller_status' as seller_status,
-item_json -> 'seller' -> 'seller_reputation' ->> 'level_id' as seller_level,
-item_json -> 'seller' -> 'seller_reputation' -> 'metrics' -> 'cancellations' ->> 'value' as cancellations_l60days,
-item_json -> 'seller' -> 'seller_reputation' -> 'metrics' -> 'claims' ->> 'value' as claims_l60days,
-item_json -> 'seller' -> 'seller_reputation' -> 'metrics' -> 'delayed_handling_time' ->> 'value' as delayed_handling_time_l60days,
-item_json -> 'seller' -> 'seller_reputation' -> 'metrics' -> 'sales' ->> 'completed' as sales_completed_l60days,
-item_json -> 'seller' -> 'seller_reputation' -> 'transactions' ->> 'canceled' as transactions_canceled_historic,
-item_json -> 'seller' -> 'seller_reputation' -> 'transactions' ->> 'completed' as transactions_completed_historic,
-item_json -> 'seller' -> 'seller_reputation' -> 'transactions' ->> 'total' as transactions_total_historic,
-item_json -> 'seller' -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'negative' as ratings_negative,
-item_json -> 'seller' -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'neutral' as ratings_neutral,
-item_json -> 'seller' -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'positive' as ratings_positive
-FROM (SELECT DISTINCT ON(site_id, item_id, last_run, category_id, item_json ->> 'id') * FROM public.items) AS d
+seller_id,
+registration_date,
+power_seller_status as seller_status,
+level_id as seller_level,
+cancellations_value as cancellations_l60days,
+claims_value as claims_l60days,
+delayed_handling_time_value as delayed_handling_time_l60days,
+sales_completed as sales_completed_l60days,
+transactions_canceled as transactions_canceled_historic,
+transactions_completed as transactions_completed_historic,
+transactions_total as transactions_total_historic,
+ratings_negative,
+ratings_neutral,
+ratings_positive
+FROM public.sellers_daily
 LIMIT 10;
 
 -- Sellers mais bem avaliados do Mercado Livre cadastrados antes de 2021
 SELECT 
-	item_json -> 'seller' ->> 'id',
-	AVG((item_json -> 'seller' -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'positive')::decimal) as avg_positive
-FROM (
-	SELECT 
-		DISTINCT ON (site_id, item_id, last_run, category_id) * 
-	FROM public.items 
-	WHERE item_json -> 'seller' ->> 'registration_date' < '2021-01-01'
-	) as dist
-GROUP BY (item_json -> 'seller' ->> 'id', item_json -> 'seller' -> 'seller_reputation' -> 'transactions' -> 'ratings' ->> 'positive')
+	seller_id,
+	AVG(ratings_positive) as avg_positive
+FROM public.sellers_daily
+WHERE registration_date < '2021-01-01'
+GROUP BY seller_id
 ORDER BY avg_positive DESC
 LIMIT 10;
 
@@ -55,14 +49,14 @@ LIMIT 10;
 
 -- Sellers que mais venderam no mercado livre no ultimos 60 dias
 SELECT
-	item_json -> 'seller' ->> 'id' as seller_id, 
-	COUNT(item_json -> 'seller' -> 'seller_reputation' -> 'metrics' -> 'sales' ->> 'completed') as sales_completed_l60days
-FROM (SELECT DISTINCT ON(site_id, item_id, last_run, category_id) * FROM public.items) as dist
-GROUP BY (item_json -> 'seller' ->> 'id')
-ORDER BY sales_completed_l60days DESC
+	seller_id,
+	sales_completed as sales_completed_l60days
+FROM public.sellers_daily
+WHERE last_run = (SELECT MAX(last_run) FROM public.sellers_daily)
+ORDER BY sales_completed_l60days DESC NULLS LAST
 LIMIT 10;
 
--- Resultado da consulta
+-- Resultado da consulta (numero de itens de cada seller, calculado antes de sellers_daily)
 -- "seller_id"	"sales_completed_l60days"
 -- "219324699"	338138
 -- "657293941"	184065
@@ -83,13 +77,10 @@ item_json ->> 'title' as title,
 item_json ->> 'price' as price,
 item_json ->> 'available_quantity' as available_quantity,
 (item_json ->> 'sold_quantity')::INTEGER as sold_quantity,
-item_json -> 'seller' ->> 'id' as seller_id,
-replace(item_json -> 'seller' ->> 'permalink', 'http://perfil.mercadolivre.com.br/', '') as seller_name
-FROM (
-	SELECT 
-		DISTINCT ON (site_id, item_id, last_run, category_id) * 
-	FROM public.items 
-) as dist
+i.seller_id,
+replace(s.permalink, 'http://perfil.mercadolivre.com.br/', '') as seller_name
+FROM public.items AS i
+LEFT JOIN public.sellers_daily AS s USING (site_id, seller_id, last_run)
 ORDER BY sold_quantity DESC
 LIMIT 100;
 
@@ -214,3 +205,31 @@ LIMIT 100;
 -- BRETZSAUDAVEIS
 -- EBENASHOP
 -- PERFUMARIA+EVAS
+
+
+-- Sellers com mais vendas nos ultimos 60 dias, a partir das tabelas de resumo (summaries.sql)
+SELECT
+	seller_id,
+	power_seller_status,
+	sales_completed,
+	items,
+	categories,
+	ratings_positive,
+	cancellations_rate
+FROM public.seller_summary_daily
+WHERE last_run = (SELECT MAX(last_run) FROM public.seller_summary_daily)
+ORDER BY sales_completed DESC NULLS LAST
+LIMIT 10;
+
+-- Evolucao diaria de cada categoria
+SELECT
+	last_run,
+	category_id,
+	items,
+	sellers,
+	power_sellers,
+	sold_quantity,
+	avg_price,
+	avg_ratings_positive
+FROM public.category_summary_daily
+ORDER BY category_id, last_run;
@@ -7,7 +7,7 @@ CREATE TABLE IF NOT EXISTS public.base_categories
     site_id character(3) COLLATE pg_catalog."default" NOT NULL,
     category_id bigint NOT NULL,
     last_run date NOT NULL,
-    category_json json
+    category_json jsonb
 )
 
 TABLESPACE pg_default;
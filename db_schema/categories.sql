@@ -6,11 +6,13 @@ CREATE TABLE IF NOT EXISTS public.categories
 (
     site_id character(3) COLLATE pg_catalog."default",
     category_id bigint,
-    last_run date,
-    category_json json
-)
+    last_run date NOT NULL,
+    category_json jsonb
+) PARTITION BY RANGE (last_run);
 
-TABLESPACE pg_default;
+-- One partition per day, created before each crawl by db.client.Client.ensure_partitions:
+-- CREATE TABLE IF NOT EXISTS public.categories_20240101 PARTITION OF public.categories
+--     FOR VALUES FROM ('2024-01-01') TO ('2024-01-02');
 
 ALTER TABLE IF EXISTS public.categories
     OWNER to postgres;
\ No newline at end of file
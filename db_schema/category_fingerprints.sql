@@ -0,0 +1,24 @@
+-- Table: public.category_fingerprints
+
+-- DROP TABLE IF EXISTS public.category_fingerprints;
+
+-- State of each category on each run: the number of results of its search,
+-- total_items_in_this_category and a hash of the id and price of its top
+-- results. An incremental run only crawls the categories whose fingerprint
+-- differs from the latest earlier one, and copies the items and sellers of the
+-- others from that run.
+CREATE TABLE IF NOT EXISTS public.category_fingerprints
+(
+    site_id character(3) COLLATE pg_catalog."default" NOT NULL,
+    category_id bigint NOT NULL,
+    last_run date NOT NULL,
+    total bigint NOT NULL,
+    total_items_in_this_category bigint,
+    sample_hash text COLLATE pg_catalog."default" NOT NULL,
+    CONSTRAINT category_fingerprints_pkey PRIMARY KEY (site_id, category_id, last_run)
+)
+
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS public.category_fingerprints
+    OWNER to postgres;
@@ -0,0 +1,24 @@
+-- Table: public.crawl_checkpoints
+
+-- DROP TABLE IF EXISTS public.crawl_checkpoints;
+
+-- Progress of the current run, so a crawl restarted on the same day skips the
+-- work whose items are already stored. A row is written once its items are:
+--   page_offset >= 0    one page of a slice of a category
+--   page_offset = -1    a whole slice; slice is its params as JSON, e.g. {"condition":"new"}
+--   slice = '', -1      a whole category
+-- Rows of earlier runs are deleted when a run starts.
+CREATE TABLE IF NOT EXISTS public.crawl_checkpoints
+(
+    site_id character(3) COLLATE pg_catalog."default" NOT NULL,
+    last_run date NOT NULL,
+    category_id bigint NOT NULL,
+    slice text COLLATE pg_catalog."default" NOT NULL,
+    page_offset integer NOT NULL,
+    CONSTRAINT crawl_checkpoints_pkey PRIMARY KEY (site_id, last_run, category_id, slice, page_offset)
+)
+
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS public.crawl_checkpoints
+    OWNER to postgres;
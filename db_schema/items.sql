@@ -8,10 +8,38 @@ CREATE TABLE IF NOT EXISTS public.items
     item_id bigint NOT NULL,
     last_run date NOT NULL,
     category_id bigint,
-    item_json json
-)
+    item_json jsonb,
+    seller_id bigint GENERATED ALWAYS AS ((item_json -> 'seller' ->> 'id')::bigint) STORED,
+    CONSTRAINT items_pkey PRIMARY KEY (site_id, item_id, last_run)
+) PARTITION BY RANGE (last_run);
 
-TABLESPACE pg_default;
+-- One partition per day, created before each crawl by db.client.Client.ensure_partitions:
+-- CREATE TABLE IF NOT EXISTS public.items_20240101 PARTITION OF public.items
+--     FOR VALUES FROM ('2024-01-01') TO ('2024-01-02');
 
 ALTER TABLE IF EXISTS public.items
-    OWNER to postgres;
\ No newline at end of file
+    OWNER to postgres;
+-- Index: idx_items_category_last_run
+
+-- DROP INDEX IF EXISTS public.idx_items_category_last_run;
+
+CREATE INDEX IF NOT EXISTS idx_items_category_last_run
+    ON public.items USING btree
+    (site_id, last_run, category_id);
+
+CREATE INDEX IF NOT EXISTS idx_items_seller_id
+    ON public.items USING btree
+    (seller_id, last_run);
+
+CREATE INDEX IF NOT EXISTS idx_items_order_backend
+    ON public.items USING btree
+    ((item_json ->> 'order_backend'));
+
+-- Tables whose item_json is still json, or that are not partitioned yet, are migrated online
+-- by `python main.py --migrate`. It also moves the seller reputation columns of older tables
+-- to sellers_daily. Tables created before seller_id get it as a plain column filled by the
+-- items_generated_columns trigger, since adding a stored generated column rewrites the table.
+
+-- Tables created before items_pkey existed hold duplicated rows. Before partitioning them,
+-- _create_tables deletes the duplicates one day at a time, keeping the row stored last, and
+-- adds the key from a unique index built concurrently.
\ No newline at end of file
@@ -0,0 +1,19 @@
+-- Table: public.price_cuts
+
+-- DROP TABLE IF EXISTS public.price_cuts;
+
+-- Price cut points that split a category into ranges small enough to page
+-- through, saved by the crawler and reused as the starting point next run.
+CREATE TABLE IF NOT EXISTS public.price_cuts
+(
+    site_id character(3) COLLATE pg_catalog."default" NOT NULL,
+    category_id bigint NOT NULL,
+    last_run date NOT NULL,
+    cuts double precision[] NOT NULL,
+    CONSTRAINT price_cuts_pkey PRIMARY KEY (site_id, category_id)
+)
+
+TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS public.price_cuts
+    OWNER to postgres;
@@ -0,0 +1,35 @@
+-- Table: public.sellers_daily
+
+-- DROP TABLE IF EXISTS public.sellers_daily;
+
+CREATE TABLE IF NOT EXISTS public.sellers_daily
+(
+    site_id character(3) COLLATE pg_catalog."default" NOT NULL,
+    seller_id bigint NOT NULL,
+    last_run date NOT NULL,
+    permalink text COLLATE pg_catalog."default",
+    registration_date date,
+    level_id text COLLATE pg_catalog."default",
+    power_seller_status text COLLATE pg_catalog."default",
+    transactions_total bigint,
+    transactions_completed bigint,
+    transactions_canceled bigint,
+    ratings_positive double precision,
+    ratings_neutral double precision,
+    ratings_negative double precision,
+    sales_completed bigint,
+    claims_rate double precision,
+    claims_value bigint,
+    delayed_handling_time_rate double precision,
+    delayed_handling_time_value bigint,
+    cancellations_rate double precision,
+    cancellations_value bigint,
+    CONSTRAINT sellers_daily_pkey PRIMARY KEY (site_id, seller_id, last_run)
+) PARTITION BY RANGE (last_run);
+
+-- One partition per day, created before each crawl by db.client.Client.ensure_partitions:
+-- CREATE TABLE IF NOT EXISTS public.sellers_daily_20240101 PARTITION OF public.sellers_daily
+--     FOR VALUES FROM ('2024-01-01') TO ('2024-01-02');
+
+ALTER TABLE IF EXISTS public.sellers_daily
+    OWNER to postgres;
@@ -0,0 +1,74 @@
+-- Summary tables refreshed at the end of each crawl by db.client.Client.refresh_summaries,
+-- which deletes and aggregates again only the rows of the new last_run.
+
+-- Table: public.seller_category_daily
+
+-- DROP TABLE IF EXISTS public.seller_category_daily;
+
+CREATE TABLE IF NOT EXISTS public.seller_category_daily (
+    site_id character(3) NOT NULL,
+    last_run date NOT NULL,
+    category_id bigint NOT NULL,
+    seller_id bigint NOT NULL,
+    items bigint NOT NULL,
+    sold_quantity bigint,
+    available_quantity bigint,
+    avg_price numeric,
+    min_price numeric,
+    max_price numeric,
+    CONSTRAINT seller_category_daily_pkey PRIMARY KEY (site_id, last_run, category_id, seller_id)
+);
+
+ALTER TABLE IF EXISTS public.seller_category_daily
+    OWNER to postgres;
+
+-- Table: public.seller_summary_daily
+
+-- DROP TABLE IF EXISTS public.seller_summary_daily;
+
+CREATE TABLE IF NOT EXISTS public.seller_summary_daily (
+    site_id character(3) NOT NULL,
+    last_run date NOT NULL,
+    seller_id bigint NOT NULL,
+    level_id text,
+    power_seller_status text,
+    items bigint NOT NULL,
+    categories bigint NOT NULL,
+    sold_quantity bigint,
+    avg_price numeric,
+    sales_completed bigint,
+    transactions_completed bigint,
+    transactions_canceled bigint,
+    ratings_positive double precision,
+    ratings_negative double precision,
+    claims_rate double precision,
+    delayed_handling_time_rate double precision,
+    cancellations_rate double precision,
+    CONSTRAINT seller_summary_daily_pkey PRIMARY KEY (site_id, last_run, seller_id)
+);
+
+ALTER TABLE IF EXISTS public.seller_summary_daily
+    OWNER to postgres;
+
+-- Table: public.category_summary_daily
+
+-- DROP TABLE IF EXISTS public.category_summary_daily;
+
+CREATE TABLE IF NOT EXISTS public.category_summary_daily (
+    site_id character(3) NOT NULL,
+    last_run date NOT NULL,
+    category_id bigint NOT NULL,
+    items bigint NOT NULL,
+    sellers bigint NOT NULL,
+    power_sellers bigint NOT NULL,
+    sold_quantity bigint,
+    avg_price numeric,
+    sales_completed bigint,
+    avg_ratings_positive double precision,
+    avg_claims_rate double precision,
+    avg_cancellations_rate double precision,
+    CONSTRAINT category_summary_daily_pkey PRIMARY KEY (site_id, last_run, category_id)
+);
+
+ALTER TABLE IF EXISTS public.category_summary_daily
+    OWNER to postgres;
@@ -6,17 +6,28 @@ Such data can help in strategic decision making about seller's relevance and rep
 """
 
 import os
+import argparse
+import asyncio
 import math
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from functools import partial
 import logging
 from logging.config import fileConfig
 from dotenv import load_dotenv
 from tqdm.contrib.concurrent import thread_map
 from api import client as api_client
+from api import cache as api_cache
+from api import metrics as api_metrics
 from db import client as db_client
-from utils.utils import format_categories, format_items, get_filter_generator
-from utils.utils import optimize_filters, get_filter_combinations
+from db import sink as db_sink
+from db import parquet_export as db_parquet_export
+from utils.utils import format_categories, format_items, format_sellers
+from utils.planner import plan_partitions, plan_coverage, search_total, split_oversized
+from utils.price_split import split_by_price
+from utils.budget import build_plan, write_plan
+from utils.seen import SeenItems
+from utils.checkpoint import Checkpoints, Completion, SLICE_DONE
+from utils.fingerprint import fingerprint
 
 
 load_dotenv()
@@ -34,79 +45,312 @@ SITE_ID = "MLB"
 API_REQUEST_QUOTA = 4000
 DISTINCT_ITEMS_THRESHOLD = 0.96
 TODAY = datetime.today().strftime('%Y-%m-%d')
+# The asyncio client needs aiohttp, which is only imported when this is set.
+USE_ASYNC_CLIENT = False
+ASYNC_MAX_CONCURRENCY = 200
+MAX_WORKERS = 32
+HTTP_CACHE_PATH = 'http_cache.sqlite3'
+CATEGORY_TREE_WORKERS = 16
+PAGE_WINDOW = 8
+METRICS_PATH = f'metrics_{TODAY}.json'
+RETENTION_DAYS = 90
+DROP_EXPIRED_PARTITIONS = False
+SINK_WRITERS = 4
+SINK_BATCH_SIZE = 5000
+SINK_MAX_AGE = 2.0
+SINK_MAX_PENDING = 2 * MAX_WORKERS
+PARQUET_EXPORT_PATH = None
+DAILY_REQUEST_BUDGET = 250000
+# Pages backfilled, or duplicated rows deleted, per transaction by --migrate.
+MIGRATION_BATCH_SIZE = 10000
+PLAN_PATH = f'plan_{TODAY}.json'
+# Budget priority of whole subtrees, by category id; unlisted subtrees get 0.
+CATEGORY_PRIORITIES = {}
+FINGERPRINT_SAMPLE = 50
+# Category documents stay fresh in the HTTP cache for less than the interval
+# between runs, so incremental runs fingerprint fresh category totals.
+CATEGORY_CACHE_TTL = api_cache.HOUR
 
-db = db_client.Client(host, database, user, password)
-api = api_client.Client(client_id, client_secret, SITE_ID)
+db = db_client.Client(host, database, user, password, maxconn=MAX_WORKERS)
+sink = db_sink.WriteBehindSink(
+    db.insert_bulk_items, SINK_BATCH_SIZE, SINK_MAX_AGE, SINK_MAX_PENDING, SINK_WRITERS)
+seller_sink = db_sink.WriteBehindSink(
+    db.insert_bulk_sellers, SINK_BATCH_SIZE, SINK_MAX_AGE, SINK_MAX_PENDING)
+checkpoint_sink = db_sink.WriteBehindSink(
+    db.insert_bulk_checkpoints, SINK_BATCH_SIZE, SINK_MAX_AGE, SINK_MAX_PENDING)
+api = api_client.Client(
+    client_id, client_secret, SITE_ID,
+    cache=api_cache.ResponseCache(HTTP_CACHE_PATH, ttls={'/categories/{id}': CATEGORY_CACHE_TTL}),
+    # The quota of the metrics is the request budget of the whole run, not the
+    # per-search paging cap API_REQUEST_QUOTA.
+    metrics=api_metrics.Metrics(quota=DAILY_REQUEST_BUDGET))
+
+seen_items = SeenItems()
+allowances = {}
+checkpoints = Checkpoints(SITE_ID, TODAY)
+previous_fingerprints = {}
 
 token = db.load_token()
 if api.is_valid_token(token):
-    api.set_token(token)
+    api.set_token(token, pool_size=MAX_WORKERS * PAGE_WINDOW)
 else:
     authorization_url = api.authorization_url(redirect_uri)
     print(f'Please go to the following url and authorize access: {authorization_url}')
     authorization_response = input('Enter the full callback URL: ')
     token = api.exchange_code(authorization_response)
-    api.set_token(token)
+    api.set_token(token, pool_size=MAX_WORKERS * PAGE_WINDOW)
     db.save_token(token)
 
 def crawl_categories(base_category):
     """Crawl categories"""
-    categories = []
     category = api.get_category(base_category['id'])
-    api.get_category_tree(category, categories)
+    categories, metadata = api.get_category_tree_bfs(category, max_workers=CATEGORY_TREE_WORKERS)
+    log_category_tree(base_category, categories, metadata)
     return categories
 
-def crawl_items(category):
-    """Downloads the spcified items from the API and save the data to database"""
-    item_search = api.search_items(SITE_ID, {'category': category['id']})
+def log_category_tree(base_category, categories, metadata):
+    """Logs the size and depth of the tree under a base category"""
+    depth = max((m['depth'] for m in metadata.values()), default=0)
+    logger.debug('%s has %s descendant(s), %s level(s) deep', base_category['id'], len(categories), depth)
+
+def store_categories(base_categories, categories):
+    """Stores the base categories and the category tree, once per run"""
+    if checkpoints.tree_done():
+        return
+    db.insert_bulk_base_categories(format_categories(base_categories, TODAY))
+    db.insert_bulk_categories(format_categories(categories, TODAY))
+    checkpoint_sink.put([checkpoints.record_tree()])
+
+def store_items(items, on_written=None):
+    """Queues the items and their sellers to be written to the database. on_written
+    is called once both are written."""
+    written = Completion(on_written or (lambda: None))
+    sink.put(format_items(items, TODAY), written.add())
+    seller_sink.put(format_sellers(items, TODAY), written.add())
+    written.close()
+
+def checkpoint(category_id, params=None, page_offset=SLICE_DONE, then=None):
+    """Returns a callback that saves the checkpoint of a category, slice or page and
+    then calls `then`"""
+    def save():
+        checkpoint_sink.put([checkpoints.record(category_id, params, page_offset)])
+        if then is not None:
+            then()
+    return save
+
+def save_fingerprint(category_id, current):
+    """Returns a callback that saves the fingerprint of a category for this run"""
+    return lambda: db.save_fingerprint(SITE_ID, category_id[3:], TODAY, current)
+
+def carry_forward(category_id, current):
+    """Copies the items and sellers of a category from its previous run if its
+    fingerprint did not change since. Returns True if they were copied. Nothing
+    copied for a category with items, e.g. one whose items are all stored under
+    its subcategories, means it has to be crawled."""
+    previous = previous_fingerprints.get(int(category_id[3:]))
+    if previous is None or tuple(previous[1:]) != current:
+        return False
+    copied = db.carry_forward(SITE_ID, category_id[3:], previous[0], TODAY)
+    if copied is None or (copied == 0 and current[0] > 0):
+        return False
+    logger.debug('%s item(s) of %s carried forward from %s', copied, category_id, previous[0])
+    checkpoint(category_id, then=save_fingerprint(category_id, current))()
+    return True
+
+def crawl_slice(category_id, params, total, limit, quota, on_written, client=api):
+    """Downloads the pages of a slice that are not stored yet. Each page is
+    checkpointed once written, and the slice once all of its pages are. A slice
+    with pages that could not be fetched is left open, to be resumed later."""
+    items = []
+    failed = []
+    slice_written = Completion(checkpoint(category_id, params, then=on_written))
+    stored = checkpoints.pages_done(category_id, params)
+    for page in client.iter_search_pages(
+            SITE_ID, params, total, limit, quota, PAGE_WINDOW, skip=stored, on_error=failed.append):
+        items.extend(page['results'])
+        store_items(
+            page['results'],
+            checkpoint(category_id, params, page['paging']['offset'], then=slice_written.add()))
+    if failed:
+        logger.warning('%s page(s) of %s with %s failed, slice left open', len(failed), category_id, params)
+    else:
+        slice_written.close()
+    return items
+
+def count_items(params, client=api):
+    """Returns the number of results of a search without fetching any item, or
+    None if the search failed"""
+    item_search = client.search_items(SITE_ID, {**params, 'limit': 0})
+    total = search_total(item_search)
+    if total is None:
+        logger.warning('Count of %s failed: %s', params, item_search)
+    return total
+
+def plan_category(category_id, item_search, client=api):
+    """Splits a category over the request quota into slices that can be paged through.
+    Categories split by price before start from the saved cut points; otherwise the
+    available filters are tried first, and the filter slices still over the quota
+    are split by price."""
+    total_items = item_search['paging']['total']
+    params = {'category': category_id}
+    count = lambda count_params: count_items(count_params, client)
+    cuts = db.load_price_cuts(SITE_ID, category_id[3:])
+    if not cuts:
+        plan = plan_partitions(
+            lambda slice_params: client.search_items(SITE_ID, slice_params), params, API_REQUEST_QUOTA,
+            item_search, limit=item_search['paging']['limit'])
+        if plan_coverage(plan, total_items, API_REQUEST_QUOTA) >= 1.0:
+            logger.debug('Planned %s filter slice(s) for %s', len(plan), category_id)
+            return plan
+        if any({k: v for k, v in part['params'].items() if k != 'sort'} != params for part in plan):
+            plan = split_oversized(
+                plan, API_REQUEST_QUOTA,
+                lambda slice_params, results: split_by_price(count, slice_params, API_REQUEST_QUOTA, results)[0])
+            logger.debug('Planned %s filter and price slice(s) for %s', len(plan), category_id)
+            return plan
+    plan, cuts = split_by_price(count, params, API_REQUEST_QUOTA, total_items, cuts)
+    db.save_price_cuts(SITE_ID, category_id[3:], cuts, TODAY)
+    logger.debug('Planned %s price slice(s) for %s', len(plan), category_id)
+    return plan
+
+def plan_budget(categories):
+    """Counts the items of every category concurrently and shares the daily request
+    budget among them. The plan is saved to PLAN_PATH."""
+    totals = thread_map(
+        lambda category: count_items({'category': category['id']}), categories,
+        max_workers=MAX_WORKERS, desc='Planning: ')
+    return apply_budget(build_plan(
+        categories, totals, DAILY_REQUEST_BUDGET, API_REQUEST_QUOTA, CATEGORY_PRIORITIES, today=TODAY))
+
+def apply_budget(plan):
+    """Saves a request plan and sets the allowance of each category from it.
+    Categories that could not be counted get no allowance."""
+    write_plan(plan, PLAN_PATH)
+    allowances.clear()
+    allowances.update({category['id']: category['allocated'] for category in plan['categories']})
+    allowances.update({category_id: 0 for category_id in plan['uncounted']})
+    logger.info('%s of %s estimated request(s) fit in the budget of %s, plan saved to %s',
+                plan['allocated_requests'], plan['estimated_requests'], plan['budget'], PLAN_PATH)
+    if plan['uncounted']:
+        logger.warning('%s categor(ies) could not be counted and get no allowance', len(plan['uncounted']))
+    return plan
+
+def should_crawl(category):
+    """Returns True if a category has an allowance or may be carried forward"""
+    return bool(allowances.get(category['id'])) or int(category['id'][3:]) in previous_fingerprints
+
+def page_quota(allowance, limit):
+    """Returns how many items a search can page through with an allowance of requests"""
+    if allowance is None:
+        return API_REQUEST_QUOTA
+    return min(API_REQUEST_QUOTA, max(allowance, 0) * limit)
+
+def crawl_items(category, client=api):
+    """Downloads the spcified items from the API and save the data to database.
+    Categories, slices and pages stored earlier in the same run are skipped, and so
+    are categories that did not change in an incremental run. The asyncio crawl
+    passes a BlockingClient as client."""
+    if checkpoints.category_done(category['id']):
+        return
+    item_search = client.search_items(SITE_ID, {'category': category['id']})
+    if not isinstance(item_search, dict) or 'paging' not in item_search:
+        # Still throttled or failing after the retries: crawled again on resume.
+        logger.warning('Search of %s failed: %s', category['id'], item_search)
+        return
     total_items = item_search['paging']['total']
     limit = item_search['paging']['limit']
     category_id = item_search['filters'][0]['values'][0]['id']
-    partial_search_items = partial(api.search_items, SITE_ID)
+    allowance = allowances.get(category['id'])
+    current = fingerprint(category, item_search, FINGERPRINT_SAMPLE)
+    if carry_forward(category_id, current):
+        return
+    if allowance == 0:
+        return
+    truncated = False
+
+    def category_stored():
+        # A category cut short by the budget is crawled again next time, not carried forward.
+        if not truncated:
+            save_fingerprint(category_id, current)()
+
+    category_written = Completion(checkpoint(category_id, then=category_stored))
 
     if total_items <= API_REQUEST_QUOTA:
-        iterations = math.ceil(total_items/limit)
-        params = [{'category':category_id,'offset':i*limit,'limit':limit} for i in range(iterations)]
-        searches = list(map(partial_search_items, params))
-        items = []
-        for search in searches:
-            if 'results' in search:
-                items.extend(search['results'])
-        formated_items = format_items(items, TODAY)
-        db.insert_bulk_items(formated_items)
+        truncated = page_quota(allowance, limit) < total_items
+        crawl_slice(
+            category_id, {'category': category_id}, total_items, limit, page_quota(allowance, limit),
+            category_written.add(), client)
 
     else:
-        available_filters = item_search['available_filters']
-        available_sorts = item_search['available_sorts']
-        optimized_filters = optimize_filters(available_filters, total_items)
-        filter_combinations = get_filter_generator(optimized_filters, available_sorts)
-
-        for filter_combination in filter_combinations:
-    
-            params = {**{'category': category_id}, **filter_combination}
-            item_search = api.search_items(SITE_ID, params)
-            total_items = item_search['paging']['total']
-            limit = item_search['paging']['limit']
-            
-            if total_items > 0:
-
-                iterations = min(math.ceil(total_items/limit), math.ceil(API_REQUEST_QUOTA/limit))
-                params = [{**{'category': category_id, 'offset': i*limit,
-                            'limit': limit}, **filter_combination} for i in range(iterations)]
-                searches = list(map(partial_search_items, params))
-                items = []
-                for search in searches:
-                    if 'results' in search:
-                        items.extend(search['results'])
-                
-                formated_items = format_items(items, TODAY)
-                db.insert_bulk_items(formated_items)
-
-                numb_distinct_items = db.count_disctinct_items(SITE_ID, category_id[3:], TODAY)
-                if numb_distinct_items >= total_items * DISTINCT_ITEMS_THRESHOLD:
-                    break
-
-def main():
+        plan = plan_category(category_id, item_search, client)
+
+        for part in plan:
+            if checkpoints.slice_done(category_id, part['params']):
+                continue
+            quota = page_quota(allowance, limit)
+            if quota == 0:
+                logger.info('Request budget of %s exhausted', category_id)
+                truncated = True
+                break
+            if allowance is not None:
+                allowance -= math.ceil(min(part['results'], quota) / limit)
+            items = crawl_slice(
+                category_id, part['params'], part['results'], limit, quota, category_written.add(), client)
+
+            new_items = seen_items.add(category_id, items)
+            logger.debug('%s new item(s) in %s with %s', new_items, category_id, part['params'])
+            numb_distinct_items = seen_items.count(category_id)
+            if numb_distinct_items >= total_items * DISTINCT_ITEMS_THRESHOLD:
+                break
+
+    category_written.close()
+
+async def crawl_categories_async(async_api, base_category):
+    """Crawl categories using the asyncio client"""
+    category = await async_api.get_category(base_category['id'])
+    categories, metadata = await async_api.get_category_tree_bfs(category)
+    log_category_tree(base_category, categories, metadata)
+    return categories
+
+async def plan_budget_async(async_api, categories):
+    """Same as plan_budget, but every count runs on the asyncio client"""
+    searches = await asyncio.gather(
+        *(async_api.search_items(SITE_ID, {'category': c['id'], 'limit': 0}) for c in categories))
+    totals = [search_total(search) for search in searches]
+    for category, search, total in zip(categories, searches, totals):
+        if total is None:
+            logger.warning('Count of %s failed: %s', category['id'], search)
+    return apply_budget(build_plan(
+        categories, totals, DAILY_REQUEST_BUDGET, API_REQUEST_QUOTA, CATEGORY_PRIORITIES, today=TODAY))
+
+async def crawl_async(base_categories, dry_run=False):
+    """Runs the category and item crawls on a single event loop"""
+    from api import async_client as api_async_client  # pylint: disable=import-outside-toplevel
+    async_api = api_async_client.AsyncClient(
+        client_id, client_secret, SITE_ID, max_concurrency=ASYNC_MAX_CONCURRENCY,
+        retry_policy=api.retry_policy, cache=api.cache, metrics=api.metrics, rate_limiter=api.rate_limiter)
+    async_api.set_token(api.token)
+    async with async_api:
+        categories = (await asyncio.gather(
+            *(crawl_categories_async(async_api, c) for c in base_categories)))[0]
+        logger.info('The categories list contains %s element(s)', len(categories))
+
+        await plan_budget_async(async_api, categories)
+        if dry_run:
+            return
+        await asyncio.get_running_loop().run_in_executor(
+            None, store_categories, base_categories, categories)
+
+        # The item crawl is the sync one, run in threads over a blocking view of
+        # the asyncio client, so both paths share one implementation.
+        loop = asyncio.get_running_loop()
+        blocking_api = api_async_client.BlockingClient(async_api, loop)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            await asyncio.gather(*(
+                loop.run_in_executor(executor, crawl_items, c, blocking_api)
+                for c in categories if should_crawl(c)))
+
+def main(dry_run=False, incremental=False, metrics_port=None, migrate=False):
     """
     The flow to obtain the seller's information starts with the selection of broad base
     categories. At this point not all base categories are interesting, so a
@@ -117,29 +361,110 @@ def main():
     information related to this item and its main statistics such as the number of sales
     closed in the last 60 days, number of canceled orders and other information about
     seller's reputation on Mercado Livre.
+
+    Before any item is downloaded the daily request budget is shared among the
+    categories and the plan is saved to PLAN_PATH. With dry_run nothing else is
+    downloaded or written to the database.
+
+    In an incremental run, categories whose fingerprint (number of results, total
+    items and top results) did not change since their previous run are not
+    crawled again; their items and sellers are copied from that run instead.
+
+    With metrics_port, the request metrics are served in the Prometheus text
+    format on that port while the crawler runs.
+
+    With migrate, the tables are created, or older schemas migrated online, and
+    nothing is crawled. Run it once after upgrading, before the next crawl.
     """
-    
+    if migrate:
+        logger.info('Migrating the database')
+        if db.migrate(MIGRATION_BATCH_SIZE):
+            logger.info('Database migrated')
+        return
+
     logger.info('Starting the crawler on %s', TODAY)
+    if metrics_port:
+        api.metrics.serve(metrics_port)
+        logger.info('Serving request metrics on port %s', metrics_port)
 
-    base_categories = api.get_categories(SITE_ID)
-    formated_base_categories = format_categories(base_categories, TODAY)
-    db.insert_bulk_base_categories(formated_base_categories)
+    if not dry_run:
+        db.ensure_partitions(TODAY)
+        expired = db.apply_retention(TODAY, RETENTION_DAYS, DROP_EXPIRED_PARTITIONS)
+        logger.info('%s partition(s) older than %s days expired', len(expired), RETENTION_DAYS)
+        stored = db.load_checkpoints(SITE_ID, TODAY)
+        checkpoints.load(stored)
+        logger.info('Resuming from %s checkpoint(s) of %s', len(stored), TODAY)
+        if incremental:
+            previous_fingerprints.update(db.load_fingerprints(SITE_ID, TODAY))
+            logger.info('Incremental run, %s category fingerprint(s) to compare', len(previous_fingerprints))
 
+    base_categories = api.get_categories(SITE_ID)
     logger.info('The base_categories list contains %s element(s)', len(base_categories))
 
-    # max_workers=8
-    categories = thread_map(
-        crawl_categories, base_categories, max_workers=4, desc='Crawling categories: ')[0]
-    formated_categories = format_categories(categories, TODAY)
-    db.insert_bulk_categories(formated_categories)
+    if USE_ASYNC_CLIENT:
+        asyncio.run(crawl_async(base_categories, dry_run))
+    else:
+        # max_workers=8
+        categories = thread_map(
+            crawl_categories, base_categories, max_workers=4, desc='Crawling categories: ')[0]
+
+        logger.info('The categories list contains %s element(s)', len(categories))
+
+        plan_budget(categories)
+        if not dry_run:
+            store_categories(base_categories, categories)
+
+            thread_map(
+                crawl_items, [c for c in categories if should_crawl(c)],
+                max_workers=MAX_WORKERS, desc='Crawling items: ')
+
+    if dry_run:
+        logger.info('Dry run: %s API requests used for planning', api.metrics.requests)
+        return
 
-    logger.info('The categories list contains %s element(s)', len(categories))
+    sink.flush()
+    seller_sink.flush()
+    # Last, as the other sinks queue checkpoints once their records are written.
+    checkpoint_sink.flush()
+    logger.info('Summary tables refreshed: %s', db.refresh_summaries(TODAY))
+    if PARQUET_EXPORT_PATH:
+        exporter = db_parquet_export.ParquetExporter(db, PARQUET_EXPORT_PATH)
+        logger.info('Rows exported to %s: %s', PARQUET_EXPORT_PATH, exporter.export(TODAY))
 
-    thread_map(crawl_items, categories, desc='Crawling items: ')
+    logger.info('HTTP connections: %s', api.connection_stats())
+    logger.info('HTTP cache: %s', api.cache.stats())
+    api.metrics.write_json(METRICS_PATH)
+    logger.info('%s API requests, metrics saved to %s', api.metrics.requests, METRICS_PATH)
+    logger.info('Database pool: %s', db.pool_stats())
+    logger.info('Write-behind sink: %s', sink.stats())
+    logger.info('Seller sink: %s', seller_sink.stats())
+    logger.info('Checkpoint sink: %s', checkpoint_sink.stats())
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawls Mercado Libre items and sellers.")
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help=f'plan the request budget, save it to {PLAN_PATH} and exit without downloading items')
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help='copy the items of categories that did not change since their previous run instead of '
+             'crawling them again')
+    parser.add_argument(
+        '--metrics-port', type=int, default=None,
+        help='serve the request metrics in the Prometheus text format on this port while crawling')
+    parser.add_argument(
+        '--migrate', action='store_true',
+        help='create the tables or migrate older schemas online, then exit without crawling')
+    args = parser.parse_args()
     fileConfig('logging_config.ini')
     logger = logging.getLogger(__name__)
     print("Welcome to Meli's Crawler.")
-    main()
+    try:
+        main(dry_run=args.dry_run, incremental=args.incremental, metrics_port=args.metrics_port,
+             migrate=args.migrate)
+    finally:
+        sink.close()
+        seller_sink.close()
+        checkpoint_sink.close()
+        db.close()
     print('Finished!!!')
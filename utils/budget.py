@@ -0,0 +1,122 @@
+"""Module budget estimates the requests a run takes and shares a daily budget among categories."""
+from __future__ import annotations
+from collections.abc import Iterable
+from datetime import date
+import json
+import math
+
+PAGE_LIMIT = 50
+
+
+def estimate_cost(total: int, cap: int, limit: int = PAGE_LIMIT) -> int:
+    """Returns the number of requests needed to download every item of a category:
+    one page per `limit` items and, for categories over the cap, one count and one
+    partially filled page per slice of the request plan.
+        Args:
+            total: Number of results of the category.
+            cap: Maximum number of items a single search can page through.
+            limit: Page size.
+        Returns:
+            An int
+    """
+    pages = math.ceil(total / limit)
+    if total > cap:
+        pages += 2 * math.ceil(total / cap)
+    return pages
+
+
+def fair_shares(costs: list[int], budget: int) -> list[int]:
+    """Shares a budget so that no cost gets more than it needs and the leftovers
+    are split evenly among the bigger ones (max-min fairness).
+        Args:
+            costs:
+            budget:
+        Returns:
+            A list of int with the share of each cost, in the same order
+    """
+    shares = [0] * len(costs)
+    order = sorted(range(len(costs)), key=lambda i: costs[i])
+    remaining = budget
+    for position, i in enumerate(order):
+        shares[i] = min(costs[i], remaining // (len(order) - position))
+        remaining -= shares[i]
+    return shares
+
+
+def allocate(categories: Iterable[dict], budget: int) -> list[dict]:
+    """Allocates a request budget to categories. Higher priorities are funded first;
+    within a priority the budget is shared by size, so small categories are crawled
+    entirely and big ones get an even share of what is left.
+        Args:
+            categories: Dicts with id, total, cost and priority.
+            budget: Number of requests available.
+        Returns:
+            A list of dict, the categories with the allocated number of requests
+    """
+    tiers = {}
+    for category in categories:
+        tiers.setdefault(category['priority'], []).append(category)
+    allocated = []
+    remaining = budget
+    for priority in sorted(tiers, reverse=True):
+        tier = tiers[priority]
+        shares = fair_shares([category['cost'] for category in tier], remaining)
+        remaining -= sum(shares)
+        allocated += [{**category, 'allocated': share} for category, share in zip(tier, shares)]
+    return allocated
+
+
+def build_plan(categories: list[dict], totals: list[int], budget: int, cap: int,
+               priorities: dict[str, int] | None = None, limit: int = PAGE_LIMIT,
+               today: str | date | None = None) -> dict:
+    """Builds the request plan of a run.
+        Args:
+            categories: Categories as returned by the API.
+            totals: Number of results of each category, in the same order, or None
+                for a category that could not be counted. Those are left out of the
+                plan and listed under 'uncounted'.
+            budget: Number of requests available for the run.
+            cap: Maximum number of items a single search can page through.
+            priorities: Priority per category id; a category takes the priority of the
+                closest ancestor listed, 0 if none is.
+            limit: Page size.
+            today:
+        Returns:
+            A dict
+    """
+    priorities = priorities or {}
+    estimates = []
+    uncounted = []
+    for category, total in zip(categories, totals):
+        if total is None:
+            uncounted.append(category['id'])
+            continue
+        path = [node['id'] for node in category.get('path_from_root', [])] or [category['id']]
+        priority = next((priorities[node] for node in reversed(path) if node in priorities), 0)
+        estimates.append({
+            'id': category['id'],
+            'total': total,
+            'cost': estimate_cost(total, cap, limit),
+            'priority': priority,
+        })
+    allocated = allocate(estimates, budget)
+    return {
+        'date': str(today) if today is not None else None,
+        'budget': budget,
+        'estimated_requests': sum(category['cost'] for category in allocated),
+        'allocated_requests': sum(category['allocated'] for category in allocated),
+        'categories': allocated,
+        'uncounted': uncounted,
+    }
+
+
+def write_plan(plan: dict, path: str) -> None:
+    """Saves a request plan as JSON.
+        Args:
+            plan:
+            path:
+        Returns:
+            None
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(plan, file, indent=2)
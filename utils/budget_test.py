@@ -0,0 +1,69 @@
+"""
+This module aims to test the functions in module budget
+"""
+import json
+import os
+import tempfile
+import unittest
+from budget import estimate_cost, fair_shares, allocate, build_plan, write_plan
+from planner import search_total
+
+
+class TestBudget(unittest.TestCase):
+    """
+    Test class for budget
+    """
+
+    def test_estimate_cost(self):
+        self.assertEqual(estimate_cost(0, 4000), 0)
+        self.assertEqual(estimate_cost(120, 4000), 3)
+        self.assertEqual(estimate_cost(10000, 4000), 200 + 6)
+
+    def test_fair_shares_funds_small_costs_first(self):
+        self.assertEqual(fair_shares([10, 500, 20, 300], 330), [10, 150, 20, 150])
+        self.assertEqual(fair_shares([10, 20], 1000), [10, 20])
+        self.assertEqual(fair_shares([], 1000), [])
+
+    def test_allocate_by_priority(self):
+        categories = [
+            {'id': 'MLB1', 'cost': 80, 'priority': 0},
+            {'id': 'MLB2', 'cost': 80, 'priority': 1},
+            {'id': 'MLB3', 'cost': 40, 'priority': 1},
+        ]
+        allocated = {category['id']: category['allocated'] for category in allocate(categories, 150)}
+        self.assertEqual(allocated, {'MLB1': 30, 'MLB2': 80, 'MLB3': 40})
+
+    def test_build_plan_inherits_priority(self):
+        categories = [
+            {'id': 'MLB3', 'path_from_root': [{'id': 'MLB1'}, {'id': 'MLB3'}]},
+            {'id': 'MLB4', 'path_from_root': [{'id': 'MLB2'}, {'id': 'MLB4'}]},
+        ]
+        plan = build_plan(categories, [500, 500], 10, 4000, {'MLB1': 5}, today='2022-07-01')
+        self.assertEqual([category['priority'] for category in plan['categories']], [5, 0])
+        self.assertEqual([category['allocated'] for category in plan['categories']], [10, 0])
+        self.assertEqual(plan['estimated_requests'], 20)
+        self.assertEqual(plan['allocated_requests'], 10)
+
+    def test_failed_counts_are_left_out(self):
+        searches = {
+            'MLB1': {'paging': {'total': 100, 'limit': 0}, 'results': []},
+            'MLB2': {'message': 'too_many_requests', 'error': 'local_rate_limited', 'status': 429},
+        }
+        categories = [{'id': 'MLB1'}, {'id': 'MLB2'}]
+        totals = [search_total(searches[category['id']]) for category in categories]
+        self.assertEqual(totals, [100, None])
+        plan = build_plan(categories, totals, 10, 4000)
+        self.assertEqual([category['id'] for category in plan['categories']], ['MLB1'])
+        self.assertEqual(plan['uncounted'], ['MLB2'])
+        self.assertEqual(plan['allocated_requests'], 2)
+
+    def test_write_plan(self):
+        plan = build_plan([{'id': 'MLB1'}], [100], 10, 4000)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plan.json')
+            write_plan(plan, path)
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(json.load(file), plan)
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,124 @@
+"""Module checkpoint keeps track of the work of a run that is already stored."""
+from __future__ import annotations
+from collections.abc import Callable, Iterable
+from datetime import date
+import json
+import threading
+
+# page_offset of the row that marks a whole slice as stored, and slice of the
+# row that marks a whole category as stored.
+SLICE_DONE = -1
+CATEGORY = ''
+# Row that marks the base categories and the category tree of the run as stored.
+TREE = (0, 'categories')
+
+
+def slice_key(category_id: str, params: dict) -> str:
+    """Returns the key of a slice of a category, e.g. '{"condition":"new"}'. The
+    category param is left out only when it is the category itself, so slices
+    split by subcategory keep distinct keys.
+        Args:
+            category_id: Category id as returned by the API, e.g. 'MLB1234'.
+            params: Search params of the slice, including the category.
+        Returns:
+            A string
+    """
+    return json.dumps(
+        {key: value for key, value in sorted(params.items()) if (key, value) != ('category', category_id)},
+        separators=(',', ':'))
+
+
+class Checkpoints():
+    """
+    Categories, slices and pages of a run whose items are already in the
+    database, so a run restarted on the same day can skip them. Each one is a
+    row of crawl_checkpoints: (site_id, last_run, category_id, slice, page_offset).
+    """
+
+    def __init__(self, site_id: str, last_run: str | date) -> None:
+        self.site_id = site_id
+        self.last_run = last_run
+        self._done = {}
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[tuple]) -> None:
+        """Adds the rows of crawl_checkpoints read back from the database.
+            Args:
+                rows: Tuples with category_id, slice and page_offset.
+            Returns:
+                None
+        """
+        with self._lock:
+            for category_id, key, page_offset in rows:
+                self._done.setdefault((int(category_id), key), set()).add(page_offset)
+
+    def record(self, category_id: str, params: dict | None = None, page_offset: int = SLICE_DONE) -> tuple:
+        """Marks a category, a slice or a page as stored.
+            Args:
+                category_id: Category id as returned by the API, e.g. 'MLB1234'.
+                params: Params of the slice, or None for the whole category.
+                page_offset: Offset of the page, or SLICE_DONE for the whole slice.
+            Returns:
+                The row to insert into crawl_checkpoints
+        """
+        key = CATEGORY if params is None else slice_key(category_id, params)
+        with self._lock:
+            self._done.setdefault((int(category_id[3:]), key), set()).add(page_offset)
+        return (self.site_id, self.last_run, category_id[3:], key, page_offset)
+
+    def record_tree(self) -> tuple:
+        """Marks the base categories and the category tree as stored.
+            Returns:
+                The row to insert into crawl_checkpoints
+        """
+        with self._lock:
+            self._done.setdefault(TREE, set()).add(SLICE_DONE)
+        return (self.site_id, self.last_run, *TREE, SLICE_DONE)
+
+    def tree_done(self) -> bool:
+        """Returns True if the base categories and the category tree are stored."""
+        with self._lock:
+            return SLICE_DONE in self._done.get(TREE, ())
+
+    def category_done(self, category_id: str) -> bool:
+        """Returns True if every item of a category is stored."""
+        return self.slice_done(category_id, None)
+
+    def slice_done(self, category_id: str, params: dict | None) -> bool:
+        """Returns True if every item of a slice is stored."""
+        return SLICE_DONE in self.pages_done(category_id, params)
+
+    def pages_done(self, category_id: str, params: dict | None) -> set[int]:
+        """Returns the offsets of the pages of a slice that are stored."""
+        key = CATEGORY if params is None else slice_key(category_id, params)
+        with self._lock:
+            return set(self._done.get((int(category_id[3:]), key), ()))
+
+
+class Completion():
+    """
+    Calls `on_complete` once, when every callback handed out by add() has been
+    called and close() says no more will be handed out.
+    """
+
+    def __init__(self, on_complete: Callable[[], None]) -> None:
+        self.on_complete = on_complete
+        self._pending = 1
+        self._lock = threading.Lock()
+
+    def add(self) -> Callable[[], None]:
+        """Returns a callback to call when one more part of the work is done."""
+        with self._lock:
+            self._pending += 1
+        return self._done
+
+    def close(self) -> None:
+        """Tells that every part of the work was handed out."""
+        self._done()
+
+    def _done(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            complete = self._pending == 0
+        if complete:
+            self.on_complete()
@@ -0,0 +1,71 @@
+"""
+This module aims to test the classes in module checkpoint
+"""
+import unittest
+from checkpoint import Checkpoints, Completion, SLICE_DONE, slice_key
+
+
+class TestCheckpoints(unittest.TestCase):
+    """
+    Test class for Checkpoints
+    """
+
+    def test_slice_key_ignores_own_category_and_order(self):
+        self.assertEqual(
+            slice_key('MLB1', {'category': 'MLB1', 'sort': 'price_asc', 'condition': 'new'}),
+            slice_key('MLB1', {'condition': 'new', 'sort': 'price_asc'}))
+        self.assertEqual(slice_key('MLB1', {'category': 'MLB1'}), '{}')
+
+    def test_slice_key_keeps_subcategories(self):
+        keys = {slice_key('MLB1', {'category': category}) for category in ('MLB1', 'MLB2', 'MLB3')}
+        self.assertEqual(keys, {'{}', '{"category":"MLB2"}', '{"category":"MLB3"}'})
+        checkpoints = Checkpoints('MLB', '2022-07-01')
+        checkpoints.record('MLB1', {'category': 'MLB2'})
+        self.assertTrue(checkpoints.slice_done('MLB1', {'category': 'MLB2'}))
+        self.assertFalse(checkpoints.slice_done('MLB1', {'category': 'MLB3'}))
+        self.assertFalse(checkpoints.slice_done('MLB1', {'category': 'MLB1'}))
+
+    def test_record_and_query(self):
+        checkpoints = Checkpoints('MLB', '2022-07-01')
+        params = {'category': 'MLB1', 'condition': 'new'}
+        self.assertEqual(
+            checkpoints.record('MLB1', params, 50), ('MLB', '2022-07-01', '1', '{"condition":"new"}', 50))
+        self.assertEqual(checkpoints.pages_done('MLB1', params), {50})
+        self.assertFalse(checkpoints.slice_done('MLB1', params))
+        checkpoints.record('MLB1', params)
+        self.assertTrue(checkpoints.slice_done('MLB1', params))
+        self.assertFalse(checkpoints.category_done('MLB1'))
+        checkpoints.record('MLB1')
+        self.assertTrue(checkpoints.category_done('MLB1'))
+
+    def test_load_rows_from_database(self):
+        checkpoints = Checkpoints('MLB', '2022-07-01')
+        checkpoints.load([(1, '{}', 0), (1, '{}', 50), (2, '', SLICE_DONE), (0, 'categories', SLICE_DONE)])
+        self.assertEqual(checkpoints.pages_done('MLB1', {'category': 'MLB1'}), {0, 50})
+        self.assertTrue(checkpoints.category_done('MLB2'))
+        self.assertTrue(checkpoints.tree_done())
+        self.assertFalse(Checkpoints('MLB', '2022-07-01').tree_done())
+
+
+class TestCompletion(unittest.TestCase):
+    """
+    Test class for Completion
+    """
+
+    def test_completes_after_close_and_every_callback(self):
+        completed = []
+        completion = Completion(lambda: completed.append(True))
+        first, second = completion.add(), completion.add()
+        first()
+        completion.close()
+        self.assertEqual(completed, [])
+        second()
+        self.assertEqual(completed, [True])
+
+    def test_completes_on_close_without_work(self):
+        completed = []
+        Completion(lambda: completed.append(True)).close()
+        self.assertEqual(completed, [True])
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,36 @@
+"""Module fingerprint summarizes the state of a category to tell whether it changed since the last run."""
+from __future__ import annotations
+import hashlib
+
+SAMPLE_SIZE = 50
+
+
+def sample_hash(results: list[dict], size: int = SAMPLE_SIZE) -> str:
+    """Returns a hash of the id and price of the top results of a search, in order.
+        Args:
+            results: Results of the first page of a search.
+            size: Number of results hashed.
+        Returns:
+            A string
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for item in results[:size]:
+        digest.update(f"{item['id']}:{item.get('price')};".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def fingerprint(category: dict, item_search: dict, size: int = SAMPLE_SIZE) -> tuple[int, int | None, str]:
+    """Returns the fingerprint of a category: the number of results of its search,
+    the total_items_in_this_category of the category and a hash of its top results.
+        Args:
+            category: Category as returned by the API.
+            item_search: First page of the search of the category.
+            size: Number of top results hashed.
+        Returns:
+            A tuple
+    """
+    return (
+        item_search['paging']['total'],
+        category.get('total_items_in_this_category'),
+        sample_hash(item_search.get('results', []), size),
+    )
@@ -0,0 +1,39 @@
+"""
+This module aims to test the functions in module fingerprint
+"""
+import unittest
+from fingerprint import fingerprint, sample_hash
+
+
+def search(total, prices):
+    return {
+        'paging': {'total': total, 'limit': 50},
+        'results': [{'id': f'MLB{i}', 'price': price} for i, price in enumerate(prices)],
+    }
+
+
+class TestFingerprint(unittest.TestCase):
+    """
+    Test class for fingerprint
+    """
+
+    def test_same_category_same_fingerprint(self):
+        category = {'id': 'MLB1', 'total_items_in_this_category': 120}
+        self.assertEqual(
+            fingerprint(category, search(120, [10.0, 20.0])), fingerprint(category, search(120, [10.0, 20.0])))
+
+    def test_changes_are_detected(self):
+        category = {'id': 'MLB1', 'total_items_in_this_category': 120}
+        current = fingerprint(category, search(120, [10.0, 20.0]))
+        self.assertNotEqual(current, fingerprint(category, search(121, [10.0, 20.0])))
+        self.assertNotEqual(current, fingerprint(category, search(120, [10.0, 25.0])))
+        self.assertNotEqual(current, fingerprint(category, search(120, [20.0, 10.0])))
+        self.assertNotEqual(
+            current, fingerprint({'id': 'MLB1', 'total_items_in_this_category': 119}, search(120, [10.0, 20.0])))
+
+    def test_sample_size(self):
+        results = search(3, [1.0, 2.0, 3.0])['results']
+        self.assertEqual(sample_hash(results, 2), sample_hash(results[:2] + [{'id': 'MLB9', 'price': 9.0}], 2))
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
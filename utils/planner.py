@@ -0,0 +1,139 @@
+"""Module planner splits a search into disjoint slices that can be paged through."""
+from __future__ import annotations
+from collections.abc import Callable
+import math
+
+OVERFLOW_SORTS = ('price_asc', 'price_desc')
+
+
+def search_total(search_result) -> int | None:
+    """Returns the number of results of a search response, or None if the search
+    failed, e.g. an error body returned after every retry.
+        Args:
+            search_result: A search response.
+        Returns:
+            An int, or None
+    """
+    if not isinstance(search_result, dict) or 'total' not in search_result.get('paging', {}):
+        return None
+    return search_result['paging']['total']
+
+
+def choose_split(search_result: dict, cap: int, limit: int = 50) -> dict | None:
+    """Returns the available filter that best splits a search into disjoint slices.
+    A filter is disjoint when the results of its values add up to no more than the
+    total, i.e. no item matches two values. Among those, the filter covering most
+    items wins; ties go to the one needing fewer page requests.
+        Args:
+            search_result: A search response with paging and available_filters.
+            cap: Maximum number of items a single search can page through.
+            limit: Page size.
+        Returns:
+            A dict, or None if no filter splits the search
+    """
+    total = search_result['paging']['total']
+    best, best_key = None, None
+    for available_filter in search_result.get('available_filters', []):
+        values = [value for value in available_filter['values'] if value['results'] > 0]
+        covered = sum(value['results'] for value in values)
+        if len(values) < 2 or covered > total:
+            continue
+        pages = sum(math.ceil(min(value['results'], cap) / limit) for value in values)
+        oversized = sum(value['results'] > cap for value in values)
+        key = (-covered, oversized, pages)
+        if best_key is None or key < best_key:
+            best, best_key = available_filter, key
+    return best
+
+
+def _leaf(params: dict, results: int, cap: int) -> list[dict]:
+    if results <= cap:
+        return [{'params': params, 'results': results}]
+    # Nothing left to split on: each sort order reaches a different end of the slice.
+    return [{'params': {**params, 'sort': sort}, 'results': results} for sort in OVERFLOW_SORTS]
+
+
+def plan_partitions(search: Callable[[dict], dict], params: dict, cap: int,
+                    search_result: dict | None = None, max_depth: int = 4, limit: int = 50) -> list[dict]:
+    """Returns a request plan: disjoint slices of a search, each with no more than
+    `cap` results, that together cover as much of the search as the available
+    filters allow. Slices over the cap are split again by probing them, using
+    the counts of their own available filters. Probes ask for no results
+    (limit=0); a slice whose probe fails is paged through from both ends.
+        Args:
+            search: Function that runs a search for some params and returns the response.
+            params: Params of the search to split.
+            cap: Maximum number of items a single search can page through.
+            search_result: Response for params, when it was already fetched.
+            max_depth: Maximum number of filters combined in a slice.
+            limit: Page size.
+        Returns:
+            A list of dict with the params of each slice and its number of results
+    """
+    if search_result is None:
+        search_result = search({**params, 'limit': 0})
+    total = search_total(search_result)
+    if total is None:
+        return []
+    if total <= cap:
+        return [{'params': params, 'results': total}] if total else []
+    available_filter = choose_split(search_result, cap, limit)
+    if available_filter is None or max_depth == 0:
+        return _leaf(params, total, cap)
+
+    plan = []
+    for value in available_filter['values']:
+        if value['results'] == 0:
+            continue
+        slice_params = {**params, available_filter['id']: value['id']}
+        if value['results'] <= cap:
+            plan.append({'params': slice_params, 'results': value['results']})
+            continue
+        probe = search({**slice_params, 'limit': 0})
+        if search_total(probe) is None:
+            plan += _leaf(slice_params, value['results'], cap)
+        else:
+            plan += plan_partitions(search, slice_params, cap, probe, max_depth - 1, limit)
+    return plan
+
+
+def split_oversized(plan: list[dict], cap: int, split: Callable[[dict, int], list[dict]]) -> list[dict]:
+    """Returns a plan where each slice over the cap, which would be paged through
+    from both ends by sort order, is replaced by the slices `split` returns for
+    it. The slices within the cap are kept, so the probes that found them are not
+    wasted.
+        Args:
+            plan:
+            cap: Maximum number of items a single search can page through.
+            split: Function that takes the params and the number of results of a
+                slice and returns a plan for it.
+        Returns:
+            A list of dict
+    """
+    refined = []
+    for part in plan:
+        if part['results'] <= cap:
+            refined.append(part)
+        elif part['params'].get('sort') == OVERFLOW_SORTS[0]:
+            params = {key: value for key, value in part['params'].items() if key != 'sort'}
+            refined += split(params, part['results'])
+    return refined
+
+
+def plan_coverage(plan: list[dict], total: int, cap: int) -> float:
+    """Returns the share of the items of a search that a plan reaches.
+        Args:
+            plan:
+            total: Number of results of the search.
+            cap: Maximum number of items a single search can page through.
+        Returns:
+            A float
+    """
+    if not total:
+        return 1.0
+    reached = {}
+    for part in plan:
+        # The sorted halves of an oversized slice reach up to `cap` items each.
+        key = tuple(sorted((k, v) for k, v in part['params'].items() if k != 'sort'))
+        reached[key] = min(part['results'], reached.get(key, 0) + cap)
+    return min(sum(reached.values()) / total, 1.0)
@@ -0,0 +1,98 @@
+"""
+This module aims to test the functions in module planner
+"""
+import unittest
+from planner import choose_split, plan_partitions, plan_coverage, split_oversized
+
+
+def search_result(total, available_filters=()):
+    return {
+        'paging': {'total': total, 'limit': 50},
+        'available_filters': [
+            {'id': filter_id, 'values': [{'id': value_id, 'results': results} for value_id, results in values]}
+            for filter_id, values in available_filters],
+    }
+
+
+# Category with 5000 items: condition splits it disjointly, with 'used' over the cap;
+# shipping overlaps (free shipping items are also in 'all').
+SEARCHES = {
+    (('category', 'MLA1'),): search_result(5000, [
+        ('shipping', [('free', 3000), ('all', 5000)]),
+        ('condition', [('new', 1800), ('used', 3100), ('refurbished', 100)]),
+    ]),
+    (('category', 'MLA1'), ('condition', 'used')): search_result(3100, [
+        ('state', [('AR-C', 1500), ('AR-B', 1600)]),
+    ]),
+}
+
+
+def search(params):
+    assert params.pop('limit') == 0
+    return SEARCHES[tuple(sorted(params.items()))]
+
+
+class TestPlanner(unittest.TestCase):
+    """
+    Test class for planner
+    """
+
+    def test_choose_split_skips_overlapping_filters(self):
+        chosen = choose_split(SEARCHES[(('category', 'MLA1'),)], cap=2000)
+        self.assertEqual(chosen['id'], 'condition')
+
+    def test_choose_split_without_filters(self):
+        self.assertIsNone(choose_split(search_result(5000), cap=2000))
+
+    def test_total_under_cap(self):
+        plan = plan_partitions(search, {'category': 'MLA2'}, 2000, search_result(120))
+        self.assertEqual(plan, [{'params': {'category': 'MLA2'}, 'results': 120}])
+
+    def test_oversized_slices_are_split_again(self):
+        plan = plan_partitions(search, {'category': 'MLA1'}, 2000)
+        self.assertEqual(plan, [
+            {'params': {'category': 'MLA1', 'condition': 'new'}, 'results': 1800},
+            {'params': {'category': 'MLA1', 'condition': 'used', 'state': 'AR-C'}, 'results': 1500},
+            {'params': {'category': 'MLA1', 'condition': 'used', 'state': 'AR-B'}, 'results': 1600},
+            {'params': {'category': 'MLA1', 'condition': 'refurbished'}, 'results': 100},
+        ])
+        self.assertEqual(plan_coverage(plan, 5000, 2000), 1.0)
+
+    def test_failed_probe_becomes_a_leaf(self):
+        def failing_search(params):
+            if params.get('condition') == 'used':
+                return {'message': 'too_many_requests', 'status': 429}
+            return search(params)
+
+        plan = plan_partitions(failing_search, {'category': 'MLA1'}, 2000)
+        self.assertEqual(plan[1:3], [
+            {'params': {'category': 'MLA1', 'condition': 'used', 'sort': 'price_asc'}, 'results': 3100},
+            {'params': {'category': 'MLA1', 'condition': 'used', 'sort': 'price_desc'}, 'results': 3100},
+        ])
+        self.assertEqual(plan_partitions(failing_search, {'category': 'MLA1', 'condition': 'used'}, 2000), [])
+
+    def test_split_oversized_keeps_slices_within_cap(self):
+        plan = [
+            {'params': {'category': 'MLA1', 'condition': 'new'}, 'results': 1800},
+            {'params': {'category': 'MLA1', 'condition': 'used', 'sort': 'price_asc'}, 'results': 3100},
+            {'params': {'category': 'MLA1', 'condition': 'used', 'sort': 'price_desc'}, 'results': 3100},
+        ]
+        split = split_oversized(plan, 2000, lambda params, results: [
+            {'params': {**params, 'price': '*-99.99'}, 'results': 1000},
+            {'params': {**params, 'price': '100.00-*'}, 'results': results - 1000},
+        ])
+        self.assertEqual(split, [
+            {'params': {'category': 'MLA1', 'condition': 'new'}, 'results': 1800},
+            {'params': {'category': 'MLA1', 'condition': 'used', 'price': '*-99.99'}, 'results': 1000},
+            {'params': {'category': 'MLA1', 'condition': 'used', 'price': '100.00-*'}, 'results': 2100},
+        ])
+
+    def test_unsplittable_slice_uses_both_sort_orders(self):
+        plan = plan_partitions(search, {'category': 'MLA3'}, 2000, search_result(3000))
+        self.assertEqual([part['params'].get('sort') for part in plan], ['price_asc', 'price_desc'])
+        self.assertEqual(plan_coverage(plan, 3000, 2000), 1.0)
+        plan = plan_partitions(search, {'category': 'MLA3'}, 2000, search_result(5000))
+        self.assertEqual(plan_coverage(plan, 5000, 2000), 0.8)
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
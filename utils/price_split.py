@@ -0,0 +1,127 @@
+"""Module price_split splits a search into disjoint price ranges that can be paged through."""
+from __future__ import annotations
+from collections.abc import Callable, Sequence
+from planner import OVERFLOW_SORTS
+
+PRICE_STEP = 0.01
+FIRST_CUT = 100.0
+MAX_PROBES = 64
+
+
+def price_param(low: float | None, high: float | None) -> str:
+    """Returns the value of the price filter for the range [low, high). Prices are
+    in cents, so the upper bound is the last cent below high and consecutive ranges
+    never share an item.
+        Args:
+            low: Lower bound, or None for no bound.
+            high: Upper bound, or None for no bound.
+        Returns:
+            A string like '100.00-199.99'
+    """
+    low_value = '*' if low is None else f'{low:.2f}'
+    high_value = '*' if high is None else f'{high - PRICE_STEP:.2f}'
+    return f'{low_value}-{high_value}'
+
+
+def midpoint(low: float | None, high: float | None) -> float | None:
+    """Returns the price that splits a range in two, or None if it can not be split.
+    Ranges without an upper bound are doubled, since prices are heavy-tailed.
+        Args:
+            low:
+            high:
+        Returns:
+            A float, or None
+    """
+    low = low or 0.0
+    if high is None:
+        return max(2 * low, FIRST_CUT)
+    mid = round((low + high) / 2, 2)
+    return mid if low < mid < high else None
+
+
+def merge_ranges(ranges: list[list], cap: int) -> list[list]:
+    """Merges consecutive ranges while their counts add up to no more than the cap.
+    Ranges whose count is unknown are never merged.
+        Args:
+            ranges: List of [low, high, count], sorted by price.
+            cap:
+        Returns:
+            A list of [low, high, count]
+    """
+    merged = []
+    for low, high, count in ranges:
+        if merged and None not in (merged[-1][2], count) and merged[-1][2] + count <= cap:
+            merged[-1] = [merged[-1][0], high, merged[-1][2] + count]
+        else:
+            merged.append([low, high, count])
+    return merged
+
+
+def to_plan(params: dict, ranges: list[list], cap: int) -> tuple[list[dict], list[float]]:
+    """Turns price ranges into a request plan and the cut points that produced them.
+        Args:
+            params:
+            ranges: List of [low, high, count], sorted by price.
+            cap:
+        Returns:
+            A tuple with a list of dict with the params of each slice and its number
+            of results, and a list of float
+    """
+    plan = []
+    for low, high, count in ranges:
+        if count == 0:
+            continue
+        slice_params = {**params, 'price': price_param(low, high)}
+        if count is not None and count <= cap:
+            plan.append({'params': slice_params, 'results': count})
+        else:
+            # A single price point over the cap, or a range that could not be
+            # counted: each sort order reaches one end of it.
+            results = cap if count is None else count
+            plan += [{'params': {**slice_params, 'sort': sort}, 'results': results} for sort in OVERFLOW_SORTS]
+    return plan, [high for _, high, _ in ranges[:-1]]
+
+
+def split_by_price(count: Callable[[dict], int], params: dict, cap: int, total: int,
+                   cuts: Sequence[float] = (), max_probes: int = MAX_PROBES) -> tuple[list[dict], list[float]]:
+    """Splits a search into price ranges with no more than `cap` results each.
+    Ranges over the cap are bisected; only the lower half is counted, the upper
+    half is what is left. Cut points found on a previous run can be passed in
+    `cuts`, so usually each range only needs one count to confirm it. A range
+    whose count fails is not bisected: no cut is added inside it and it is paged
+    through from both ends by price.
+        Args:
+            count: Function that returns the number of results of a search, or
+                None if it failed.
+            params: Params of the search to split.
+            cap: Maximum number of items a single search can page through.
+            total: Number of results of the search.
+            cuts: Known cut points, in any order.
+            max_probes: Maximum number of counts while bisecting.
+        Returns:
+            A tuple with the request plan and the cut points to reuse next time
+    """
+    bounds = [None, *sorted(set(cuts)), None]
+    ranges = [[low, high, None] for low, high in zip(bounds, bounds[1:])]
+    if len(ranges) == 1:
+        ranges[0][2] = total
+    else:
+        for price_range in ranges:
+            price_range[2] = count({**params, 'price': price_param(price_range[0], price_range[1])})
+
+    probes, index = 0, 0
+    while index < len(ranges):
+        low, high, results = ranges[index]
+        mid = midpoint(low, high)
+        if results is None or results <= cap or mid is None or probes == max_probes:
+            index += 1
+            continue
+        lower = count({**params, 'price': price_param(low, mid)})
+        probes += 1
+        if lower is None:
+            index += 1
+            continue
+        lower = min(lower, results)
+        ranges[index:index + 1] = [[low, mid, lower], [mid, high, results - lower]]
+    return to_plan(params, merge_ranges(ranges, cap), cap)
+
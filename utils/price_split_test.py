@@ -0,0 +1,96 @@
+"""
+This module aims to test the functions in module price_split
+"""
+import random
+import unittest
+from price_split import price_param, midpoint, split_by_price
+
+
+def parse_price(value):
+    low, high = value.split('-')
+    return (float('-inf') if low == '*' else float(low), float('inf') if high == '*' else float(high))
+
+
+class FakeSearch():
+    """
+    Counts the items of a list of prices that match a price filter
+    """
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = 0
+        self.failing = set()
+
+    def count(self, params):
+        self.calls += 1
+        if params['price'] in self.failing:
+            return None
+        low, high = parse_price(params['price'])
+        return sum(low <= price <= high for price in self.prices)
+
+
+class TestPriceSplit(unittest.TestCase):
+    """
+    Test class for price_split
+    """
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.prices = [round(rng.lognormvariate(4, 1.5), 2) for _ in range(20000)]
+        self.search = FakeSearch(self.prices)
+
+    def assert_covers(self, plan, cap):
+        counts = [self.search.count(part['params']) for part in plan]
+        self.assertEqual(sum(counts), len(self.prices))
+        self.assertTrue(all(part['results'] <= cap for part in plan))
+        self.assertEqual(counts, [part['results'] for part in plan])
+
+    def test_price_param(self):
+        self.assertEqual(price_param(None, 100.0), '*-99.99')
+        self.assertEqual(price_param(100.0, None), '100.00-*')
+        self.assertEqual(price_param(0.5, 1.25), '0.50-1.24')
+
+    def test_midpoint(self):
+        self.assertEqual(midpoint(None, None), 100.0)
+        self.assertEqual(midpoint(300.0, None), 600.0)
+        self.assertEqual(midpoint(None, 100.0), 50.0)
+        self.assertIsNone(midpoint(10.0, 10.01))
+
+    def test_slices_are_disjoint_and_under_cap(self):
+        plan, cuts = split_by_price(self.search.count, {'category': 'MLA1'}, 4000, len(self.prices))
+        self.assert_covers(plan, 4000)
+        self.assertEqual(len(cuts), len(plan) - 1)
+        self.assertEqual(cuts, sorted(cuts))
+
+    def test_cached_cuts_take_one_count_per_range(self):
+        _, cuts = split_by_price(self.search.count, {'category': 'MLA1'}, 4000, len(self.prices))
+        self.search.calls = 0
+        plan, again = split_by_price(self.search.count, {'category': 'MLA1'}, 4000, len(self.prices), cuts)
+        self.assertEqual(self.search.calls, len(cuts) + 1)
+        self.assertEqual(again, cuts)
+        self.assertEqual(len(plan), len(cuts) + 1)
+
+    def test_single_price_over_cap_uses_both_sort_orders(self):
+        self.search.prices = [9.99] * 5000
+        plan, _ = split_by_price(self.search.count, {}, 4000, 5000)
+        self.assertEqual([part['params'].get('sort') for part in plan], ['price_asc', 'price_desc'])
+
+    def test_failed_bisection_keeps_the_range(self):
+        self.search.failing = {'*-99.99'}
+        plan, cuts = split_by_price(self.search.count, {'category': 'MLA1'}, 4000, len(self.prices))
+        self.assertEqual(plan, [
+            {'params': {'category': 'MLA1', 'price': '*-*', 'sort': sort}, 'results': len(self.prices)}
+            for sort in ('price_asc', 'price_desc')])
+        self.assertEqual(cuts, [])
+
+    def test_failed_count_of_a_known_range(self):
+        self.search.failing = {'*-49.99'}
+        plan, cuts = split_by_price(self.search.count, {'category': 'MLA1'}, 4000, len(self.prices), [50.0])
+        self.assertEqual(plan[:2], [
+            {'params': {'category': 'MLA1', 'price': '*-49.99', 'sort': sort}, 'results': 4000}
+            for sort in ('price_asc', 'price_desc')])
+        self.assertEqual(cuts[0], 50.0)
+        self.assertTrue(all(part['results'] <= 4000 for part in plan[2:]))
+
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,106 @@
+"""Module seen keeps track of the items already downloaded during a run."""
+from __future__ import annotations
+from array import array
+from collections.abc import Iterable
+import threading
+
+_EMPTY = -1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class IntSet():
+    """
+    Set of non-negative integers stored in a flat array of 64-bit slots with
+    open addressing, which takes 8 to 16 bytes per element instead of the
+    roughly 60 bytes of a Python set of ints.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._bits = max(4, (capacity - 1).bit_length())
+        self._slots = array('q', [_EMPTY]) * (1 << self._bits)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _index(self, value: int) -> int:
+        # Fibonacci hashing spreads sequential ids across the table.
+        return ((value * _GOLDEN) & _MASK64) >> (64 - self._bits)
+
+    def __contains__(self, value: int) -> bool:
+        mask = len(self._slots) - 1
+        index = self._index(value)
+        while True:
+            slot = self._slots[index]
+            if slot == value:
+                return True
+            if slot == _EMPTY:
+                return False
+            index = (index + 1) & mask
+
+    def add(self, value: int) -> bool:
+        """Adds a value to the set.
+            Args:
+                value:
+            Returns:
+                True if the value was not in the set yet
+        """
+        if value < 0:
+            raise ValueError('IntSet only stores non-negative integers')
+        if 2 * (self._size + 1) > len(self._slots):
+            self._grow()
+        mask = len(self._slots) - 1
+        index = self._index(value)
+        while True:
+            slot = self._slots[index]
+            if slot == value:
+                return False
+            if slot == _EMPTY:
+                self._slots[index] = value
+                self._size += 1
+                return True
+            index = (index + 1) & mask
+
+    def _grow(self) -> None:
+        old_slots = self._slots
+        self._bits += 1
+        self._slots = array('q', [_EMPTY]) * (1 << self._bits)
+        self._size = 0
+        for value in old_slots:
+            if value != _EMPTY:
+                self.add(value)
+
+
+class SeenItems():
+    """
+    Item ids seen per category during a run. It answers how many distinct
+    items a category has so far without querying the database.
+    """
+
+    def __init__(self) -> None:
+        self._categories = {}
+        self._lock = threading.Lock()
+
+    def add(self, category_id: str, items: Iterable[dict]) -> int:
+        """Records the items downloaded for a category.
+            Args:
+                category_id:
+                items: Items as returned by the search API.
+            Returns:
+                The number of items not seen before
+        """
+        with self._lock:
+            seen = self._categories.setdefault(category_id, IntSet())
+            return sum(seen.add(int(item['id'][3:])) for item in items)
+
+    def count(self, category_id: str) -> int:
+        """Returns the number of distinct items seen for a category.
+            Args:
+                category_id:
+            Returns:
+                An int
+        """
+        with self._lock:
+            seen = self._categories.get(category_id)
+            return len(seen) if seen is not None else 0
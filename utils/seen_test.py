@@ -0,0 +1,46 @@
+"""
+This module aims to test the classes in module seen
+"""
+import random
+import unittest
+from seen import IntSet, SeenItems
+
+
+class TestIntSet(unittest.TestCase):
+    """
+    Test class for IntSet
+    """
+
+    def test_matches_builtin_set(self):
+        values = [random.randrange(10 ** 10) for _ in range(5000)] + list(range(1000))
+        int_set = IntSet(capacity=8)
+        expected = set()
+        for value in values:
+            self.assertEqual(int_set.add(value), value not in expected)
+            expected.add(value)
+        self.assertEqual(len(int_set), len(expected))
+        self.assertTrue(all(value in int_set for value in expected))
+        self.assertNotIn(10 ** 10 + 1, int_set)
+
+    def test_rejects_negative_values(self):
+        with self.assertRaises(ValueError):
+            IntSet().add(-1)
+
+
+class TestSeenItems(unittest.TestCase):
+    """
+    Test class for SeenItems
+    """
+
+    def test_counts_new_items_per_category(self):
+        seen = SeenItems()
+        first = [{'id': 'MLB1392840081'}, {'id': 'MLB773008078'}]
+        second = [{'id': 'MLB773008078'}, {'id': 'MLB1863576963'}]
+        self.assertEqual(seen.add('MLB40554', first), 2)
+        self.assertEqual(seen.add('MLB40554', second), 1)
+        self.assertEqual(seen.add('MLB1384', second), 2)
+        self.assertEqual(seen.count('MLB40554'), 3)
+        self.assertEqual(seen.count('MLB1384'), 2)
+        self.assertEqual(seen.count('MLB1'), 0)
+
+unittest.main(argv=[''], verbosity=2, exit=False)
@@ -3,6 +3,22 @@ from __future__ import annotations
 from collections.abc import Iterator
 import itertools
 import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Serializes an object to UTF-8 encoded JSON, using orjson when it is installed.
+        Args:
+            obj:
+        Returns:
+            A bytes object
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
 
 def optimize_filters(available_filters: list[dict], total_items: int) -> list[dict]:
     """Returns a list of filters whose result
@@ -83,6 +99,8 @@ def get_filter_generator(available_filters: list[dict], available_sorts: list[di
 
 def format_items(items, today):
     """Returns a list of tuples with site_id, item_id, last_run, category_id and item_json.
+    item_json is UTF-8 encoded JSON bytes. The seller is reduced to its id, the rest of
+    it is stored once per run by format_sellers.
         Args:
             items:
             today: 
@@ -95,13 +113,66 @@ def format_items(items, today):
         item_id = item['id'][3:]
         category_id = item['category_id'][3:]
         last_run = today
-        item_json = json.dumps(item)
+        if 'seller' in item:
+            item = {**item, 'seller': {'id': item['seller']['id']}}
+        item_json = dumps(item)
         records.append((site_id, item_id, last_run, category_id, item_json))
     return records
 
 
+def format_sellers(items:list, today:str) -> list[tuple]:
+    """Returns one tuple per distinct seller of the items, with the columns of the
+    sellers_daily table: site_id, seller_id, last_run, permalink, registration_date,
+    level_id, power_seller_status, transactions total, completed and canceled, ratings
+    positive, neutral and negative, sales completed and the rate and value of claims,
+    delayed handling time and cancellations.
+        Args:
+            items:
+            today:
+        Returns:
+            A list of tuple
+    """
+    sellers = {}
+    for item in items:
+        seller = item.get('seller')
+        if not seller or seller['id'] in sellers:
+            continue
+        reputation = seller.get('seller_reputation') or {}
+        transactions = reputation.get('transactions') or {}
+        ratings = transactions.get('ratings') or {}
+        metrics = reputation.get('metrics') or {}
+        claims = metrics.get('claims') or {}
+        delayed_handling_time = metrics.get('delayed_handling_time') or {}
+        cancellations = metrics.get('cancellations') or {}
+        registration_date = seller.get('registration_date')
+        sellers[seller['id']] = (
+            item['site_id'],
+            seller['id'],
+            today,
+            seller.get('permalink'),
+            registration_date[:10] if registration_date else None,
+            reputation.get('level_id'),
+            reputation.get('power_seller_status'),
+            transactions.get('total'),
+            transactions.get('completed'),
+            transactions.get('canceled'),
+            ratings.get('positive'),
+            ratings.get('neutral'),
+            ratings.get('negative'),
+            (metrics.get('sales') or {}).get('completed'),
+            claims.get('rate'),
+            claims.get('value'),
+            delayed_handling_time.get('rate'),
+            delayed_handling_time.get('value'),
+            cancellations.get('rate'),
+            cancellations.get('value'),
+        )
+    return list(sellers.values())
+
+
 def format_categories(categories:list, today:str) -> list[tuple]:
     """Returns a list of tuples with site_id, category_id, last_run and category_json.
+    category_json is UTF-8 encoded JSON bytes.
     Args:
         categories:
         today:
@@ -112,6 +183,6 @@ def format_categories(categories:list, today:str) -> list[tuple]:
         site_id = category['id'][0:3]
         category_id = category['id'][3:]
         last_run = today
-        category_json = json.dumps(category)
+        category_json = dumps(category)
         formated.append((site_id, category_id, last_run, category_json))
     return formated
@@ -3,7 +3,9 @@ This module aims to test the function in module utils
 """
 from types import GeneratorType
 import unittest
+import json
 from utils import optimize_filters, get_filter_combinations, get_filter_generator
+from utils import format_items, format_categories, format_sellers
 
 
 class TestModuleUtils(unittest.TestCase):
@@ -767,4 +769,67 @@ class TestModuleUtils(unittest.TestCase):
         self.assertIsInstance(filters_combinations, GeneratorType)
         self.assertListEqual(list(filters_combinations), expected_result)
 
+    def test_format_items_serializes_to_bytes(self):
+        """
+        Given a list of items, each record should carry the ids without
+        the site prefix and the item serialized as UTF-8 JSON bytes.
+        """
+        item = {'id': 'MLB1392840081', 'site_id': 'MLB', 'category_id': 'MLB40554',
+                'title': 'Fórmula Infantil'}
+        records = format_items([item], '2022-07-01')
+        self.assertEqual(records[0][:4], ('MLB', '1392840081', '2022-07-01', '40554'))
+        self.assertIsInstance(records[0][4], bytes)
+        self.assertDictEqual(json.loads(records[0][4]), item)
+
+    def test_format_items_reduces_the_seller_to_its_id(self):
+        """
+        Given an item with a full seller object, only the seller id should be
+        kept in item_json.
+        """
+        item = {'id': 'MLB1', 'site_id': 'MLB', 'category_id': 'MLB40554',
+                'seller': {'id': 742220069, 'seller_reputation': {'level_id': '5_green'}}}
+        records = format_items([item], '2022-07-01')
+        self.assertDictEqual(json.loads(records[0][4])['seller'], {'id': 742220069})
+        self.assertIn('seller_reputation', item['seller'])
+
+    def test_format_sellers_returns_one_record_per_seller(self):
+        """
+        Given items of the same seller, a single typed record should be returned.
+        """
+        seller = {
+            'id': 742220069,
+            'permalink': 'http://perfil.mercadolivre.com.br/NESTLE+STORES',
+            'registration_date': '2020-09-04T14:38:52.000-04:00',
+            'seller_reputation': {
+                'level_id': '5_green',
+                'power_seller_status': 'platinum',
+                'transactions': {'canceled': 10, 'completed': 90, 'total': 100,
+                                 'ratings': {'negative': 0.01, 'neutral': 0.02, 'positive': 0.97}},
+                'metrics': {'sales': {'completed': 50},
+                            'claims': {'rate': 0.01, 'value': 1},
+                            'delayed_handling_time': {'rate': 0.02, 'value': 2},
+                            'cancellations': {'rate': 0, 'value': 0}},
+            },
+        }
+        items = [{'id': f'MLB{i}', 'site_id': 'MLB', 'seller': seller} for i in range(3)]
+        items.append({'id': 'MLB9', 'site_id': 'MLB', 'seller': {'id': 1}})
+        records = format_sellers(items, '2022-07-01')
+        self.assertListEqual(records, [
+            ('MLB', 742220069, '2022-07-01', 'http://perfil.mercadolivre.com.br/NESTLE+STORES',
+             '2020-09-04', '5_green', 'platinum', 100, 90, 10, 0.97, 0.02, 0.01, 50,
+             0.01, 1, 0.02, 2, 0, 0),
+            ('MLB', 1, '2022-07-01', None, None, None, None, None, None, None, None, None, None,
+             None, None, None, None, None, None, None),
+        ])
+
+    def test_format_categories_serializes_to_bytes(self):
+        """
+        Given a list of categories, each record should carry the category
+        serialized as UTF-8 JSON bytes.
+        """
+        category = {'id': 'MLB1384', 'name': 'Bebês'}
+        records = format_categories([category], '2022-07-01')
+        self.assertEqual(records[0][:3], ('MLB', '1384', '2022-07-01'))
+        self.assertDictEqual(json.loads(records[0][3]), category)
+
 unittest.main(argv=[''], verbosity=2, exit=False)